@@ -0,0 +1,120 @@
+"""Hot/cold tiering of old crime reports.
+
+Reports older than the archive age are moved, with their comments and
+ratings, from the hot collections into ``*_archive`` collections in
+batches, so the feed indexes and working set only cover recent reports.
+Each batch is copied before it is deleted and copies ignore duplicates, so
+a run interrupted half way is finished by the next one. Archived reports
+are read-only: lookups fall back to the archive, but comments and ratings
+can no longer be added. A comment or rating written while its report was
+being moved lands in the hot collection after the first sweep of its
+batch, so comments and ratings are swept once more after the reports are
+gone.
+
+Archiving is off unless ARCHIVE_AFTER_DAYS is set (see server.py).
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pymongo.errors import BulkWriteError
+
+DEFAULT_BATCH_SIZE = 200
+
+ARCHIVE_COLLECTIONS = {
+    "crime_reports": "crime_reports_archive",
+    "comments": "comments_archive",
+    "credibility_ratings": "credibility_ratings_archive",
+}
+
+ARCHIVE_INDEXES = {
+    "crime_reports_archive": [
+        ([("id", 1)], {"unique": True}),
+        ([("city", 1), ("is_blocked", 1), ("created_at", -1)], {}),
+    ],
+    "comments_archive": [
+        ([("id", 1)], {"unique": True}),
+        ([("report_id", 1), ("created_at", 1)], {}),
+    ],
+    "credibility_ratings_archive": [
+        ([("id", 1)], {"unique": True}),
+        ([("report_id", 1), ("user_id", 1)], {}),
+    ],
+}
+
+
+async def ensure_indexes(db):
+    await db.crime_reports.create_index([("created_at", 1)])
+    for collection_name, indexes in ARCHIVE_INDEXES.items():
+        for keys, options in indexes:
+            await db[collection_name].create_index(keys, **options)
+
+
+async def _move(source, target, query: dict, archived_at: datetime) -> int:
+    """Copy matching documents to ``target`` and delete the copied ones from ``source``"""
+    documents = await source.find(query).to_list(length=None)
+    if not documents:
+        return 0
+
+    for document in documents:
+        document["archived_at"] = archived_at
+    try:
+        await target.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        # Duplicates were copied by an earlier, interrupted run
+        if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+
+    await source.delete_many({"_id": {"$in": [document["_id"] for document in documents]}})
+    return len(documents)
+
+
+async def archive_batch(db, cutoff: datetime, batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    """Archive up to ``batch_size`` reports created before ``cutoff``"""
+    archived_at = datetime.now(timezone.utc)
+    reports = await db.crime_reports.find({"created_at": {"$lt": cutoff}}, {"id": 1, "city": 1})\
+        .sort("created_at", 1)\
+        .limit(batch_size)\
+        .to_list(length=None)
+    if not reports:
+        return {"reports": 0, "comments": 0, "ratings": 0, "cities": []}
+
+    report_ids = [report["id"] for report in reports]
+    children = {"report_id": {"$in": report_ids}}
+    # Reports are copied first so lookups always find them in one tier or the other
+    moved_reports = await _move(
+        db.crime_reports, db.crime_reports_archive, {"id": {"$in": report_ids}}, archived_at
+    )
+    moved_comments, moved_ratings = 0, 0
+    for _ in range(2):
+        moved_comments += await _move(db.comments, db.comments_archive, children, archived_at)
+        moved_ratings += await _move(db.credibility_ratings, db.credibility_ratings_archive, children, archived_at)
+    return {
+        "reports": moved_reports,
+        "comments": moved_comments,
+        "ratings": moved_ratings,
+        "cities": sorted({report.get("city") for report in reports if report.get("city")}),
+    }
+
+
+async def archive_reports(
+    db,
+    older_than_days: float,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_batches: Optional[int] = None,
+) -> dict:
+    """Archive every report older than ``older_than_days``, one batch at a time"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    totals = {"reports": 0, "comments": 0, "ratings": 0, "cities": set()}
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        result = await archive_batch(db, cutoff, batch_size)
+        if not result["reports"]:
+            break
+        batches += 1
+        for key in ("reports", "comments", "ratings"):
+            totals[key] += result[key]
+        totals["cities"].update(result["cities"])
+
+    totals["cities"] = sorted(totals["cities"])
+    totals["batches"] = batches
+    return totals
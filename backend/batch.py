@@ -0,0 +1,87 @@
+"""In-process dispatch of batched API calls.
+
+``POST /api/batch`` runs each of its sub-requests through the ASGI app
+itself, so they go through the same routes, dependencies and middleware as
+a normal request, only without another round trip. Sub-requests run
+concurrently and in no particular order; calls that depend on each other
+belong in separate batches.
+"""
+import asyncio
+import json
+from typing import Any, List, Optional, Tuple
+
+MAX_SUBREQUESTS = 20
+# Batches don't nest, a live stream would never finish, and sub-responses are
+# held in memory, so streamed exports have to be fetched on their own
+EXCLUDED_PREFIXES = ("/api/batch", "/api/stream", "/api/admin/export")
+FORWARDED_HEADERS = {b"authorization", b"cookie", b"user-agent", b"x-read-primary-until"}
+
+
+def check_path(path: str):
+    if not path.startswith("/api/"):
+        raise ValueError("Sub-request paths must start with /api/")
+    if path.split("?", 1)[0].rstrip("/").startswith(EXCLUDED_PREFIXES):
+        raise ValueError(f"{path} can't be called from a batch")
+
+
+def _decode_body(headers: List[Tuple[bytes, bytes]], body: bytes) -> Any:
+    content_type = dict(headers).get(b"content-type", b"").decode("latin-1")
+    if "json" in content_type and body:
+        return json.loads(body)
+    return body.decode("utf-8", errors="replace") if body else None
+
+
+async def dispatch(app, parent_scope: dict, method: str, path: str, body: Any = None, state: Optional[dict] = None) -> dict:
+    """Run one sub-request through ``app`` and return its status, headers and decoded body"""
+    path, _, query_string = path.partition("?")
+    payload = json.dumps(body).encode() if body is not None else b""
+    headers = [(name, value) for name, value in parent_scope["headers"] if name in FORWARDED_HEADERS]
+    headers += [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())]
+    scope = {
+        "type": "http",
+        "asgi": parent_scope.get("asgi", {"version": "3.0"}),
+        "http_version": parent_scope.get("http_version", "1.1"),
+        "method": method,
+        "scheme": parent_scope.get("scheme", "http"),
+        "server": parent_scope.get("server"),
+        "client": parent_scope.get("client"),
+        "root_path": parent_scope.get("root_path", ""),
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string.encode(),
+        "headers": headers,
+        "state": dict(state or {}),
+    }
+
+    request_sent = False
+    response_done = asyncio.Event()
+    status, response_headers, chunks = 500, [], []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, response_headers
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers = message.get("headers", [])
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                response_done.set()
+
+    await app(scope, receive, send)
+    body = b"".join(chunks)
+    return {
+        "status": status,
+        "headers": {
+            name.decode("latin-1"): value.decode("latin-1")
+            for name, value in response_headers if name not in (b"content-length", b"set-cookie")
+        },
+        "body": _decode_body(response_headers, body),
+    }
@@ -0,0 +1,198 @@
+"""Streaming bulk import of historical crime reports from NDJSON or CSV.
+
+Rows are read one line at a time, validated and prepared (including image
+compression) on a thread pool, and written with unordered ``insert_many``
+in fixed-size batches, so memory use depends on the batch size rather than
+the size of the file.
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError
+
+import sync
+from models import BulkImportError, BulkImportResult
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_WORKERS = 4
+MAX_REPORTED_ERRORS = 100
+# CSV cells that hold JSON (as written by export.py), decoded on import
+CSV_JSON_COLUMNS = ("coordinates",)
+
+
+def detect_format(filename: str) -> str:
+    return "csv" if filename.lower().endswith(".csv") else "ndjson"
+
+
+def iter_ndjson(lines: Iterable[str]) -> Iterator[Tuple[int, object]]:
+    for line_no, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, ValueError(f"Invalid JSON: {e}")
+
+
+def iter_csv(lines: Iterable[str]) -> Iterator[Tuple[int, object]]:
+    reader = csv.DictReader(lines)
+    for row in reader:
+        # Empty cells mean "not provided" so optional fields fall back to defaults
+        row = {k: v for k, v in row.items() if k and v not in (None, "")}
+        try:
+            for column in CSV_JSON_COLUMNS:
+                if column in row:
+                    row[column] = json.loads(row[column])
+        except json.JSONDecodeError as e:
+            yield reader.line_num, ValueError(f"Invalid JSON in {column}: {e}")
+            continue
+        yield reader.line_num, row
+
+
+def iter_rows(lines: Iterable[str], fmt: str) -> Iterator[Tuple[int, object]]:
+    if fmt == "csv":
+        return iter_csv(lines)
+    if fmt == "ndjson":
+        return iter_ndjson(lines)
+    raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def _prepare(build_document: Callable[[dict], dict], row: object):
+    if isinstance(row, Exception):
+        return row
+    if not isinstance(row, dict):
+        return ValueError("Row must be an object")
+    try:
+        return build_document(row)
+    except Exception as e:
+        return e
+
+
+async def import_reports(
+    collection,
+    lines: Iterable[str],
+    fmt: str,
+    build_document: Callable[[dict], dict],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: int = DEFAULT_WORKERS,
+    before_insert: Optional[Callable[[List[dict]], Awaitable[None]]] = None,
+) -> BulkImportResult:
+    """Stream rows from ``lines`` into ``collection``, calling ``before_insert`` on each batch of documents"""
+    loop = asyncio.get_running_loop()
+    result = BulkImportResult()
+    started = time.perf_counter()
+
+    cities = set()
+
+    def record_error(row: int, error: str):
+        result.failed += 1
+        if len(result.errors) < MAX_REPORTED_ERRORS:
+            result.errors.append(BulkImportError(row=row, error=error))
+
+    async def flush(batch):
+        prepared = await asyncio.gather(*(
+            loop.run_in_executor(executor, _prepare, build_document, row) for _, row in batch
+        ))
+
+        documents, row_numbers = [], []
+        for (line_no, _), document in zip(batch, prepared):
+            if isinstance(document, Exception):
+                record_error(line_no, str(document))
+            else:
+                documents.append(document)
+                row_numbers.append(line_no)
+
+        if not documents:
+            return
+        if before_insert:
+            await before_insert(documents)
+        cities.update(document.get("city") for document in documents if document.get("city"))
+        try:
+            await collection.insert_many(documents, ordered=False)
+            result.inserted += len(documents)
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            result.inserted += len(documents) - len(write_errors)
+            for write_error in write_errors:
+                record_error(row_numbers[write_error["index"]], write_error.get("errmsg", "Write failed"))
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"Imported {result.inserted}/{result.total_rows} rows ({result.inserted / elapsed:.0f} rows/s)")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        batch = []
+        for line_no, row in iter_rows(lines, fmt):
+            result.total_rows += 1
+            batch.append((line_no, row))
+            if len(batch) >= batch_size:
+                await flush(batch)
+                batch = []
+        if batch:
+            await flush(batch)
+
+    result.cities = sorted(cities)
+    result.elapsed_seconds = round(time.perf_counter() - started, 3)
+    if result.elapsed_seconds > 0:
+        result.rows_per_second = round(result.total_rows / result.elapsed_seconds, 1)
+    return result
+
+
+async def _main(args):
+    import server
+    from server import build_imported_report, invalidation_bus, User
+
+    server.init_db(server.create_mongo_client())
+    db = server.db
+
+    importer_doc = await db.users.find_one({"email": args.importer_email})
+    if not importer_doc:
+        raise SystemExit(f"Importer user not found: {args.importer_email}")
+    importer = User(**importer_doc)
+
+    fmt = args.format or detect_format(args.path)
+    with io.open(args.path, encoding="utf-8", newline="") as f:
+        result = await import_reports(
+            db.crime_reports,
+            f,
+            fmt,
+            lambda row: build_imported_report(row, importer),
+            batch_size=args.batch_size,
+            workers=args.workers,
+            before_insert=lambda documents: sync.stamp_new(db, documents),
+        )
+    # Let running servers drop their cached feed pages and recount the rollups
+    await invalidation_bus.invalidate("feed")
+    if result.inserted:
+        for city in result.cities:
+            await server.job_queue.enqueue("rebuild_heatmap", {"city": city})
+            await server.job_queue.enqueue("backfill_trends", {"city": city})
+            await server.job_queue.enqueue("backfill_duplicates", {"city": city})
+    server.client.close()
+    print(result.json(indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import crime reports from NDJSON or CSV")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["ndjson", "csv"])
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--importer-email", default="admin@crimereport.com")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""Per-worker TTL caches kept coherent across worker processes.
+
+Each worker holds its own in-memory caches. Invalidations are applied
+locally and also written to a small capped collection, which every worker
+tails with a tailable cursor and applies to its own caches. Capped
+collections work on a standalone mongod, so no replica set or external
+broker is needed. The TTL on each cache bounds staleness if a message is
+ever missed (e.g. while a worker is reconnecting).
+
+``SingleFlight`` collapses concurrent identical loads in a worker into one.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Small LRU cache whose entries expire after ``ttl`` seconds.
+
+    Tuple keys can also be invalidated by their first element, so e.g. all
+    cached feed pages for a city are dropped with ``invalidate(city)``.
+
+    With ``weigh`` (value -> rough size in bytes) and ``max_weight`` the
+    cache is also bounded by the total size of its values, for values whose
+    size varies a lot (e.g. feed pages with or without images).
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        max_weight: Optional[int] = None,
+        weigh: Optional[Callable[[Any], int]] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self.weigh = weigh
+        self.weight = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def _drop(self, key):
+        self.weight -= self._data.pop(key)[2]
+
+    def get(self, key, default=None):
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        expires_at, value, _ = entry
+        if expires_at < time.monotonic():
+            self._drop(key)
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        now = time.monotonic()
+        weight = self.weigh(value) if self.weigh else 0
+        if self.max_weight is not None and weight > self.max_weight:
+            # Would evict everything else and still not fit
+            if key in self._data:
+                self._drop(key)
+            return
+        # Drop expired entries from the old end, so entries nobody asks for
+        # again don't sit in memory until maxsize pushes them out
+        while self._data:
+            oldest = next(iter(self._data))
+            if self._data[oldest][0] >= now:
+                break
+            self._drop(oldest)
+        if key in self._data:
+            self._drop(key)
+        self._data[key] = (now + self.ttl, value, weight)
+        self.weight += weight
+        while len(self._data) > self.maxsize or (self.max_weight is not None and self.weight > self.max_weight):
+            self._drop(next(iter(self._data)))
+
+    def invalidate(self, key=None):
+        if key is None:
+            self._data.clear()
+            self.weight = 0
+            return
+        if key in self._data:
+            self._drop(key)
+        for cached_key in [k for k in self._data if isinstance(k, tuple) and k and k[0] == key]:
+            self._drop(cached_key)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SingleFlight:
+    """Share one in-flight load between concurrent callers asking for the same key.
+
+    The load runs in its own task, so a caller that goes away (e.g. a client
+    disconnect cancelling its request) doesn't cancel it for the others.
+    Results and exceptions are shared alike; nothing is kept once the load
+    finishes.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self):
+        return len(self._in_flight)
+
+    async def do(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """``load()``'s result, and whether it was shared with a load already in flight"""
+        task = self._in_flight.get(key)
+        shared = task is not None
+        if not shared:
+            task = asyncio.ensure_future(load())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task), shared
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the exception as seen even if every caller went away before it was raised
+        if not task.cancelled():
+            task.exception()
+
+
+class InvalidationBus:
+    def __init__(
+        self,
+        db,
+        caches: Dict[str, TTLCache],
+        collection_name: str = "cache_invalidations",
+        size_bytes: int = 1024 * 1024,
+        max_documents: int = 10000,
+    ):
+        self.db = db
+        self.caches = caches
+        self.collection_name = collection_name
+        self.size_bytes = size_bytes
+        self.max_documents = max_documents
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def collection(self):
+        return self.db[self.collection_name]
+
+    def _apply(self, cache_name: str, key):
+        cache = self.caches.get(cache_name)
+        if cache is not None:
+            cache.invalidate(key)
+
+    def _invalidate_all(self):
+        for cache in self.caches.values():
+            cache.invalidate()
+
+    async def invalidate(self, cache_name: str, key=None):
+        """Invalidate locally now and broadcast to the other workers"""
+        self._apply(cache_name, key)
+        await self.collection.insert_one({"cache": cache_name, "key": key, "origin": self.worker_id})
+
+    async def _ensure_collection(self):
+        try:
+            await self.db.create_collection(
+                self.collection_name, capped=True, size=self.size_bytes, max=self.max_documents
+            )
+        except CollectionInvalid:
+            pass
+        # A tailable cursor on an empty capped collection dies immediately
+        if not await self.collection.find_one():
+            await self.collection.insert_one({"cache": None, "key": None, "origin": self.worker_id})
+
+    async def _tail(self):
+        last = await self.collection.find_one(sort=[("$natural", -1)])
+        last_id = last["_id"] if last else None
+
+        while True:
+            # A capped collection keeps insertion order, but ObjectIds made by different
+            # processes in the same second don't, so the resume point is found by walking
+            # the natural order rather than with an _id range
+            cursor = self.collection.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+            caught_up, skipped_to = last_id is None, last_id
+            while cursor.alive:
+                async for message in cursor:
+                    if not caught_up:
+                        caught_up, skipped_to = message["_id"] == last_id, message["_id"]
+                        continue
+                    last_id = message["_id"]
+                    if message.get("origin") != self.worker_id and message.get("cache"):
+                        self._apply(message["cache"], message.get("key"))
+                if not caught_up:
+                    # The resume point was overwritten, so messages may have been missed
+                    self._invalidate_all()
+                    caught_up, last_id = True, skipped_to
+            await asyncio.sleep(0.1)
+
+    async def _run(self):
+        while True:
+            try:
+                await self._tail()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation tail failed, retrying: {e}")
+                # Anything missed meanwhile ages out through the cache TTLs
+                self._invalidate_all()
+                await asyncio.sleep(1)
+
+    async def start(self):
+        try:
+            await self._ensure_collection()
+        except Exception as e:
+            logger.warning(f"Cache invalidation bus unavailable, caches are local only: {e}")
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,367 @@
+"""Near-duplicate report detection.
+
+Several people often report the same incident in slightly different words.
+Each report's ``crime_details`` is reduced to its content words and
+summarised by a MinHash signature (one-permutation hashing: every shingle is
+hashed once into one of ``SIGNATURE_SIZE`` bins, and empty bins borrow from
+their neighbour). Signatures are split into bands for an LSH index, so only
+reports sharing a band are compared. A candidate counts as a duplicate when
+its estimated text similarity reaches the threshold and it is close by, in
+the same city with a ``crime_time`` within ``window_hours``, and within
+``radius_m`` when both reports have coordinates (else in the same location
+bucket).
+
+The index lives in memory in every worker. Signatures are persisted to
+``report_signatures``, which is loaded at startup and polled for other
+workers' reports; they expire after two windows. A new report is linked to the earliest report of its
+cluster with ``duplicate_of``. Existing reports are linked by a backfill:
+
+    python duplicates.py
+    python duplicates.py --city Bhopal
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from geo import EARTH_RADIUS_METERS
+from partitions import normalize_city
+from trends import location_bucket
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_SIZE = 64
+BANDS = 16
+ROWS_PER_BAND = SIGNATURE_SIZE // BANDS
+DEFAULT_THRESHOLD = 0.5
+DEFAULT_WINDOW_HOURS = 24
+DEFAULT_RADIUS_METERS = 1000
+
+_BIN_BITS = SIGNATURE_SIZE.bit_length() - 1
+# Bin minimums keep 52 bits so a densified value (offset by up to SIGNATURE_SIZE) still fits a BSON int64
+_VALUE_BITS = 52
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+STOP_WORDS = frozenset(
+    "a an the of to in on at by for from and or but is are was were be been being it its this that these those "
+    "there here they them their he she his her him i me my we us our you your with as into about near one some "
+    "all any also just very has have had do did does not no so then than too".split()
+)
+
+BACKFILL_BATCH_SIZE = 1000
+
+SIGNATURE_INDEXES = [
+    ("report_id", {"unique": True}),
+    ("indexed_at", {}),
+]
+
+
+def shingles(text: str) -> set:
+    """Content words of the text; word order and filler words change too much between retellings"""
+    words = _NON_WORD.sub(" ", (text or "").lower()).split()
+    return {word for word in words if word not in STOP_WORDS} or set(words) or {""}
+
+
+def signature(text: str) -> List[int]:
+    """One-permutation MinHash signature of the text's shingles"""
+    bins = [None] * SIGNATURE_SIZE
+    for shingle in shingles(text):
+        value = int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "little")
+        position, value = value & (SIGNATURE_SIZE - 1), (value >> _BIN_BITS) & ((1 << _VALUE_BITS) - 1)
+        if bins[position] is None or value < bins[position]:
+            bins[position] = value
+
+    # Empty bins take the next filled bin's value (wrapping around), offset by the distance
+    signature, nearest = list(bins), None
+    for position in range(2 * SIGNATURE_SIZE - 1, -1, -1):
+        if bins[position % SIGNATURE_SIZE] is not None:
+            nearest = position
+        elif position < SIGNATURE_SIZE:
+            signature[position] = bins[nearest % SIGNATURE_SIZE] + ((nearest - position) << _VALUE_BITS)
+    return signature
+
+
+def band_keys(city: str, signature: List[int]) -> List[tuple]:
+    """LSH buckets of a signature; reports in different cities never share one"""
+    return [
+        (city, band, *signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])
+        for band in range(BANDS)
+    ]
+
+
+def similarity(a: List[int], b: List[int]) -> float:
+    """Estimated Jaccard similarity of the texts behind two signatures"""
+    return sum(x == y for x, y in zip(a, b)) / SIGNATURE_SIZE
+
+
+def distance_meters(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    lng1, lat1, lng2, lat2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(h))
+
+
+def _utc(moment: datetime) -> datetime:
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment
+
+
+@dataclass
+class Entry:
+    report_id: str
+    city: str
+    location: str
+    point: Optional[Tuple[float, float]]
+    crime_time: datetime
+    created_at: datetime
+    signature: List[int]
+    duplicate_of: Optional[str] = None
+
+    @classmethod
+    def from_report(cls, report: dict) -> "Entry":
+        coordinates = report.get("coordinates")
+        return cls(
+            report_id=report["id"],
+            city=report["city"],
+            location=location_bucket(report.get("location")),
+            point=tuple(coordinates["coordinates"]) if coordinates else None,
+            crime_time=_utc(report["crime_time"]),
+            created_at=_utc(report["created_at"]),
+            signature=signature(report.get("crime_details", "")),
+            duplicate_of=report.get("duplicate_of"),
+        )
+
+    @classmethod
+    def from_document(cls, document: dict) -> "Entry":
+        return cls(
+            report_id=document["report_id"],
+            city=document["city"],
+            location=document["location"],
+            point=tuple(document["point"]) if document.get("point") else None,
+            crime_time=_utc(document["crime_time"]),
+            created_at=_utc(document["created_at"]),
+            signature=document["signature"],
+            duplicate_of=document.get("duplicate_of"),
+        )
+
+    def document(self) -> dict:
+        return {
+            "report_id": self.report_id,
+            "city": self.city,
+            "location": self.location,
+            "point": list(self.point) if self.point else None,
+            "crime_time": self.crime_time,
+            "created_at": self.created_at,
+            "signature": self.signature,
+            "duplicate_of": self.duplicate_of,
+            "indexed_at": datetime.now(timezone.utc),
+        }
+
+
+class DuplicateIndex:
+    def __init__(
+        self,
+        db,
+        threshold: float = DEFAULT_THRESHOLD,
+        window_hours: float = DEFAULT_WINDOW_HOURS,
+        radius_m: float = DEFAULT_RADIUS_METERS,
+        sync_interval: float = 2.0,
+    ):
+        self.db = db
+        self.threshold = threshold
+        self.window = timedelta(hours=window_hours)
+        self.radius_m = radius_m
+        self.sync_interval = sync_interval
+        self._entries: Dict[str, Entry] = {}
+        self._buckets: Dict[tuple, set] = defaultdict(set)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def collection(self):
+        return self.db.report_signatures
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _close(self, a: Entry, b: Entry) -> bool:
+        if a.city != b.city or abs(a.crime_time - b.crime_time) > self.window:
+            return False
+        if a.point and b.point:
+            return distance_meters(a.point, b.point) <= self.radius_m
+        return a.location == b.location
+
+    def match(self, entry: Entry) -> Optional[Tuple[str, float]]:
+        """Earliest report of the best-matching cluster and the similarity, if any"""
+        candidates = set()
+        for key in band_keys(entry.city, entry.signature):
+            candidates |= self._buckets.get(key, set())
+        candidates.discard(entry.report_id)
+
+        best, best_rank = None, None
+        for report_id in candidates:
+            candidate = self._entries[report_id]
+            if not self._close(entry, candidate):
+                continue
+            score = similarity(entry.signature, candidate.signature)
+            # Most similar first, then the earliest report
+            rank = (score, -candidate.created_at.timestamp())
+            if score >= self.threshold and (best_rank is None or rank > best_rank):
+                best, best_rank = candidate, rank
+        if best is None:
+            return None
+        return best.duplicate_of or best.report_id, round(best_rank[0], 3)
+
+    def add(self, entry: Entry):
+        self.remove(entry.report_id)
+        self._entries[entry.report_id] = entry
+        for key in band_keys(entry.city, entry.signature):
+            self._buckets[key].add(entry.report_id)
+
+    def remove(self, report_id: str):
+        entry = self._entries.pop(report_id, None)
+        if entry is None:
+            return
+        for key in band_keys(entry.city, entry.signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(report_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def prune(self, now: Optional[datetime] = None):
+        """Drop reports too old to be matched by anything submitted from ``now`` on"""
+        cutoff = (now or datetime.now(timezone.utc)) - 2 * self.window
+        for report_id in [report_id for report_id, entry in self._entries.items() if entry.created_at < cutoff]:
+            self.remove(report_id)
+
+    async def record(self, entry: Entry):
+        """Add a stored report to this worker's index and persist it for the others"""
+        self.add(entry)
+        await self.collection.update_one({"report_id": entry.report_id}, {"$set": entry.document()}, upsert=True)
+
+    async def _load(self, query: dict):
+        async for document in self.collection.find(query, {"_id": 0}):
+            self.add(Entry.from_document(document))
+
+    async def _run(self):
+        since = datetime.now(timezone.utc)
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                polled_at = datetime.now(timezone.utc)
+                # Overlap the polls a little; re-adding a known report is harmless
+                await self._load({"indexed_at": {"$gte": since - timedelta(seconds=self.sync_interval)}})
+                since = polled_at
+                self.prune()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Duplicate index sync failed, retrying: {e}")
+
+    async def start(self):
+        try:
+            await self._load({"created_at": {"$gte": datetime.now(timezone.utc) - 2 * self.window}})
+        except Exception as e:
+            logger.warning(f"Duplicate index could not be loaded: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+async def ensure_indexes(db, window_hours: float = DEFAULT_WINDOW_HOURS):
+    for keys, options in SIGNATURE_INDEXES:
+        await db.report_signatures.create_index(keys, **options)
+
+    # Signatures are only matched within two windows, so they expire after that
+    expire_after = int(2 * window_hours * 3600)
+    existing = (await db.report_signatures.index_information()).get("created_at_1")
+    if existing and existing.get("expireAfterSeconds") != expire_after:
+        await db.report_signatures.drop_index("created_at_1")
+    await db.report_signatures.create_index("created_at", expireAfterSeconds=expire_after)
+
+
+async def backfill(db, city: Optional[str] = None, batch_size: int = BACKFILL_BATCH_SIZE, **options) -> dict:
+    """Re-link every stored report to its duplicates, oldest first, and refresh the recent signatures
+
+    Writes go out in batches of ``batch_size``, so memory only holds the
+    matching window and the cluster counts. Signatures are upserted per
+    report, which leaves ones recorded by live workers in the meantime alone.
+    """
+    query = {"city": normalize_city(city)} if city else {}
+    index = DuplicateIndex(None, **options)
+    # Only signatures a live index could still match are stored
+    keep_after = datetime.now(timezone.utc) - 2 * index.window
+    projection = {"_id": 0, "id": 1, "city": 1, "location": 1, "coordinates": 1, "crime_time": 1,
+                  "created_at": 1, "crime_details": 1, "duplicate_of": 1, "duplicate_score": 1}
+
+    updates, signatures, counts, reports, duplicates = [], [], defaultdict(int), 0, 0
+
+    async def flush(force: bool = False):
+        nonlocal updates, signatures
+        if updates and (force or len(updates) >= batch_size):
+            await db.crime_reports.bulk_write(updates, ordered=False)
+            updates = []
+        if signatures and (force or len(signatures) >= batch_size):
+            await db.report_signatures.bulk_write(signatures, ordered=False)
+            signatures = []
+
+    async for report in db.crime_reports.find(query, projection).sort("created_at", 1):
+        reports += 1
+        entry = Entry.from_report({**report, "duplicate_of": None})
+        index.prune(entry.created_at)
+        match = index.match(entry)
+        if match:
+            entry.duplicate_of, score = match
+            counts[(entry.city, entry.duplicate_of)] += 1
+            duplicates += 1
+        else:
+            score = None
+        index.add(entry)
+        if entry.created_at >= keep_after:
+            signatures.append(UpdateOne({"report_id": entry.report_id}, {"$set": entry.document()}, upsert=True))
+        if (report.get("duplicate_of"), report.get("duplicate_score")) != (entry.duplicate_of, score):
+            updates.append(UpdateOne({"city": report["city"], "id": report["id"]},
+                                     {"$set": {"duplicate_of": entry.duplicate_of, "duplicate_score": score}}))
+        await flush()
+    await flush(force=True)
+
+    # Counts are reset everywhere first, then set on the canonical reports
+    await db.crime_reports.update_many({**query, "duplicate_count": {"$gt": 0}}, {"$set": {"duplicate_count": 0}})
+    for (report_city, report_id), count in counts.items():
+        updates.append(UpdateOne({"city": report_city, "id": report_id}, {"$set": {"duplicate_count": count}}))
+        await flush()
+    await flush(force=True)
+    return {"reports": reports, "duplicates": duplicates, "clusters": len(counts)}
+
+
+async def _main(args):
+    import server
+
+    server.init_db(server.create_mongo_client())
+    try:
+        await ensure_indexes(server.db, server.DUPLICATE_OPTIONS["window_hours"])
+        result = await backfill(server.db, args.city, **server.DUPLICATE_OPTIONS)
+    finally:
+        server.client.close()
+    print(json.dumps(result, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Link near-duplicate reports and rebuild their signatures")
+    parser.add_argument("--city", help="Only backfill this city's reports")
+    args = parser.parse_args()
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
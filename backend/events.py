@@ -0,0 +1,147 @@
+"""Per-city pub/sub for the live report feed.
+
+Events are formatted once as Server-Sent Events frames and fanned out to
+each subscriber's bounded queue. A subscriber whose queue fills up is a
+slow consumer: it is evicted and told so, instead of letting its backlog
+grow without limit.
+
+When MongoDB runs as a replica set the broker tails a change stream on
+``crime_reports`` so every worker sees every write. On a standalone server
+it falls back to events emitted in-process by the route handlers.
+"""
+import asyncio
+import json
+import logging
+from typing import Dict, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+
+logger = logging.getLogger(__name__)
+
+STATS_FIELDS = ("avg_credibility", "total_ratings", "comments_count")
+
+EVICTED_FRAME = "event: evicted\ndata: {}\n\n"
+
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+class Subscription:
+    def __init__(self, city: str, max_queue_size: int):
+        self.city = city
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self.evicted = False
+
+    async def get(self) -> str:
+        return await self.queue.get()
+
+
+class EventBroker:
+    def __init__(self, max_queue_size: int = 100):
+        self.max_queue_size = max_queue_size
+        self.change_stream_active = False
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def subscribe(self, city: str) -> Subscription:
+        subscription = Subscription(city, self.max_queue_size)
+        self._subscribers.setdefault(city, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.city)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.city]
+
+    def _evict(self, subscription: Subscription):
+        logger.warning(f"Evicting slow live feed subscriber for {subscription.city}")
+        subscription.evicted = True
+        self.unsubscribe(subscription)
+        # Drop the backlog so the eviction notice is the next thing it reads
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(EVICTED_FRAME)
+
+    def publish(self, city: str, event: str, data: dict):
+        subscribers = self._subscribers.get(city)
+        if not subscribers:
+            return
+
+        frame = format_sse(event, data)
+        for subscription in list(subscribers):
+            try:
+                subscription.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                self._evict(subscription)
+
+    def emit(self, city: str, event: str, data: dict):
+        """Publish from a route handler unless the change stream already covers it"""
+        if not self.change_stream_active:
+            self.publish(city, event, data)
+
+    def _dispatch_change(self, change: dict):
+        document = change.get("fullDocument")
+        if not document:
+            return
+
+        if change["operationType"] == "insert":
+            document.pop("_id", None)
+            document.pop("image_base64", None)
+            self.publish(document["city"], "new", document)
+        elif change["operationType"] == "update":
+            updated_fields = change.get("updateDescription", {}).get("updatedFields", {})
+            if "is_blocked" in updated_fields:
+                self.publish(document["city"], "blocked", {
+                    "id": document["id"],
+                    "is_blocked": updated_fields["is_blocked"]
+                })
+            elif any(field in updated_fields for field in STATS_FIELDS):
+                self.publish(document["city"], "stats", {
+                    "id": document["id"],
+                    **{field: document.get(field) for field in STATS_FIELDS}
+                })
+
+    async def start_change_stream(self, collection) -> bool:
+        try:
+            stream = collection.watch(
+                [{"$match": {"operationType": {"$in": ["insert", "update"]}}}],
+                full_document="updateLookup"
+            )
+            # Opening the cursor fails straight away on a standalone server
+            change = await stream.try_next()
+        except Exception as e:
+            logger.info(f"Change streams unavailable, using in-process events: {e}")
+            return False
+
+        if change:
+            self._dispatch_change(change)
+        self.change_stream_active = True
+        self._task = asyncio.create_task(self._consume(stream))
+        return True
+
+    async def _consume(self, stream):
+        try:
+            async for change in stream:
+                self._dispatch_change(change)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Change stream failed, falling back to in-process events: {e}")
+            self.change_stream_active = False
+        finally:
+            await stream.close()
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.change_stream_active = False
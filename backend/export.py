@@ -0,0 +1,61 @@
+"""Streaming export of reports, comments and ratings as NDJSON or CSV.
+
+Documents are pulled from an async Motor cursor in batches and written out
+one chunk per batch, so an export never holds more than a batch in memory.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, List
+
+DEFAULT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if value is None:
+        return ""
+    # Structured fields (e.g. GeoJSON coordinates) are written as JSON so imports can read them back
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_json_default)
+    return value
+
+
+async def stream_documents(cursor, fmt: str, fields: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> AsyncIterator[str]:
+    """Yield ``cursor`` documents as NDJSON lines or CSV rows, one chunk per batch"""
+    buffer = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+
+    pending = 0
+    async for document in cursor:
+        if writer:
+            writer.writerow({field: _csv_value(document.get(field)) for field in fields})
+        else:
+            buffer.write(json.dumps(document, default=_json_default))
+            buffer.write("\n")
+
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if buffer.tell():
+        yield buffer.getvalue()
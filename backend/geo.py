@@ -0,0 +1,92 @@
+"""Geospatial report queries.
+
+Reports may carry a GeoJSON point in ``coordinates``, indexed together with
+``city`` by a 2dsphere index. Feed queries can be limited to a circle
+(``near=lng,lat`` and ``radius_m``) or a box (``bbox=minLng,minLat,maxLng,maxLat``).
+Both use ``$geoWithin``, which doesn't reorder results, so the feed keeps its
+newest-first order and keyset paging. Radius and box size are capped so a
+query can never cover more than a city-sized area.
+"""
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+EARTH_RADIUS_METERS = 6378100
+MAX_RADIUS_METERS = 20000
+MAX_BBOX_SPAN_DEGREES = 1.0
+
+
+def _parse_floats(value: str, count: int, name: str) -> List[float]:
+    try:
+        numbers = [float(part) for part in value.split(",")]
+    except ValueError:
+        raise ValueError(f"{name} must be {count} comma-separated numbers")
+    if len(numbers) != count:
+        raise ValueError(f"{name} must be {count} comma-separated numbers")
+    return numbers
+
+
+def _check_point(lng: float, lat: float, name: str):
+    if not -180 <= lng <= 180 or not -90 <= lat <= 90:
+        raise ValueError(f"{name} is outside valid longitude/latitude ranges")
+
+
+def parse_point(value: str) -> Tuple[float, float]:
+    """Parse "lng,lat" (GeoJSON order)"""
+    lng, lat = _parse_floats(value, 2, "near")
+    _check_point(lng, lat, "near")
+    return lng, lat
+
+
+def parse_bbox(value: str) -> Tuple[float, float, float, float]:
+    """Parse "minLng,minLat,maxLng,maxLat" """
+    min_lng, min_lat, max_lng, max_lat = _parse_floats(value, 4, "bbox")
+    _check_point(min_lng, min_lat, "bbox")
+    _check_point(max_lng, max_lat, "bbox")
+    if min_lng >= max_lng or min_lat >= max_lat:
+        raise ValueError("bbox minimums must be below its maximums")
+    if max_lng - min_lng > MAX_BBOX_SPAN_DEGREES or max_lat - min_lat > MAX_BBOX_SPAN_DEGREES:
+        raise ValueError(f"bbox may span at most {MAX_BBOX_SPAN_DEGREES} degrees")
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def geo_conditions(near: Optional[str] = None, radius_m: float = 1000, bbox: Optional[str] = None) -> List[dict]:
+    """Conditions on ``coordinates`` for a near and/or bbox query, to be ANDed into the feed query"""
+    conditions = []
+    if near:
+        if not 0 < radius_m <= MAX_RADIUS_METERS:
+            raise ValueError(f"radius_m must be between 0 and {MAX_RADIUS_METERS}")
+        lng, lat = parse_point(near)
+        conditions.append({"coordinates": {
+            "$geoWithin": {"$centerSphere": [[lng, lat], radius_m / EARTH_RADIUS_METERS]}
+        }})
+    if bbox:
+        min_lng, min_lat, max_lng, max_lat = parse_bbox(bbox)
+        conditions.append({"coordinates": {"$geoWithin": {"$geometry": {"type": "Polygon", "coordinates": [[
+            [min_lng, min_lat], [max_lng, min_lat], [max_lng, max_lat], [min_lng, max_lat], [min_lng, min_lat]
+        ]]}}}})
+    return conditions
+
+
+def encode_cursor(created_at: datetime, report_id: str) -> str:
+    """Opaque keyset cursor pointing just past the given report"""
+    raw = f"{created_at.isoformat()}|{report_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, report_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), report_id
+    except ValueError:
+        raise ValueError("Invalid cursor")
+
+
+def keyset_filter(cursor: str) -> dict:
+    """Reports after ``cursor`` in (created_at desc, id desc) order"""
+    created_at, report_id = decode_cursor(cursor)
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "id": {"$lt": report_id}},
+    ]}
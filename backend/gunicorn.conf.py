@@ -0,0 +1,28 @@
+"""Production entry point: N uvicorn workers under gunicorn.
+
+    cd backend && gunicorn -c gunicorn.conf.py server:app
+
+Each worker keeps its own user, crime-type and feed caches; they stay
+coherent through the Mongo-backed invalidation bus in cache.py. Background
+jobs are shared through the jobs collection. The live feed reaches
+subscribers on every worker only when MongoDB runs as a replica set
+(change streams); on a standalone server each worker only sees its own
+writes.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.environ.get("WORKER_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's samples from the shared Prometheus metrics
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
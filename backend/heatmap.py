@@ -0,0 +1,166 @@
+"""Precomputed crime density tiles.
+
+Every report with coordinates is counted in one web-mercator tile (z/x/y)
+per zoom level from ``MIN_ZOOM`` to ``MAX_ZOOM``, split by crime type. The
+counts are kept up to date with ``$inc`` upserts when reports are created,
+blocked or unblocked, so serving a heatmap is an index range read over a
+few hundred small documents rather than a scan of the reports.
+
+Archived reports stay counted. Bulk imports and historical data are
+counted by a rebuild:
+
+    python heatmap.py
+    python heatmap.py --city Bhopal
+
+A rebuild doesn't stop live updates. Recounted tiles are written over the
+current ones and tagged with the rebuild's id. Only then are tiles left
+over from earlier rebuilds deleted, so a heatmap is never read half
+empty. Reports are read one by one, not as a snapshot. A report created,
+blocked or unblocked in a city while its tiles are being rebuilt can
+therefore be counted twice or not at all, until the next rebuild of that
+city.
+"""
+import argparse
+import asyncio
+import json
+import math
+import uuid
+from collections import Counter, defaultdict
+from typing import Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from partitions import normalize_city
+
+MIN_ZOOM = 8
+MAX_ZOOM = 16
+MAX_TILES = 10000
+
+TILE_INDEXES = [
+    ([("city", 1), ("zoom", 1), ("x", 1), ("y", 1), ("crime_type", 1)], {"unique": True}),
+]
+
+
+def tile_for(lng: float, lat: float, zoom: int) -> Tuple[int, int]:
+    """Web-mercator tile containing the point"""
+    scale = 2 ** zoom
+    lat = max(min(lat, 85.0511), -85.0511)
+    lat_rad = math.radians(lat)
+    x = int((lng + 180) / 360 * scale)
+    y = int((1 - math.log(math.tan(lat_rad) + 1 / math.cos(lat_rad)) / math.pi) / 2 * scale)
+    return min(x, scale - 1), min(y, scale - 1)
+
+
+def tile_center(x: int, y: int, zoom: int) -> Tuple[float, float]:
+    scale = 2 ** zoom
+    lng = (x + 0.5) / scale * 360 - 180
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 0.5) / scale))))
+    return round(lng, 6), round(lat, 6)
+
+
+def _tile_keys(report: dict) -> Iterable[dict]:
+    lng, lat = report["coordinates"]["coordinates"]
+    for zoom in range(MIN_ZOOM, MAX_ZOOM + 1):
+        x, y = tile_for(lng, lat, zoom)
+        yield {"city": report["city"], "zoom": zoom, "x": x, "y": y, "crime_type": report["crime_type"]}
+
+
+async def ensure_indexes(db):
+    for keys, options in TILE_INDEXES:
+        await db.heatmap_tiles.create_index(keys, **options)
+
+
+async def record_report(db, report: dict, delta: int = 1):
+    """Add (or with ``delta=-1`` remove) a report's contribution to its tiles"""
+    if not report.get("coordinates"):
+        return
+    await db.heatmap_tiles.bulk_write(
+        [UpdateOne(key, {"$inc": {"count": delta}}, upsert=True) for key in _tile_keys(report)],
+        ordered=False
+    )
+
+
+async def get_tiles(
+    db,
+    city: str,
+    zoom: int,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+    crime_type: Optional[str] = None,
+) -> dict:
+    zoom = max(MIN_ZOOM, min(zoom, MAX_ZOOM))
+    query = {"city": normalize_city(city), "zoom": zoom, "count": {"$gt": 0}}
+    if bbox:
+        min_lng, min_lat, max_lng, max_lat = bbox
+        min_x, min_y = tile_for(min_lng, max_lat, zoom)
+        max_x, max_y = tile_for(max_lng, min_lat, zoom)
+        query["x"] = {"$gte": min_x, "$lte": max_x}
+        query["y"] = {"$gte": min_y, "$lte": max_y}
+    if crime_type:
+        query["crime_type"] = crime_type
+
+    tiles = defaultdict(lambda: {"count": 0, "by_type": {}})
+    cursor = db.heatmap_tiles.find(query, {"_id": 0, "x": 1, "y": 1, "crime_type": 1, "count": 1})
+    async for document in cursor.limit(MAX_TILES):
+        tile = tiles[(document["x"], document["y"])]
+        tile["count"] += document["count"]
+        tile["by_type"][document["crime_type"]] = document["count"]
+
+    result = []
+    for (x, y), tile in tiles.items():
+        lng, lat = tile_center(x, y, zoom)
+        result.append({"x": x, "y": y, "lng": lng, "lat": lat, **tile})
+    result.sort(key=lambda tile: tile["count"], reverse=True)
+    return {"city": normalize_city(city), "zoom": zoom, "tiles": result}
+
+
+async def rebuild(db, city: Optional[str] = None) -> dict:
+    """Recount tiles from every stored report (hot and archived), replacing the current counts"""
+    query = {"coordinates": {"$ne": None}, "is_blocked": {"$ne": True}}
+    if city:
+        query["city"] = normalize_city(city)
+
+    # Tiles that exist now are replaced; tiles live updates create from here on are kept
+    tiles = {"city": normalize_city(city)} if city else {}
+    await db.heatmap_tiles.update_many({**tiles, "rebuild_id": {"$exists": False}}, {"$set": {"rebuild_id": None}})
+
+    counts = Counter()
+    reports = 0
+    projection = {"_id": 0, "city": 1, "crime_type": 1, "coordinates": 1}
+    for collection in (db.crime_reports, db.crime_reports_archive):
+        async for report in collection.find(query, projection):
+            reports += 1
+            for key in _tile_keys(report):
+                counts[tuple(key.items())] += 1
+
+    rebuild_id = uuid.uuid4().hex
+    operations: List = [
+        UpdateOne(dict(key), {"$set": {"count": count, "rebuild_id": rebuild_id}}, upsert=True)
+        for key, count in counts.items()
+    ]
+    if operations:
+        await db.heatmap_tiles.bulk_write(operations, ordered=False)
+    await db.heatmap_tiles.delete_many({**tiles, "rebuild_id": {"$exists": True, "$ne": rebuild_id}})
+    return {"reports": reports, "tiles": len(counts)}
+
+
+async def _main(args):
+    import server
+
+    server.init_db(server.create_mongo_client())
+    try:
+        await ensure_indexes(server.db)
+        result = await rebuild(server.db, args.city)
+    finally:
+        server.client.close()
+    print(json.dumps(result, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild heatmap tile counts from stored reports")
+    parser.add_argument("--city", help="Only rebuild this city's tiles")
+    args = parser.parse_args()
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Idempotency keys for write requests.
+
+A POST/PUT/PATCH/DELETE carrying an ``Idempotency-Key`` header is claimed
+in the ``idempotency_keys`` collection before it runs, and its response is
+stored once it completes. A retry with the same key (from the same user, to
+the same route) gets the stored response back with ``Idempotent-Replayed:
+true`` instead of running the handler again, so image compression and
+inserts happen once. Keys expire after ``ttl_seconds``.
+
+Keys are scoped to the signed-in user. Requests without a valid token
+(register, login) have no scope that only their sender shares, and their
+responses carry fresh tokens, so the header is ignored for them. Uploads
+to ``EXCLUDED_PATHS`` are too large to buffer and are never deduplicated.
+
+Reusing a key with a different body is rejected with 422. A retry that
+arrives while the first attempt is still running gets 409. Server errors
+are not stored, so the request can be retried for real. A claim whose
+worker died is taken over once its lease expires.
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import jwt
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+MAX_KEY_LENGTH = 255
+MAX_STORED_BODY_BYTES = 1024 * 1024
+# Bulk CSV imports stream their upload straight to the parser
+EXCLUDED_PATHS = ("/api/admin/import",)
+
+
+def _as_utc(moment: datetime) -> datetime:
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment
+
+
+class IdempotencyStore:
+    def __init__(self, collection, ttl_seconds: int = 86400, lease_seconds: int = 60):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+
+    async def init_indexes(self):
+        await self.collection.create_index("created_at", expireAfterSeconds=self.ttl_seconds)
+
+    async def claim(self, key_id: str, fingerprint: str) -> Optional[dict]:
+        """Claim ``key_id`` for this request, or return the record of whoever has it"""
+        now = datetime.now(timezone.utc)
+        record = {
+            "_id": key_id,
+            "fingerprint": fingerprint,
+            "status": "processing",
+            "locked_until": now + timedelta(seconds=self.lease_seconds),
+            "created_at": now,
+        }
+        try:
+            await self.collection.insert_one(record)
+            return None
+        except DuplicateKeyError:
+            pass
+
+        existing = await self.collection.find_one({"_id": key_id})
+        if existing and existing["status"] == "processing" and _as_utc(existing["locked_until"]) <= now:
+            # The first attempt's worker died; take the key over
+            taken = await self.collection.find_one_and_update(
+                {"_id": key_id, "status": "processing", "locked_until": existing["locked_until"]},
+                {"$set": {"fingerprint": fingerprint, "locked_until": record["locked_until"]}},
+                return_document=ReturnDocument.AFTER,
+            )
+            if taken:
+                return None
+            existing = await self.collection.find_one({"_id": key_id})
+        return existing
+
+    async def complete(self, key_id: str, status: int, headers: list, body: bytes):
+        await self.collection.update_one(
+            {"_id": key_id},
+            {"$set": {"status": "completed", "response": {"status": status, "headers": headers, "body": body}}}
+        )
+
+    async def release(self, key_id: str):
+        await self.collection.delete_one({"_id": key_id, "status": "processing"})
+
+
+def _fingerprint(query_string: bytes, content_type: bytes, body: bytes) -> str:
+    # Clients pick a new multipart boundary for every attempt, so it's left out
+    _, _, boundary = content_type.partition(b"boundary=")
+    boundary = boundary.split(b";")[0].strip(b'" ')
+    if boundary:
+        body = body.replace(boundary, b"")
+    return hashlib.sha256(query_string + b"?" + body).hexdigest()
+
+
+async def _send_json(send, status: int, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app, store: IdempotencyStore, jwt_secret: str, jwt_algorithm: str):
+        self.app = app
+        self.store = store
+        self.jwt_secret = jwt_secret
+        self.jwt_algorithm = jwt_algorithm
+
+    def _user_id(self, headers: dict) -> Optional[str]:
+        authorization = headers.get(b"authorization", b"").decode()
+        if authorization.startswith("Bearer "):
+            try:
+                payload = jwt.decode(authorization[7:], self.jwt_secret, algorithms=[self.jwt_algorithm])
+                return payload.get("user_id")
+            except jwt.InvalidTokenError:
+                pass
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        key = headers.get(IDEMPOTENCY_HEADER)
+        if key is None or scope["path"].rstrip("/") in EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        user_id = self._user_id(headers)
+        if user_id is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+            return
+
+        # The body is buffered so it can be fingerprinted before the handler runs
+        messages, body = [], []
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            body.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        fingerprint = _fingerprint(scope.get("query_string", b""), headers.get(b"content-type", b""), b"".join(body))
+
+        scope_key = f"{user_id}:{scope['method']}:{scope['path']}:{key.decode('latin-1')}"
+        key_id = hashlib.sha256(scope_key.encode()).hexdigest()
+
+        existing = await self.store.claim(key_id, fingerprint)
+        if existing is not None:
+            if existing["fingerprint"] != fingerprint:
+                await _send_json(send, 422, "Idempotency-Key was already used with a different request")
+            elif existing["status"] != "completed":
+                await _send_json(send, 409, "A request with this Idempotency-Key is still being processed")
+            else:
+                response = existing["response"]
+                await send({
+                    "type": "http.response.start",
+                    "status": response["status"],
+                    "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in response["headers"]]
+                    + [(REPLAYED_HEADER.lower().encode(), b"true")],
+                })
+                await send({"type": "http.response.body", "body": bytes(response["body"])})
+            return
+
+        async def replay_receive():
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        status, response_headers, chunks, size = 500, [], [], 0
+
+        async def send_wrapper(message):
+            nonlocal status, response_headers, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = [
+                    (name.decode("latin-1"), value.decode("latin-1")) for name, value in message.get("headers", [])
+                ]
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                if size <= MAX_STORED_BODY_BYTES:
+                    chunks.append(chunk)
+            await send(message)
+
+        stored = False
+        try:
+            await self.app(scope, replay_receive, send_wrapper)
+            # Server errors aren't stored, so a retry runs the request again
+            if status < 500 and size <= MAX_STORED_BODY_BYTES:
+                await self.store.complete(key_id, status, response_headers, b"".join(chunks))
+                stored = True
+        finally:
+            if not stored:
+                try:
+                    await self.store.release(key_id)
+                except Exception as e:
+                    logger.warning(f"Could not release idempotency key: {e}")
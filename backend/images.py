@@ -0,0 +1,224 @@
+"""Reuse of already-processed report images.
+
+The same photo is often attached to several reports. Every upload gets an
+exact key (SHA-256 of the bytes) and a perceptual key (a 64-bit difference
+hash, which survives resizing and recompression). ``processed_images`` maps
+each key to a report that already holds the compressed image. On an exact
+match the stored image is copied and ``compress_image`` is skipped; the
+bytes are identical, so the result is the same as compressing them again.
+Blocked and anonymous reports are never used as a source.
+
+Perceptual keys go in a BK-tree in every worker's memory, so near matches
+within ``max_distance`` bits are found without a scan. A near match may
+still be a different photo (another angle, a crop, someone else's shot of
+the same scene), so it is only reported, never swapped in for the upload.
+
+The tree holds images processed in the last ``retention_days``. It is
+loaded at startup, polled for images processed by other workers, and
+rebuilt daily so older images drop out.
+"""
+import asyncio
+import hashlib
+import io
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8
+# Flat or smooth images hash to (nearly) all zeros and would match each other, so they only match exactly
+MIN_DETAIL_BITS = 8
+DEFAULT_MAX_DISTANCE = 6
+DEFAULT_RETENTION_DAYS = 30
+
+PROCESSED_IMAGE_INDEXES = [
+    ("created_at", {}),
+]
+
+
+def perceptual_hash(content: bytes) -> Optional[int]:
+    """64-bit difference hash of an image, or None when it can't be decoded or has too little detail"""
+    # Only uploads need Pillow, so keep it off the import path
+    from PIL import Image
+
+    try:
+        img = Image.open(io.BytesIO(content))
+        # JPEGs can be decoded at a fraction of their size, which is all a hash needs
+        img.draft("L", (HASH_SIZE * 32, HASH_SIZE * 32))
+        pixels = img.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS).tobytes()
+    except Exception:
+        return None
+
+    value = 0
+    for row in range(HASH_SIZE):
+        for column in range(HASH_SIZE):
+            left = pixels[row * (HASH_SIZE + 1) + column]
+            value = (value << 1) | (left > pixels[row * (HASH_SIZE + 1) + column + 1])
+    if not MIN_DETAIL_BITS <= hamming(value, 0) <= HASH_SIZE * HASH_SIZE - MIN_DETAIL_BITS:
+        return None
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """Metric tree over hashes for "everything within d bits of x" lookups"""
+
+    def __init__(self):
+        self._root = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, key: int, value: Any):
+        """Add a hash; a hash that is already present keeps its first value"""
+        if self._root is None:
+            self._root = (key, value, {})
+            self._size = 1
+            return
+        node = self._root
+        while True:
+            distance = hamming(key, node[0])
+            if distance == 0:
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (key, value, {})
+                self._size += 1
+                return
+            node = child
+
+    def search(self, key: int, max_distance: int) -> List[Tuple[int, Any]]:
+        """(distance, value) of every hash within ``max_distance``, nearest first"""
+        found, pending = [], [self._root] if self._root else []
+        while pending:
+            node_key, value, children = pending.pop()
+            distance = hamming(key, node_key)
+            if distance <= max_distance:
+                found.append((distance, value))
+            # Only subtrees at the triangle-inequality band can hold matches
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    pending.append(child)
+        return sorted(found, key=lambda match: match[0])
+
+
+@dataclass
+class ImageKey:
+    sha256: str
+    phash: Optional[int]
+    size: int
+
+
+def image_key(content: bytes) -> ImageKey:
+    return ImageKey(hashlib.sha256(content).hexdigest(), perceptual_hash(content), len(content))
+
+
+def _phash_hex(phash: Optional[int]) -> Optional[str]:
+    # BSON integers are signed 64-bit, so hashes are stored as hex
+    return None if phash is None else f"{phash:016x}"
+
+
+class ImageIndex:
+    def __init__(
+        self,
+        db,
+        max_distance: int = DEFAULT_MAX_DISTANCE,
+        retention_days: float = DEFAULT_RETENTION_DAYS,
+        sync_interval: float = 5.0,
+    ):
+        self.db = db
+        self.max_distance = max_distance
+        self.retention = timedelta(days=retention_days)
+        self.sync_interval = sync_interval
+        self._tree = BKTree()
+        self._built_at = datetime.now(timezone.utc)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def collection(self):
+        return self.db.processed_images
+
+    def __len__(self):
+        return len(self._tree)
+
+    async def _report_image(self, report_id: str) -> Optional[str]:
+        report = await self.db.crime_reports.find_one(
+            {"id": report_id, "image_status": {"$nin": ["pending", "failed"]},
+             "is_blocked": {"$ne": True}, "is_anonymous": {"$ne": True}},
+            {"_id": 0, "image_base64": 1}
+        )
+        return report.get("image_base64") if report else None
+
+    async def find(self, key: ImageKey) -> Tuple[Optional[str], Optional[str]]:
+        """("exact", processed image) for an upload seen before, ("near", None) for a similar one, else (None, None)"""
+        known = await self.collection.find_one({"_id": key.sha256})
+        if known:
+            image_base64 = await self._report_image(known["report_id"])
+            if image_base64:
+                return "exact", image_base64
+
+        if key.phash is not None and self._tree.search(key.phash, self.max_distance):
+            return "near", None
+        return None, None
+
+    async def remember(self, key: ImageKey, report_id: str):
+        """Record that ``report_id`` holds the processed image for this upload"""
+        if key.phash is not None:
+            self._tree.add(key.phash, report_id)
+        await self.collection.update_one(
+            {"_id": key.sha256},
+            {"$set": {"report_id": report_id, "phash": _phash_hex(key.phash), "size": key.size,
+                      "created_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+
+    async def _load(self, since: datetime, tree: BKTree):
+        cursor = self.collection.find({"created_at": {"$gte": since}, "phash": {"$ne": None}})
+        async for document in cursor:
+            tree.add(int(document["phash"], 16), document["report_id"])
+
+    async def _rebuild(self):
+        # Hashes can't be removed from a BK-tree, so expired ones go by building a new one
+        tree, built_at = BKTree(), datetime.now(timezone.utc)
+        await self._load(built_at - self.retention, tree)
+        self._tree, self._built_at = tree, built_at
+
+    async def _run(self):
+        since = datetime.now(timezone.utc)
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                polled_at = datetime.now(timezone.utc)
+                if polled_at - self._built_at > timedelta(days=1):
+                    await self._rebuild()
+                else:
+                    await self._load(since - timedelta(seconds=self.sync_interval), self._tree)
+                since = polled_at
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Image index sync failed, retrying: {e}")
+
+    async def start(self):
+        try:
+            await self._rebuild()
+        except Exception as e:
+            logger.warning(f"Image index could not be loaded: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+async def ensure_indexes(db):
+    for keys, options in PROCESSED_IMAGE_INDEXES:
+        await db.processed_images.create_index(keys, **options)
@@ -0,0 +1,213 @@
+"""In-process background job queue persisted in a MongoDB collection.
+
+Jobs are claimed with ``find_one_and_update`` under a lease, so a job that
+was running when the process died is picked up again once its lease
+expires. Failed jobs are retried with exponential backoff and moved to the
+``dead`` status (the dead-letter set) after ``max_attempts``.
+
+Periodic jobs are enqueued by every worker's scheduler under an id derived
+from the current interval slot, so the unique index on ``id`` lets exactly
+one copy of each run through however many workers are up. Finished
+periodic jobs are kept as ``done`` (expiring after a week) so their slot
+stays taken.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[dict], Awaitable[None]]
+
+
+class JobQueue:
+    def __init__(
+        self,
+        collection,
+        max_attempts: int = 5,
+        concurrency: int = 2,
+        lease_seconds: int = 300,
+        poll_interval: float = 5.0,
+        max_backoff_seconds: int = 600,
+    ):
+        self.collection = collection
+        self.max_attempts = max_attempts
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_backoff_seconds = max_backoff_seconds
+        self._handlers: Dict[str, JobHandler] = {}
+        self._dead_handlers: Dict[str, JobHandler] = {}
+        self._schedules: Dict[str, tuple] = {}
+        self._enqueued_slots: Dict[str, int] = {}
+        self._wakeup = asyncio.Event()
+        self._workers = []
+
+    def register(self, job_type: str, handler: JobHandler, on_dead: Optional[JobHandler] = None):
+        self._handlers[job_type] = handler
+        if on_dead:
+            self._dead_handlers[job_type] = on_dead
+
+    def schedule(self, job_type: str, interval_seconds: float, payload: Optional[dict] = None):
+        """Run ``job_type`` once every ``interval_seconds`` across all workers"""
+        self._schedules[job_type] = (interval_seconds, payload or {})
+
+    async def init_indexes(self):
+        await asyncio.gather(
+            self.collection.create_index([("status", 1), ("run_at", 1)]),
+            self.collection.create_index("id", unique=True),
+            self.collection.create_index("finished_at", expireAfterSeconds=7 * 86400)
+        )
+
+    async def enqueue(self, job_type: str, payload: dict, job_id: Optional[str] = None) -> str:
+        """Queue a job; passing ``job_id`` marks it as a scheduled run that is kept once done"""
+        now = datetime.now(timezone.utc)
+        scheduled = job_id is not None
+        job_id = job_id or str(uuid.uuid4())
+        await self.collection.insert_one({
+            "id": job_id,
+            "type": job_type,
+            "payload": payload,
+            "status": "pending",
+            "attempts": 0,
+            "run_at": now,
+            "locked_until": None,
+            "last_error": None,
+            "scheduled": scheduled,
+            "created_at": now,
+        })
+        self._wakeup.set()
+        return job_id
+
+    async def claim(self) -> Optional[dict]:
+        now = datetime.now(timezone.utc)
+        return await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": "pending", "run_at": {"$lte": now}},
+                # Lease expired: the worker that held it crashed or was restarted
+                {"status": "running", "locked_until": {"$lte": now}},
+            ]},
+            {
+                "$set": {"status": "running", "locked_until": now + timedelta(seconds=self.lease_seconds)},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("run_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def run_once(self) -> bool:
+        """Claim and run a single job, returning False when nothing is due"""
+        job = await self.claim()
+        if not job:
+            return False
+
+        handler = self._handlers.get(job["type"])
+        try:
+            if not handler:
+                raise RuntimeError(f"No handler registered for job type {job['type']}")
+            await handler(job["payload"])
+        except Exception as e:
+            await self._fail(job, e)
+            return True
+
+        if job.get("scheduled"):
+            # Keep the slot id taken so other workers don't enqueue this run again
+            await self.collection.update_one(
+                {"id": job["id"]},
+                {"$set": {"status": "done", "locked_until": None, "finished_at": datetime.now(timezone.utc)}}
+            )
+        else:
+            await self.collection.delete_one({"id": job["id"]})
+        return True
+
+    async def _fail(self, job: dict, error: Exception):
+        if job["attempts"] >= self.max_attempts:
+            logger.error(f"Job {job['id']} ({job['type']}) moved to dead letter: {error}")
+            await self.collection.update_one(
+                {"id": job["id"]},
+                {"$set": {"status": "dead", "locked_until": None, "last_error": str(error)}}
+            )
+            on_dead = self._dead_handlers.get(job["type"])
+            if on_dead:
+                try:
+                    await on_dead(job["payload"])
+                except Exception as e:
+                    logger.error(f"Dead-letter handler for job {job['id']} failed: {e}")
+            return
+
+        backoff = min(2 ** job["attempts"], self.max_backoff_seconds)
+        logger.warning(f"Job {job['id']} ({job['type']}) failed, retrying in {backoff}s: {error}")
+        await self.collection.update_one(
+            {"id": job["id"]},
+            {"$set": {
+                "status": "pending",
+                "locked_until": None,
+                "last_error": str(error),
+                "run_at": datetime.now(timezone.utc) + timedelta(seconds=backoff),
+            }}
+        )
+
+    async def retry(self, job_id: str) -> bool:
+        """Move a dead-lettered job back onto the queue"""
+        result = await self.collection.update_one(
+            {"id": job_id, "status": "dead"},
+            {"$set": {"status": "pending", "attempts": 0, "run_at": datetime.now(timezone.utc)}}
+        )
+        self._wakeup.set()
+        return result.modified_count > 0
+
+    async def _worker(self):
+        while True:
+            try:
+                if await self.run_once():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker error: {e}")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def enqueue_scheduled(self, now: Optional[datetime] = None):
+        """Enqueue every scheduled job whose current slot has not been enqueued yet"""
+        timestamp = (now or datetime.now(timezone.utc)).timestamp()
+        for job_type, (interval_seconds, payload) in self._schedules.items():
+            slot = int(timestamp // interval_seconds)
+            if self._enqueued_slots.get(job_type) == slot:
+                continue
+            try:
+                await self.enqueue(job_type, payload, job_id=f"{job_type}:{slot}")
+            except DuplicateKeyError:
+                pass
+            self._enqueued_slots[job_type] = slot
+
+    async def _scheduler(self):
+        while True:
+            try:
+                await self.enqueue_scheduled()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job scheduler error: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        if self._schedules:
+            self._workers.append(asyncio.create_task(self._scheduler()))
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
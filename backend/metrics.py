@@ -0,0 +1,215 @@
+"""Prometheus metrics for HTTP routes, MongoDB commands and CPU-heavy helpers.
+
+Requests are measured by a plain ASGI middleware labelled with the route
+template (e.g. ``/api/crime-reports/{report_id}``), so label cardinality
+stays bounded. MongoDB commands are timed by a PyMongo command listener
+registered on the client.
+"""
+import os
+import time
+from collections import defaultdict
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from pymongo import monitoring
+
+from profiling import record_db_op
+
+REQUEST_COUNT = Counter(
+    "http_requests_total", "HTTP requests handled", ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled", multiprocess_mode="livesum"
+)
+MONGO_COMMAND_DURATION = Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command round-trip time", ["collection", "command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+MONGO_POOL_CHECKED_OUT = Gauge(
+    "mongodb_pool_checked_out_connections", "MongoDB connections currently checked out", multiprocess_mode="livesum"
+)
+MONGO_POOL_OPEN = Gauge(
+    "mongodb_pool_open_connections", "MongoDB connections currently open", multiprocess_mode="livesum"
+)
+MONGO_POOL_WAITING = Gauge(
+    "mongodb_pool_waiting_requests", "Operations waiting for a MongoDB connection", multiprocess_mode="livesum"
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "mongodb_command_failures_total", "MongoDB commands that returned an error", ["collection", "command"]
+)
+IMAGE_COMPRESSION_DURATION = Histogram(
+    "image_compression_duration_seconds", "Time spent in compress_image",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+BCRYPT_DURATION = Histogram(
+    "bcrypt_duration_seconds", "Time spent hashing or verifying passwords", ["operation"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0),
+)
+
+IMAGE_DEDUP_LOOKUPS = Counter(
+    "image_dedup_lookups_total", "Uploaded images checked against already-processed images (exact, near or miss)", ["result"]
+)
+IMAGE_DEDUP_BYTES_SAVED = Counter(
+    "image_dedup_bytes_saved_total", "Upload bytes that reused a processed image instead of being recompressed"
+)
+HOT_READS = Counter(
+    "hot_reads_total", "Report detail, comment and city stats reads by where they were served from (db, in_flight or cache)",
+    ["route", "source"]
+)
+DUPLICATE_CHECK_DURATION = Histogram(
+    "duplicate_check_duration_seconds", "Time spent signing and matching a new report against the duplicate index",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01),
+)
+DUPLICATE_REPORTS = Counter(
+    "duplicate_reports_total", "New reports linked to an earlier report of the same incident"
+)
+
+
+class PrometheusMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            REQUESTS_IN_FLIGHT.dec()
+            # FastAPI puts the matched route in the scope; unmatched paths share one label
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            REQUEST_COUNT.labels(scope["method"], path, status_code).inc()
+            REQUEST_LATENCY.labels(scope["method"], path).observe(elapsed)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        if not isinstance(collection, str):
+            collection = "none"
+        self._collections[(event.connection_id, event.request_id)] = collection
+
+    def succeeded(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "none")
+        MONGO_COMMAND_DURATION.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        record_db_op(collection, event.command_name, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "none")
+        MONGO_COMMAND_DURATION.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(collection, event.command_name).inc()
+        record_db_op(collection, event.command_name, event.duration_micros / 1e6)
+
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Tracks pool usage for the metrics and the readiness check.
+
+    The client keeps one pool per server, so on a replica set usage is
+    tracked per pool (``event.address``) and the readiness check looks at
+    the busiest one. A checkout in progress only counts as waiting once
+    every connection its pool may open is already checked out; before that
+    it is just being served.
+    """
+
+    def __init__(self, max_pool_size: int = 100):
+        self.max_pool_size = max_pool_size
+        self.checked_out = defaultdict(int)
+        self.open = defaultdict(int)
+        self.pending = defaultdict(int)
+
+    def waiting(self, address) -> int:
+        return max(0, self.checked_out[address] + self.pending[address] - self.max_pool_size)
+
+    def _update(self, address, checked_out=0, open=0, pending=0):
+        self.checked_out[address] += checked_out
+        self.open[address] += open
+        self.pending[address] += pending
+        self._publish()
+
+    def _publish(self):
+        MONGO_POOL_CHECKED_OUT.set(sum(self.checked_out.values()))
+        MONGO_POOL_OPEN.set(sum(self.open.values()))
+        MONGO_POOL_WAITING.set(sum(self.waiting(pool) for pool in list(self.pending)))
+
+    def busiest(self) -> dict:
+        """Usage of the pool closest to saturation"""
+        pools = [
+            {
+                "address": f"{address[0]}:{address[1]}",
+                "open": self.open[address],
+                "checked_out": self.checked_out[address],
+                "waiting": self.waiting(address),
+                "utilization": round(self.checked_out[address] / self.max_pool_size, 3) if self.max_pool_size else 0.0,
+            }
+            for address in set(self.open) | set(self.checked_out) | set(self.pending)
+        ]
+        return max(
+            pools, key=lambda pool: (pool["waiting"], pool["utilization"]),
+            default={"address": None, "open": 0, "checked_out": 0, "waiting": 0, "utilization": 0.0}
+        )
+
+    def connection_created(self, event):
+        self._update(event.address, open=1)
+
+    def connection_closed(self, event):
+        self._update(event.address, open=-1)
+
+    def connection_check_out_started(self, event):
+        self._update(event.address, pending=1)
+
+    def connection_check_out_failed(self, event):
+        self._update(event.address, pending=-1)
+
+    def connection_checked_out(self, event):
+        self._update(event.address, checked_out=1, pending=-1)
+
+    def connection_checked_in(self, event):
+        self._update(event.address, checked_out=-1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        for counts in (self.checked_out, self.open, self.pending):
+            counts.pop(event.address, None)
+        self._publish()
+
+    def connection_ready(self, event):
+        pass
+
+
+def render_metrics():
+    # Under gunicorn with PROMETHEUS_MULTIPROC_DIR set, aggregate every worker's samples
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
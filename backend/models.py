@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Annotated, Any, Dict, List, Literal, Optional, Tuple
 import uuid
 from datetime import datetime, timezone
 
@@ -46,6 +46,11 @@ class CredibilityRating(BaseModel):
 class CredibilityRatingCreate(BaseModel):
     rating: int = Field(ge=0, le=10)
 
+class GeoPoint(BaseModel):
+    """GeoJSON point; coordinates are [longitude, latitude]"""
+    type: Literal["Point"] = "Point"
+    coordinates: Tuple[Annotated[float, Field(ge=-180, le=180)], Annotated[float, Field(ge=-90, le=90)]]
+
 class CrimeReport(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
@@ -53,22 +58,31 @@ class CrimeReport(BaseModel):
     crime_type: str
     location: str
     landmark: Optional[str] = None
+    coordinates: Optional[GeoPoint] = None
     crime_time: datetime
     criminal_name: Optional[str] = None
     crime_details: str
     is_anonymous: bool = False
     city: str = "Bhopal"
     image_base64: Optional[str] = None
+    image_status: Optional[str] = None  # pending, ready or failed when processed in the background
     is_blocked: bool = False
     avg_credibility: float = 0.0
     total_ratings: int = 0
     comments_count: int = 0
+    moderation_priority: float = 0.0
+    hot_score: float = 0.0
+    duplicate_of: Optional[str] = None  # earliest report of the same incident, when this looks like a retelling
+    duplicate_score: Optional[float] = None
+    duplicate_count: int = 0
+    archived_at: Optional[datetime] = None  # set once the report has moved to the archive tier
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class CrimeReportCreate(BaseModel):
     crime_type: str
     location: str
     landmark: Optional[str] = None
+    coordinates: Optional[GeoPoint] = None
     crime_time: datetime
     criminal_name: Optional[str] = None
     crime_details: str
@@ -88,3 +102,46 @@ class CrimeTypeUpdate(BaseModel):
 class ReportBlock(BaseModel):
     is_blocked: bool
     reason: Optional[str] = None
+
+class BulkImportError(BaseModel):
+    row: int
+    error: str
+
+class BulkImportResult(BaseModel):
+    total_rows: int = 0
+    inserted: int = 0
+    failed: int = 0
+    errors: List[BulkImportError] = []
+    cities: List[str] = []  # cities the inserted reports belong to
+    elapsed_seconds: float = 0.0
+    rows_per_second: float = 0.0
+
+class BatchRequestItem(BaseModel):
+    id: Optional[str] = None
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    path: str
+    body: Optional[Any] = None
+
+class BatchRequest(BaseModel):
+    requests: List[BatchRequestItem]
+
+class BatchResponseItem(BaseModel):
+    id: Optional[str] = None
+    status: int
+    headers: Dict[str, str] = {}
+    body: Optional[Any] = None
+
+class ReportStats(BaseModel):
+    id: str
+    avg_credibility: float = 0.0
+    total_ratings: int = 0
+    comments_count: int = 0
+    duplicate_count: int = 0
+
+class SyncResponse(BaseModel):
+    reports: List[CrimeReport] = []  # new reports, and reports whose content changed
+    stats: List[ReportStats] = []  # reports where only the counters changed
+    blocked: List[str] = []  # ids of reports to drop
+    comments: List[Comment] = []
+    token: str
+    has_more: bool = False
@@ -0,0 +1,91 @@
+"""Migrate existing data to the city-partitioned layout.
+
+    python partition_migrate.py --dry-run
+    python partition_migrate.py
+    python partition_migrate.py --shard --zone Bhopal=shard01 --zone Indore=shard02
+
+Normalizes ``city`` on users and reports so every document maps to one
+partition key, creates the city-prefixed indexes and, with ``--shard``
+against a mongos, shards ``crime_reports`` on ``{city: 1, id: 1}``. Each
+``--zone CITY=SHARD`` pins a city's key range to a shard so large cities
+can be given their own hardware.
+"""
+import argparse
+import asyncio
+import json
+
+from bson import MaxKey, MinKey
+
+import partitions
+from partitions import normalize_city
+
+
+async def normalize_cities(collection, dry_run: bool) -> dict:
+    changes = {}
+    for city in await collection.distinct("city"):
+        if not isinstance(city, str):
+            continue
+        normalized = normalize_city(city)
+        if normalized == city:
+            continue
+        if dry_run:
+            changes[city] = {"to": normalized, "documents": await collection.count_documents({"city": city})}
+        else:
+            result = await collection.update_many({"city": city}, {"$set": {"city": normalized}})
+            changes[city] = {"to": normalized, "documents": result.modified_count}
+    return changes
+
+
+async def shard_reports(client, db_name: str, zones: dict):
+    namespace = f"{db_name}.crime_reports"
+    await client.admin.command("enableSharding", db_name)
+    await client.admin.command("shardCollection", namespace, key=dict(partitions.REPORT_SHARD_KEY))
+
+    for city, shard in zones.items():
+        zone = f"city:{normalize_city(city)}"
+        await client.admin.command("addShardToZone", shard, zone=zone)
+        await client.admin.command(
+            "updateZoneKeyRange", namespace,
+            min={"city": normalize_city(city), "id": MinKey()},
+            max={"city": normalize_city(city), "id": MaxKey()},
+            zone=zone,
+        )
+
+
+async def _main(args):
+    import server
+
+    server.init_db(server.create_mongo_client())
+    db = server.db
+    summary = {}
+    try:
+        summary["users"] = await normalize_cities(db.users, args.dry_run)
+        summary["crime_reports"] = await normalize_cities(db.crime_reports, args.dry_run)
+
+        if not args.dry_run:
+            await partitions.ensure_indexes(db)
+            if args.shard:
+                await shard_reports(server.client, db.name, dict(zone.split("=", 1) for zone in args.zone))
+                summary["sharded"] = True
+            # Cached feed pages may be keyed by the old city spellings
+            await server.invalidation_bus.invalidate("feed")
+
+        summary["cities"] = await partitions.city_stats(db)
+    finally:
+        server.client.close()
+
+    print(json.dumps(summary, indent=2, default=str))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate crime reports to the city-partitioned layout")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    parser.add_argument("--shard", action="store_true", help="Shard crime_reports on {city, id} (requires mongos)")
+    parser.add_argument("--zone", action="append", default=[], metavar="CITY=SHARD",
+                        help="Pin a city's reports to a shard; may be repeated")
+    args = parser.parse_args()
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""City partitioning for crime reports.
+
+Reports stay in one collection, but every hot index leads with ``city`` and
+``{city: 1, id: 1}`` is the shard key. A small city's feed then only walks
+its own index range, however large other cities grow. On a sharded cluster
+each large city can be pinned to its own shard with a zone (see
+``partition_migrate.py``). Lookups that know the city should pass it
+so they are routed to a single partition instead of scattered. Writes to a
+single report always filter on both ``city`` and ``id``, since a sharded
+cluster needs the full shard key to route them.
+"""
+from typing import List, Optional
+
+REPORT_SHARD_KEY = [("city", 1), ("id", 1)]
+
+REPORT_INDEXES = [
+    (REPORT_SHARD_KEY, {"unique": True}),
+    ([("id", 1)], {}),
+    # id breaks created_at ties so feed pages can be walked with a keyset cursor
+    ([("city", 1), ("is_blocked", 1), ("created_at", -1), ("id", -1)], {}),
+    ([("city", 1), ("is_blocked", 1), ("crime_type", 1), ("created_at", -1), ("id", -1)], {}),
+    # sort=hot feed
+    ([("city", 1), ("is_blocked", 1), ("hot_score", -1), ("id", -1)], {}),
+    # The decay job finds reports that still have a score across all cities; only those are indexed
+    ([("hot_score", 1)], {"partialFilterExpression": {"hot_score": {"$gt": 0}}}),
+    # Only reports with coordinates are indexed (2dsphere indexes are sparse)
+    ([("city", 1), ("coordinates", "2dsphere"), ("created_at", -1)], {}),
+    # Delta sync walks a city's changes by sequence number
+    ([("city", 1), ("change_seq", 1)], {}),
+]
+
+COMMENT_INDEXES = [
+    ([("report_id", 1), ("created_at", 1)], {}),
+    ([("city", 1), ("change_seq", 1)], {}),
+]
+
+RATING_INDEXES = [
+    ([("report_id", 1), ("user_id", 1)], {}),
+]
+
+
+def normalize_city(city: str) -> str:
+    """Canonical partition key for a city name: "  bhopal " -> "Bhopal" """
+    return " ".join(city.split()).title()
+
+
+def report_filter(city: Optional[str] = None, **conditions) -> dict:
+    """Build a report query that leads with the partition key when it is known"""
+    query = {}
+    if city:
+        query["city"] = normalize_city(city)
+    query.update(conditions)
+    return query
+
+
+async def ensure_indexes(db):
+    for collection, indexes in (
+        (db.crime_reports, REPORT_INDEXES),
+        (db.comments, COMMENT_INDEXES),
+        (db.credibility_ratings, RATING_INDEXES),
+    ):
+        for keys, options in indexes:
+            await collection.create_index(keys, **options)
+
+
+async def city_stats(db, city: Optional[str] = None) -> List[dict]:
+    pipeline = []
+    if city:
+        pipeline.append({"$match": {"city": normalize_city(city)}})
+    pipeline += [
+        {"$group": {
+            "_id": "$city",
+            "reports": {"$sum": 1},
+            "blocked": {"$sum": {"$cond": ["$is_blocked", 1, 0]}},
+            "comments": {"$sum": "$comments_count"},
+            "ratings": {"$sum": "$total_ratings"},
+            "last_report_at": {"$max": "$created_at"},
+        }},
+        {"$sort": {"reports": -1}},
+        {"$project": {
+            "_id": 0, "city": "$_id", "reports": 1, "blocked": 1,
+            "comments": 1, "ratings": 1, "last_report_at": 1,
+        }},
+    ]
+    return await db.crime_reports.aggregate(pipeline).to_list(length=None)
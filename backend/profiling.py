@@ -0,0 +1,172 @@
+"""On-demand request profiling and slow-request logging.
+
+Admins can opt a single request into cProfile with an ``X-Profile: 1``
+header or ``?profile=1``. The token only says who is asking; whether they
+are still an admin is checked against their stored user, like every other
+admin route. The profile is stored and its id returned in the
+``X-Profile-Id`` response header. cProfile sees everything running on the
+event loop thread while the request is in flight, so profiles taken under
+heavy concurrency include other requests' work too.
+
+Every request also collects the MongoDB commands it issued (via the
+command listener in ``metrics``). Requests slower than the threshold are
+logged with their route, parameters, DB timings and a sample of the
+coroutine stack taken when the threshold was crossed.
+"""
+import asyncio
+import io
+import logging
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+from urllib.parse import parse_qs
+
+import jwt
+
+logger = logging.getLogger("slow_requests")
+
+_db_ops: ContextVar[Optional[list]] = ContextVar("db_ops", default=None)
+_profiler_active = False
+
+# Most recent slow requests, newest last
+slow_requests = deque(maxlen=200)
+
+
+def record_db_op(collection: str, command: str, duration: float):
+    ops = _db_ops.get()
+    if ops is not None:
+        ops.append((collection, command, duration))
+
+
+def _summarize_db_ops(ops: list) -> dict:
+    slowest = sorted(ops, key=lambda op: op[2], reverse=True)[:5]
+    return {
+        "count": len(ops),
+        "total_ms": round(sum(op[2] for op in ops) * 1000, 2),
+        "slowest": [
+            {"collection": collection, "command": command, "ms": round(duration * 1000, 2)}
+            for collection, command, duration in slowest
+        ],
+    }
+
+
+class ProfilingMiddleware:
+    def __init__(
+        self,
+        app,
+        jwt_secret: str,
+        jwt_algorithm: str,
+        store_profile: Callable[[dict], Awaitable[None]],
+        is_admin: Callable[[str], Awaitable[bool]],
+        slow_request_seconds: float = 1.0,
+    ):
+        self.app = app
+        self.jwt_secret = jwt_secret
+        self.jwt_algorithm = jwt_algorithm
+        self.store_profile = store_profile
+        self.is_admin = is_admin
+        self.slow_request_seconds = slow_request_seconds
+
+    async def _profile_requested(self, scope) -> bool:
+        headers = dict(scope["headers"])
+        requested = headers.get(b"x-profile") == b"1" or \
+            parse_qs(scope.get("query_string", b"").decode()).get("profile") == ["1"]
+        if not requested:
+            return False
+
+        authorization = headers.get(b"authorization", b"").decode()
+        if not authorization.startswith("Bearer "):
+            return False
+        try:
+            payload = jwt.decode(authorization[7:], self.jwt_secret, algorithms=[self.jwt_algorithm])
+        except jwt.InvalidTokenError:
+            return False
+        user_id = payload.get("user_id")
+        return bool(user_id) and await self.is_admin(user_id)
+
+    async def __call__(self, scope, receive, send):
+        global _profiler_active
+
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        ops = []
+        token = _db_ops.set(ops)
+
+        # Only one cProfile can be active per thread
+        profiler = None
+        profile_id = None
+        if not _profiler_active and await self._profile_requested(scope):
+            import cProfile
+
+            _profiler_active = True
+            profiler = cProfile.Profile()
+            profile_id = str(uuid.uuid4())
+
+        async def send_wrapper(message):
+            if profile_id and message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        stack_sample = []
+        task = asyncio.current_task()
+
+        def sample_stack():
+            output = io.StringIO()
+            task.print_stack(limit=20, file=output)
+            stack_sample.append(output.getvalue())
+
+        timer = asyncio.get_running_loop().call_later(self.slow_request_seconds, sample_stack)
+        started = time.perf_counter()
+        try:
+            if profiler:
+                profiler.enable()
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profiler:
+                profiler.disable()
+                _profiler_active = False
+            elapsed = time.perf_counter() - started
+            timer.cancel()
+            _db_ops.reset(token)
+
+        route = scope.get("route")
+        path = route.path if route is not None else scope["path"]
+
+        if profiler:
+            import pstats
+
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(50)
+            await self.store_profile({
+                "id": profile_id,
+                "method": scope["method"],
+                "route": path,
+                "query_string": scope.get("query_string", b"").decode(),
+                "duration_ms": round(elapsed * 1000, 2),
+                "db_ops": _summarize_db_ops(ops),
+                "profile": output.getvalue(),
+                "created_at": datetime.now(timezone.utc),
+            })
+
+        if elapsed >= self.slow_request_seconds:
+            entry = {
+                "method": scope["method"],
+                "route": path,
+                "path": scope["path"],
+                "query_string": scope.get("query_string", b"").decode(),
+                "duration_ms": round(elapsed * 1000, 2),
+                "db_ops": _summarize_db_ops(ops),
+                "stack_sample": stack_sample[0] if stack_sample else None,
+                "created_at": datetime.now(timezone.utc),
+            }
+            slow_requests.append(entry)
+            target = f"{entry['path']}?{entry['query_string']}" if entry["query_string"] else entry["path"]
+            logger.warning(
+                f"Slow request {entry['method']} {target} took {entry['duration_ms']}ms "
+                f"({entry['db_ops']['count']} DB ops, {entry['db_ops']['total_ms']}ms)"
+            )
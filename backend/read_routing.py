@@ -0,0 +1,129 @@
+"""Per-route read preferences with read-your-writes.
+
+Public read routes (the feed, comments, crime types, report detail) may be
+served by secondaries, bounded by ``maxStalenessSeconds``, so read load
+scales with the replica set instead of landing on the primary. Writes stay
+on the primary, and a request that just wrote gets a short-lived marker
+(cookie plus ``X-Read-Primary-Until`` header) that sends its follow-up
+reads to the primary, so users always see their own posts. The marker is
+stateless, so it works the same whichever worker serves the next request.
+It carries its expiry and an HMAC of it keyed with the server secret, so a
+client can't forge one to pin its reads to the primary.
+
+Browsers send the cookie by themselves. Clients that don't keep cookies
+(or call the API cross-site) echo the header from the last write back on
+their next requests.
+
+    READ_PREFERENCES="feed=secondaryPreferred,comments=nearest"
+    READ_MAX_STALENESS_SECONDS=90
+    READ_YOUR_WRITES_SECONDS=120
+
+On a standalone mongod every preference is served by the primary.
+"""
+import hashlib
+import hmac
+import time
+from typing import Dict, Optional
+
+from pymongo.read_preferences import (
+    Nearest, Primary, PrimaryPreferred, ReadPreference, Secondary, SecondaryPreferred
+)
+
+READ_PRIMARY_COOKIE = "read_primary_until"
+READ_PRIMARY_HEADER = "X-Read-Primary-Until"
+
+# MongoDB rejects maxStalenessSeconds below 90
+MIN_MAX_STALENESS_SECONDS = 90
+
+READ_PREFERENCE_MODES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+DEFAULT_ROUTE_MODES = {
+    "feed": "secondaryPreferred",
+    "comments": "secondaryPreferred",
+    "crime_types": "secondaryPreferred",
+    "report_detail": "secondaryPreferred",
+}
+
+
+def build_read_preference(mode: str, max_staleness_seconds: int = -1) -> ReadPreference:
+    if mode not in READ_PREFERENCE_MODES:
+        raise ValueError(f"Unknown read preference: {mode}")
+    if mode == "primary":
+        return Primary()
+    if max_staleness_seconds != -1:
+        max_staleness_seconds = max(max_staleness_seconds, MIN_MAX_STALENESS_SECONDS)
+    return READ_PREFERENCE_MODES[mode](max_staleness=max_staleness_seconds)
+
+
+def parse_route_modes(spec: str) -> Dict[str, str]:
+    """Parse "feed=secondaryPreferred,comments=primary" into a route -> mode map"""
+    modes = dict(DEFAULT_ROUTE_MODES)
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        route, _, mode = entry.partition("=")
+        if not mode:
+            raise ValueError(f"Expected ROUTE=MODE, got: {entry}")
+        modes[route.strip()] = mode.strip()
+    return modes
+
+
+class ReadRouter:
+    def __init__(
+        self,
+        route_modes: Optional[Dict[str, str]] = None,
+        max_staleness_seconds: int = MIN_MAX_STALENESS_SECONDS,
+        read_your_writes_seconds: float = 120,
+        secret: str = "",
+    ):
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self._secret = secret.encode()
+        self.preferences = {
+            route: build_read_preference(mode, max_staleness_seconds)
+            for route, mode in (route_modes if route_modes is not None else DEFAULT_ROUTE_MODES).items()
+        }
+        self._primary = None
+        self._databases = {}
+
+    def bind(self, db):
+        """Create one database handle per route preference on ``db``'s client"""
+        self._primary = db
+        self._databases = {
+            route: db.client.get_database(db.name, read_preference=preference)
+            for route, preference in self.preferences.items()
+        }
+
+    def _signature(self, until: str) -> str:
+        return hmac.new(self._secret, until.encode(), hashlib.sha256).hexdigest()[:32]
+
+    def needs_primary(self, request) -> bool:
+        marker = request.headers.get(READ_PRIMARY_HEADER) or request.cookies.get(READ_PRIMARY_COOKIE)
+        if not marker:
+            return False
+        until, _, signature = marker.rpartition(".")
+        if not hmac.compare_digest(signature, self._signature(until)):
+            return False
+        try:
+            return float(until) > time.time()
+        except ValueError:
+            return False
+
+    def database(self, route: str, request=None):
+        """Database handle for ``route``, or the primary if ``request`` just wrote"""
+        if request is not None and self.needs_primary(request):
+            return self._primary
+        return self._databases.get(route, self._primary)
+
+    def mark_write(self, response):
+        """Send this client's reads to the primary until replicas have caught up"""
+        until = f"{time.time() + self.read_your_writes_seconds:.3f}"
+        marker = f"{until}.{self._signature(until)}"
+        response.set_cookie(
+            READ_PRIMARY_COOKIE, marker,
+            max_age=int(self.read_your_writes_seconds), httponly=True, samesite="lax"
+        )
+        response.headers[READ_PRIMARY_HEADER] = marker
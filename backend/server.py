@@ -1,4 +1,5 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
@@ -6,47 +7,202 @@ from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
+from contextlib import asynccontextmanager
+import time
 from pydantic import BaseModel, Field
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from typing import List, Optional
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import jwt
 import bcrypt
+import asyncio
 import base64
+import math
 from models import *
-from PIL import Image
+import archive
+import batch
+import bulk_import
+import duplicates
+import export
+import geo
+import heatmap
+import images
+from idempotency import REPLAYED_HEADER, IdempotencyMiddleware, IdempotencyStore
+from jobs import JobQueue
+from events import EventBroker
+from metrics import (
+    BCRYPT_DURATION, DUPLICATE_CHECK_DURATION, DUPLICATE_REPORTS, HOT_READS, IMAGE_COMPRESSION_DURATION,
+    IMAGE_DEDUP_BYTES_SAVED, IMAGE_DEDUP_LOOKUPS, MongoCommandListener, MongoPoolListener, PrometheusMiddleware,
+    render_metrics
+)
+import profiling
+from cache import InvalidationBus, SingleFlight, TTLCache
+import partitions
+from partitions import normalize_city, report_filter
+import read_routing
+import sync
+import trends
 import io
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# MongoDB connection - the client is created in the lifespan handler
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+client = None
+db = None
+
+# Driver options that can be tuned per deployment, left at driver defaults when unset
+MONGO_CLIENT_OPTIONS = {
+    'MONGO_MAX_POOL_SIZE': 'maxPoolSize',
+    'MONGO_MIN_POOL_SIZE': 'minPoolSize',
+    'MONGO_WAIT_QUEUE_TIMEOUT_MS': 'waitQueueTimeoutMS',
+    'MONGO_SERVER_SELECTION_TIMEOUT_MS': 'serverSelectionTimeoutMS',
+    'MONGO_CONNECT_TIMEOUT_MS': 'connectTimeoutMS',
+    'MONGO_SOCKET_TIMEOUT_MS': 'socketTimeoutMS',
+}
+mongo_client_options = {
+    option: int(os.environ[env_name])
+    for env_name, option in MONGO_CLIENT_OPTIONS.items()
+    if os.environ.get(env_name)
+}
+pool_listener = MongoPoolListener(mongo_client_options.get("maxPoolSize", 100))
+
+# Readiness: fail when the pool is this busy or Mongo is this slow to answer
+READY_MAX_POOL_UTILIZATION = float(os.environ.get('READY_MAX_POOL_UTILIZATION', '0.9'))
+READY_PING_TIMEOUT_SECONDS = float(os.environ.get('READY_PING_TIMEOUT_MS', '2000')) / 1000
 
 # JWT Configuration
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-here')
 JWT_ALGORITHM = "HS256"
 
-# Create the main app without a prefix
-app = FastAPI()
+# Public reads may go to secondaries; writers read from the primary for a while after
+read_router = read_routing.ReadRouter(
+    read_routing.parse_route_modes(os.environ.get('READ_PREFERENCES', '')),
+    max_staleness_seconds=int(os.environ.get('READ_MAX_STALENESS_SECONDS', '90')),
+    read_your_writes_seconds=float(os.environ.get('READ_YOUR_WRITES_SECONDS', '120')),
+    secret=JWT_SECRET
+)
+
+# Background jobs
+job_queue = JobQueue(None)
+
+# Responses to writes sent with an Idempotency-Key are replayed for retries within the TTL
+idempotency_store = IdempotencyStore(
+    None,
+    ttl_seconds=int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '86400')),
+    lease_seconds=int(os.environ.get('IDEMPOTENCY_LEASE_SECONDS', '60'))
+)
+
+# Reports older than this move to the archive collections, where they can no longer
+# be commented on or rated. Off (0) unless a deployment opts in
+ARCHIVE_AFTER_DAYS = float(os.environ.get('ARCHIVE_AFTER_DAYS', '0'))
+ARCHIVE_INTERVAL_SECONDS = int(os.environ.get('ARCHIVE_INTERVAL_SECONDS', '3600'))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', str(archive.DEFAULT_BATCH_SIZE)))
+
+# Moderation queue: freshness and comment velocity fade, so recent reports are rescored every interval
+MODERATION_REFRESH_DAYS = float(os.environ.get('MODERATION_REFRESH_DAYS', '14'))
+MODERATION_REFRESH_INTERVAL_SECONDS = int(os.environ.get('MODERATION_REFRESH_INTERVAL_SECONDS', '1800'))
+
+# Hot feed: scores of reports younger than the window are re-decayed every interval
+HOT_WINDOW_DAYS = float(os.environ.get('HOT_WINDOW_DAYS', '7'))
+HOT_DECAY_INTERVAL_SECONDS = int(os.environ.get('HOT_DECAY_INTERVAL_SECONDS', '600'))
+HOT_GRAVITY = 1.5
+
+# Near-duplicate reports: similar text, same area, crime times within the window
+DUPLICATE_OPTIONS = {
+    "threshold": float(os.environ.get('DUPLICATE_THRESHOLD', str(duplicates.DEFAULT_THRESHOLD))),
+    "window_hours": float(os.environ.get('DUPLICATE_WINDOW_HOURS', str(duplicates.DEFAULT_WINDOW_HOURS))),
+    "radius_m": float(os.environ.get('DUPLICATE_RADIUS_METERS', str(duplicates.DEFAULT_RADIUS_METERS))),
+}
+duplicate_index = duplicates.DuplicateIndex(None, **DUPLICATE_OPTIONS)
+
+# Uploads matching an image processed in the retention window reuse it instead of being recompressed
+image_index = images.ImageIndex(
+    None,
+    max_distance=int(os.environ.get('IMAGE_DEDUP_MAX_DISTANCE', str(images.DEFAULT_MAX_DISTANCE))),
+    retention_days=float(os.environ.get('IMAGE_DEDUP_RETENTION_DAYS', str(images.DEFAULT_RETENTION_DAYS)))
+)
+
+# Live report feed
+event_broker = EventBroker(max_queue_size=int(os.environ.get('STREAM_QUEUE_SIZE', '100')))
+STREAM_KEEPALIVE_SECONDS = 15
+
+# Keyset cursor for the next feed page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Delta sync: changes younger than this are sent again on the next sync, so a slow write isn't skipped
+SYNC_SETTLE_SECONDS = float(os.environ.get('SYNC_SETTLE_SECONDS', str(sync.DEFAULT_SETTLE_SECONDS)))
+
+# Most sub-requests a single POST /api/batch may carry
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', str(batch.MAX_SUBREQUESTS)))
+
+# Per-worker caches, invalidated across workers through the bus
+user_cache = TTLCache(maxsize=10000, ttl=60)
+crime_type_cache = TTLCache(maxsize=1, ttl=300)
+# Feed pages carry their reports' images, so they are bounded by size as well as count
+FEED_CACHE_MAX_BYTES = int(os.environ.get('FEED_CACHE_MAX_MB', '64')) * 1024 * 1024
+FEED_MAX_LIMIT = 100
+feed_cache = TTLCache(maxsize=1024, ttl=10, max_weight=FEED_CACHE_MAX_BYTES, weigh=lambda reports: sum(
+    1024 + len(report.image_base64 or "") for report in reports
+))
+# Widely shared reports: a very short cache, and concurrent misses share one query.
+# Cached reports carry their image, so only the hottest few are kept
+HOT_READ_CACHE_TTL_SECONDS = float(os.environ.get('HOT_READ_CACHE_TTL_SECONDS', '1'))
+HOT_READ_CACHE_SIZE = int(os.environ.get('HOT_READ_CACHE_SIZE', '256'))
+report_cache = TTLCache(maxsize=HOT_READ_CACHE_SIZE, ttl=HOT_READ_CACHE_TTL_SECONDS)
+comments_cache = TTLCache(maxsize=HOT_READ_CACHE_SIZE * 4, ttl=HOT_READ_CACHE_TTL_SECONDS)
+hot_reads = SingleFlight()
+# Per-city stats group every report of a city, so they are recomputed at most once a TTL
+CITY_STATS_CACHE_TTL_SECONDS = float(os.environ.get('CITY_STATS_CACHE_TTL_SECONDS', '60'))
+city_stats_cache = TTLCache(maxsize=256, ttl=CITY_STATS_CACHE_TTL_SECONDS)
+invalidation_bus = InvalidationBus(None, {
+    "users": user_cache,
+    "crime_types": crime_type_cache,
+    "feed": feed_cache,
+    "reports": report_cache,
+    "comments": comments_cache,
+})
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
 # Security
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 #     is_blocked: bool
 #     reason: Optional[str] = None
 
+def create_mongo_client() -> AsyncIOMotorClient:
+    return AsyncIOMotorClient(
+        mongo_url,
+        event_listeners=[MongoCommandListener(), pool_listener],
+        **mongo_client_options
+    )
+
+def init_db(mongo_client):
+    """Point the app and its background components at a Mongo client"""
+    global client, db
+    client = mongo_client
+    db = client[os.environ['DB_NAME']]
+    read_router.bind(db)
+    job_queue.collection = db.jobs
+    idempotency_store.collection = db.idempotency_keys
+    duplicate_index.db = db
+    image_index.db = db
+    invalidation_bus.db = db
+
 # Helper functions
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    with BCRYPT_DURATION.labels("hash").time():
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
 def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    with BCRYPT_DURATION.labels("verify").time():
+        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
 def create_jwt_token(user_id: str, is_admin: bool = False) -> str:
     payload = {
@@ -56,18 +212,35 @@ def create_jwt_token(user_id: str, is_admin: bool = False) -> str:
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def load_user(user_id: str) -> Optional[User]:
+    cached_user = user_cache.get(user_id)
+    if cached_user is not None:
+        return cached_user
+    
+    user = await db.users.find_one({"id": user_id})
+    if not user:
+        return None
+    
+    user = User(**user)
+    user_cache.set(user_id, user)
+    return user
+
+async def get_current_user(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)):
+    # Sub-requests of a batch reuse the user the batch already looked up
+    batch_user = getattr(request.state, "batch_user", None)
+    if batch_user is not None:
+        return batch_user
+    
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         user_id = payload.get("user_id")
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token")
         
-        user = await db.users.find_one({"id": user_id})
-        if not user:
+        user = await load_user(user_id)
+        if user is None:
             raise HTTPException(status_code=401, detail="User not found")
-        
-        return User(**user)
+        return user
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
@@ -79,6 +252,13 @@ async def get_admin_user(current_user: User = Depends(get_current_user)):
     return current_user
 
 def compress_image(image_base64: str, target_size_kb: int = 80, max_width: int = 1024, max_height: int = 1024) -> str:
+    with IMAGE_COMPRESSION_DURATION.time():
+        return _compress_image(image_base64, target_size_kb, max_width, max_height)
+
+def _compress_image(image_base64: str, target_size_kb: int, max_width: int, max_height: int) -> str:
+    # Only uploads need Pillow, so keep it off the import path
+    from PIL import Image
+
     try:
         # Decode base64
         image_data = base64.b64decode(image_base64)
@@ -118,7 +298,171 @@ def compress_image(image_base64: str, target_size_kb: int = 80, max_width: int =
         logging.error(f"Image compression error: {e}")
         return image_base64
 
-async def update_report_stats(report_id: str):
+def compute_moderation_priority(avg_credibility: float, total_ratings: int, comments_count: int, created_at: datetime) -> float:
+    """Score a report for the moderation queue - higher means review sooner"""
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    age_hours = max((datetime.now(timezone.utc) - created_at).total_seconds() / 3600, 1.0)
+
+    # Low credibility only matters once enough people have rated the report
+    distrust = (10 - avg_credibility) / 10 * math.log1p(total_ratings)
+    # Comments per hour since the report was posted
+    comment_velocity = math.log1p(comments_count / age_hours)
+    # Fresh reports are still spreading, so they get a boost that fades over a day or so
+    freshness = 1 / (1 + age_hours / 24)
+
+    return round(2 * distrust + comment_velocity + freshness, 4)
+
+def compute_hot_score(avg_credibility: float, total_ratings: int, comments_count: int, created_at: datetime) -> float:
+    """Score a report for the hot feed - engagement decayed by age"""
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    age_hours = max((datetime.now(timezone.utc) - created_at).total_seconds() / 3600, 0.0)
+    if age_hours > HOT_WINDOW_DAYS * 24:
+        return 0.0
+
+    # Ratings count for more when raters found the report credible
+    engagement = 1 + total_ratings * (0.5 + avg_credibility / 10) + 2 * comments_count
+    return round(engagement / (age_hours + 2) ** HOT_GRAVITY, 6)
+
+async def find_processed_image(image_key: images.ImageKey) -> Optional[str]:
+    """Already-compressed copy of an upload seen before, if any"""
+    match, image_base64 = await image_index.find(image_key)
+    IMAGE_DEDUP_LOOKUPS.labels(match or "miss").inc()
+    if image_base64:
+        IMAGE_DEDUP_BYTES_SAVED.inc(image_key.size)
+    return image_base64
+
+async def process_report_image(payload: dict):
+    """Background job: compress an uploaded image and attach it to its report"""
+    loop = asyncio.get_running_loop()
+    image_key = await loop.run_in_executor(None, images.image_key, base64.b64decode(payload["image_base64"]))
+    # Another report may have brought the same photo in since this one was queued
+    image_base64 = await find_processed_image(image_key)
+    if image_base64 is None:
+        image_base64 = await loop.run_in_executor(None, compress_image, payload["image_base64"])
+    await db.crime_reports.update_one(
+        report_filter(payload.get("city"), id=payload["report_id"]),
+        await sync.stamped(db, {"$set": {"image_base64": image_base64, "image_status": "ready"}}, content=True)
+    )
+    await image_index.remember(image_key, payload["report_id"])
+    await invalidation_bus.invalidate("feed", payload.get("city"))
+    await invalidation_bus.invalidate("reports", payload["report_id"])
+
+async def fail_report_image(payload: dict):
+    await db.crime_reports.update_one(
+        report_filter(payload.get("city"), id=payload["report_id"]),
+        await sync.stamped(db, {"$set": {"image_status": "failed"}}, content=True)
+    )
+    await invalidation_bus.invalidate("reports", payload["report_id"])
+
+job_queue.register("process_report_image", process_report_image, on_dead=fail_report_image)
+
+async def archive_old_reports(payload: dict):
+    """Background job: move reports older than the archive age to the archive collections"""
+    result = await archive.archive_reports(
+        db,
+        payload.get("older_than_days", ARCHIVE_AFTER_DAYS),
+        batch_size=ARCHIVE_BATCH_SIZE
+    )
+    for city in result["cities"]:
+        await invalidation_bus.invalidate("feed", city)
+    logger.info(f"Archived {result['reports']} reports, {result['comments']} comments, {result['ratings']} ratings")
+
+job_queue.register("archive_reports", archive_old_reports)
+
+async def rebuild_heatmap(payload: dict):
+    """Background job: recount heatmap tiles after reports were added in bulk"""
+    result = await heatmap.rebuild(db, payload.get("city"))
+    logger.info(f"Rebuilt {result['tiles']} heatmap tiles from {result['reports']} reports")
+
+job_queue.register("rebuild_heatmap", rebuild_heatmap)
+
+async def backfill_trends(payload: dict):
+    """Background job: recompute the trend rollups from stored reports and comments"""
+    result = await trends.backfill(db, payload.get("city"))
+    logger.info(f"Backfilled trends from {result['reports']} reports and {result['comments']} comments")
+
+job_queue.register("backfill_trends", backfill_trends)
+
+async def backfill_duplicates(payload: dict):
+    """Background job: re-link near-duplicate reports from stored data"""
+    city = payload.get("city")
+    result = await duplicates.backfill(db, city, **DUPLICATE_OPTIONS)
+    await invalidation_bus.invalidate("feed", normalize_city(city) if city else None)
+    logger.info(f"Linked {result['duplicates']} duplicates into {result['clusters']} clusters "
+                f"across {result['reports']} reports")
+
+job_queue.register("backfill_duplicates", backfill_duplicates)
+
+async def decay_hot_scores(payload: dict):
+    """Background job: recompute hot scores as reports age, in batches"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=HOT_WINDOW_DAYS)
+    fields = {"_id": 0, "id": 1, "city": 1, "avg_credibility": 1, "total_ratings": 1, "comments_count": 1, "created_at": 1}
+    # Reports that just left the window are scored once more, which drops them to zero.
+    # Both branches are indexed: created_at, and a partial index on positive hot scores.
+    query = {"$or": [{"created_at": {"$gte": cutoff}}, {"hot_score": {"$gt": 0}}]}
+
+    updates = []
+    async for report in db.crime_reports.find(query, fields):
+        hot_score = compute_hot_score(
+            report.get("avg_credibility", 0.0),
+            report.get("total_ratings", 0),
+            report.get("comments_count", 0),
+            report["created_at"]
+        )
+        updates.append(UpdateOne(report_filter(report.get("city"), id=report["id"]), {"$set": {"hot_score": hot_score}}))
+        if len(updates) >= 500:
+            await db.crime_reports.bulk_write(updates, ordered=False)
+            updates = []
+    if updates:
+        await db.crime_reports.bulk_write(updates, ordered=False)
+
+job_queue.register("decay_hot_scores", decay_hot_scores)
+job_queue.schedule("decay_hot_scores", HOT_DECAY_INTERVAL_SECONDS)
+
+async def rescore_moderation_priorities(query: dict) -> int:
+    """Recompute the moderation priority of matching reports, in batches"""
+    fields = {"_id": 0, "id": 1, "city": 1, "avg_credibility": 1, "total_ratings": 1, "comments_count": 1, "created_at": 1}
+    updates, rescored = [], 0
+    async for report in db.crime_reports.find(query, fields):
+        if report.get("created_at") is None:
+            continue
+        moderation_priority = compute_moderation_priority(
+            report.get("avg_credibility", 0.0),
+            report.get("total_ratings", 0),
+            report.get("comments_count", 0),
+            report["created_at"]
+        )
+        updates.append(UpdateOne(
+            report_filter(report.get("city"), id=report["id"]), {"$set": {"moderation_priority": moderation_priority}}
+        ))
+        rescored += 1
+        if len(updates) >= 500:
+            await db.crime_reports.bulk_write(updates, ordered=False)
+            updates = []
+    if updates:
+        await db.crime_reports.bulk_write(updates, ordered=False)
+    return rescored
+
+async def refresh_moderation_priorities(payload: dict):
+    """Background job: let the freshness boost of recent, unblocked reports fade"""
+    # Past the refresh window the boost is small enough to leave as it is
+    cutoff = datetime.now(timezone.utc) - timedelta(days=MODERATION_REFRESH_DAYS)
+    await rescore_moderation_priorities({"created_at": {"$gte": cutoff}, "is_blocked": False})
+
+async def backfill_moderation_priorities(payload: dict):
+    """Background job: rescore every report, e.g. after an upgrade or when old scores are stale"""
+    rescored = await rescore_moderation_priorities({})
+    logger.info(f"Rescored moderation priority of {rescored} reports")
+
+job_queue.register("refresh_moderation_priorities", refresh_moderation_priorities)
+job_queue.schedule("refresh_moderation_priorities", MODERATION_REFRESH_INTERVAL_SECONDS)
+job_queue.register("backfill_moderation_priorities", backfill_moderation_priorities)
+if ARCHIVE_AFTER_DAYS > 0:
+    job_queue.schedule("archive_reports", ARCHIVE_INTERVAL_SECONDS)
+
+async def update_report_stats(report_id: str, city: Optional[str] = None, sequence: Optional[int] = None):
     """Update report credibility and comment counts"""
     # Update credibility average
     ratings = await db.credibility_ratings.find({"report_id": report_id}).to_list(length=None)
@@ -132,18 +476,70 @@ async def update_report_stats(report_id: str):
     # Update comment count
     comments_count = await db.comments.count_documents({"report_id": report_id})
     
-    # Update the report
-    await db.crime_reports.update_one(
-        {"id": report_id},
-        {"$set": {
-            "avg_credibility": round(avg_rating, 1),
-            "total_ratings": total_ratings,
-            "comments_count": comments_count
-        }}
+    report = await db.crime_reports.find_one(report_filter(city, id=report_id), {"created_at": 1, "city": 1})
+    if not report:
+        return
+
+    avg_credibility = round(avg_rating, 1)
+    moderation_priority = compute_moderation_priority(
+        avg_credibility, total_ratings, comments_count, report["created_at"]
+    )
+    hot_score = compute_hot_score(avg_credibility, total_ratings, comments_count, report["created_at"])
+    stats = {
+        "avg_credibility": avg_credibility,
+        "total_ratings": total_ratings,
+        "comments_count": comments_count
+    }
+
+    # Update the report, reading back the previous stats so rollups get exact deltas
+    before = await db.crime_reports.find_one_and_update(
+        report_filter(report["city"], id=report_id),
+        await sync.stamped(
+            db, {"$set": {**stats, "moderation_priority": moderation_priority, "hot_score": hot_score}}, sequence=sequence
+        ),
+        projection={
+            "_id": 0, "city": 1, "crime_type": 1, "location": 1, "created_at": 1, "is_blocked": 1,
+            "avg_credibility": 1, "total_ratings": 1, "comments_count": 1
+        }
     )
+    if before:
+        await trends.record_stats_change(db, before, stats)
+    await asyncio.gather(
+        invalidation_bus.invalidate("feed", report["city"]),
+        invalidation_bus.invalidate("reports", report_id),
+        invalidation_bus.invalidate("comments", report_id)
+    )
+    event_broker.emit(report["city"], "stats", {
+        "id": report_id,
+        "avg_credibility": avg_credibility,
+        "total_ratings": total_ratings,
+        "comments_count": comments_count
+    })
+
+# Initialize indexes
+async def init_indexes():
+    await asyncio.gather(
+        partitions.ensure_indexes(db),
+        archive.ensure_indexes(db),
+        duplicates.ensure_indexes(db, DUPLICATE_OPTIONS["window_hours"]),
+        images.ensure_indexes(db),
+        heatmap.ensure_indexes(db),
+        trends.ensure_indexes(db),
+        db.crime_reports.create_index([("is_blocked", 1), ("moderation_priority", -1)]),
+        db.profiles.create_index("created_at", expireAfterSeconds=86400)
+    )
+
+async def ensure_unique_index(collection, field: str):
+    """Unique index that startup seeding relies on; existing duplicates are logged, not fatal"""
+    try:
+        await collection.create_index(field, unique=True)
+    except OperationFailure as e:
+        logger.warning(f"Could not create a unique index on {collection.name}.{field}: {e}")
 
 # Initialize crime types
 async def init_crime_types():
+    # Every worker seeds at startup; the unique name and upserts keep that to one row per type
+    await ensure_unique_index(db.crime_types, "name")
     existing_types = await db.crime_types.count_documents({})
     if existing_types == 0:
         crime_types = [
@@ -153,12 +549,16 @@ async def init_crime_types():
             "Illegal Drug"
         ]
         
-        for crime_type in crime_types:
-            crime_type_obj = CrimeType(name=crime_type)
-            await db.crime_types.insert_one(crime_type_obj.dict())
+        await db.crime_types.bulk_write([
+            UpdateOne({"name": crime_type}, {"$setOnInsert": CrimeType(name=crime_type).dict()}, upsert=True)
+            for crime_type in crime_types
+        ], ordered=False)
 
 # Initialize admin user
 async def init_admin():
+    # bcrypt runs in a thread so the other startup tasks are not held up
+    admin_password = await asyncio.to_thread(hash_password, "Asdf123$")
+    await ensure_unique_index(db.users, "email")
     admin_exists = await db.users.find_one({"is_admin": True})
     if not admin_exists:
         admin_user = User(
@@ -168,13 +568,14 @@ async def init_admin():
             is_admin=True
         )
         admin_dict = admin_user.dict()
-        admin_dict["password"] = hash_password("Asdf123$")  # Updated admin password
-        await db.users.insert_one(admin_dict)
+        admin_dict["password"] = admin_password  # Updated admin password
+        # Upserted on the unique email, so workers starting together create one admin
+        await db.users.update_one({"email": admin_user.email}, {"$setOnInsert": admin_dict}, upsert=True)
     else:
         # Update existing admin password
         await db.users.update_one(
             {"is_admin": True},
-            {"$set": {"password": hash_password("Asdf123$")}}
+            {"$set": {"password": admin_password}}
         )
 
 # Authentication Routes
@@ -187,10 +588,15 @@ async def register_user(user_data: UserCreate):
     
     # Create new user
     user = User(**user_data.dict(exclude={'password'}))
+    user.city = normalize_city(user.city)
     user_dict = user.dict()
     user_dict["password"] = hash_password(user_data.password)
     
-    await db.users.insert_one(user_dict)
+    try:
+        await db.users.insert_one(user_dict)
+    except DuplicateKeyError:
+        # Registered concurrently since the check above
+        raise HTTPException(status_code=400, detail="Email already registered")
     
     # Generate token
     token = create_jwt_token(user.id, user.is_admin)
@@ -227,14 +633,25 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 # Crime Types Routes
 @api_router.get("/crime-types", response_model=List[CrimeType])
-async def get_crime_types():
-    crime_types = await db.crime_types.find().to_list(1000)
-    return [CrimeType(**ct) for ct in crime_types]
+async def get_crime_types(request: Request):
+    # A client that just changed crime types skips the cache and reads the primary
+    consistent = read_router.needs_primary(request)
+    cached_types = None if consistent else crime_type_cache.get("all")
+    if cached_types is not None:
+        return cached_types
+    
+    read_db = read_router.database("crime_types", request)
+    crime_types = await read_db.crime_types.find().to_list(1000)
+    crime_types = [CrimeType(**ct) for ct in crime_types]
+    if not consistent:
+        crime_type_cache.set("all", crime_types)
+    return crime_types
 
 # Admin Crime Types Management
 @api_router.post("/admin/crime-types", response_model=CrimeType)
 async def create_crime_type(
     crime_type_data: CrimeTypeCreate,
+    response: Response,
     admin_user: User = Depends(get_admin_user)
 ):
     # Check if crime type already exists
@@ -243,7 +660,12 @@ async def create_crime_type(
         raise HTTPException(status_code=400, detail="Crime type already exists")
     
     crime_type = CrimeType(**crime_type_data.dict())
-    await db.crime_types.insert_one(crime_type.dict())
+    try:
+        await db.crime_types.insert_one(crime_type.dict())
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Crime type already exists")
+    await invalidation_bus.invalidate("crime_types")
+    read_router.mark_write(response)
     
     return crime_type
 
@@ -251,6 +673,7 @@ async def create_crime_type(
 async def update_crime_type(
     crime_type_id: str,
     crime_type_data: CrimeTypeUpdate,
+    response: Response,
     admin_user: User = Depends(get_admin_user)
 ):
     # Check if crime type exists
@@ -259,10 +682,15 @@ async def update_crime_type(
         raise HTTPException(status_code=404, detail="Crime type not found")
     
     # Update crime type
-    await db.crime_types.update_one(
-        {"id": crime_type_id},
-        {"$set": {"name": crime_type_data.name}}
-    )
+    try:
+        await db.crime_types.update_one(
+            {"id": crime_type_id},
+            {"$set": {"name": crime_type_data.name}}
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Crime type already exists")
+    await invalidation_bus.invalidate("crime_types")
+    read_router.mark_write(response)
     
     updated_doc = await db.crime_types.find_one({"id": crime_type_id})
     return CrimeType(**updated_doc)
@@ -270,6 +698,7 @@ async def update_crime_type(
 @api_router.delete("/admin/crime-types/{crime_type_id}")
 async def delete_crime_type(
     crime_type_id: str,
+    response: Response,
     admin_user: User = Depends(get_admin_user)
 ):
     # Check if crime type exists
@@ -279,14 +708,75 @@ async def delete_crime_type(
     
     # Delete crime type
     await db.crime_types.delete_one({"id": crime_type_id})
+    await invalidation_bus.invalidate("crime_types")
+    read_router.mark_write(response)
     
     return {"message": "Crime type deleted successfully"}
 
 # Crime Reports Routes
+async def read_hot(route: str, cache: TTLCache, key: tuple, load, request: Request):
+    """Serve a read from the micro-cache or a matching query already in flight, else run ``load``.
+
+    Report keys start with the report id so writes can drop every cached page of a report.
+    """
+    # A client that just wrote reads its own copy from the primary
+    if read_router.needs_primary(request):
+        HOT_READS.labels(route, "db").inc()
+        return await load()
+
+    cached = cache.get(key)
+    if cached is not None:
+        HOT_READS.labels(route, "cache").inc()
+        return cached
+    result, shared = await hot_reads.do((route, *key), load)
+    HOT_READS.labels(route, "in_flight" if shared else "db").inc()
+    if result is not None and not shared:
+        cache.set(key, result)
+    return result
+
+def link_duplicate(crime_report: CrimeReport) -> duplicates.Entry:
+    """Point a new report at an earlier report of the same incident, if the index finds one"""
+    with DUPLICATE_CHECK_DURATION.time():
+        entry = duplicates.Entry.from_report(crime_report.dict())
+        match = duplicate_index.match(entry)
+    if match:
+        crime_report.duplicate_of, crime_report.duplicate_score = match
+        entry.duplicate_of = crime_report.duplicate_of
+        DUPLICATE_REPORTS.inc()
+    return entry
+
+async def count_duplicate(report_id: str, city: str):
+    await db.crime_reports.update_one(
+        report_filter(city, id=report_id), await sync.stamped(db, {"$inc": {"duplicate_count": 1}})
+    )
+
+async def insert_report(crime_report: CrimeReport):
+    document = crime_report.dict()
+    await sync.stamp_new(db, [document])
+    await db.crime_reports.insert_one(document)
+
+async def publish_new_report(crime_report: CrimeReport, duplicate_entry: duplicates.Entry):
+    """Update rollups, caches, the duplicate index and live feeds for a newly stored report"""
+    report = crime_report.dict()
+    updates = [
+        heatmap.record_report(db, report),
+        trends.record_report(db, report),
+        duplicate_index.record(duplicate_entry),
+        invalidation_bus.invalidate("feed", crime_report.city)
+    ]
+    if crime_report.duplicate_of:
+        # Duplicates are only ever matched within a city
+        updates.append(count_duplicate(crime_report.duplicate_of, crime_report.city))
+        updates.append(invalidation_bus.invalidate("reports", crime_report.duplicate_of))
+    await asyncio.gather(*updates)
+    event_broker.emit(crime_report.city, "new", crime_report.dict(exclude={"image_base64"}))
+
 @api_router.post("/crime-reports")
 async def create_crime_report(
+    response: Response,
     crime_data: str = Form(...),
     image: UploadFile = File(None),
+    background: bool = False,
     current_user: User = Depends(get_current_user)
 ):
     import json
@@ -298,15 +788,25 @@ async def create_crime_report(
     
     # Handle image upload
     image_base64 = None
+    image_key = None
+    image_ready = False
     if image:
         # Check file size (2MB limit)
         content = await image.read()
         if len(content) > 2 * 1024 * 1024:  # 2MB
             raise HTTPException(status_code=400, detail="Image size must be less than 2MB")
         
-        # Convert to base64 and compress
-        image_base64 = base64.b64encode(content).decode('utf-8')
-        image_base64 = compress_image(image_base64)
+        # A photo that was processed before is reused as is; hashing decodes
+        # the image, so it runs off the event loop
+        image_key = await asyncio.get_running_loop().run_in_executor(None, images.image_key, content)
+        image_base64 = await find_processed_image(image_key)
+        image_ready = image_base64 is not None
+        if not image_ready:
+            # Convert to base64 and compress
+            image_base64 = base64.b64encode(content).decode('utf-8')
+            if not background:
+                image_base64 = compress_image(image_base64)
+                image_ready = True
     
     # Create crime report
     user_name = "Anonymous" if crime_report_data.is_anonymous else current_user.name
@@ -315,28 +815,166 @@ async def create_crime_report(
         **crime_report_data.dict(),
         user_id=current_user.id,
         user_name=user_name,
-        city=current_user.city,
-        image_base64=image_base64
+        city=normalize_city(current_user.city),
+        image_base64=image_base64 if image_ready else None
     )
+    crime_report.moderation_priority = compute_moderation_priority(0.0, 0, 0, crime_report.created_at)
+    crime_report.hot_score = compute_hot_score(0.0, 0, 0, crime_report.created_at)
+    duplicate_entry = link_duplicate(crime_report)
+    
+    if background:
+        # Insert now and let the job queue compress and attach the image
+        if image_ready:
+            crime_report.image_status = "ready"
+        elif image_base64:
+            crime_report.image_status = "pending"
+        await insert_report(crime_report)
+        await publish_new_report(crime_report, duplicate_entry)
+        read_router.mark_write(response)
+        if image_ready:
+            await image_index.remember(image_key, crime_report.id)
+        elif image_base64:
+            await job_queue.enqueue("process_report_image", {
+                "report_id": crime_report.id,
+                "city": crime_report.city,
+                "image_base64": image_base64
+            })
+        
+        response.status_code = 202
+        return {
+            "message": "Crime report accepted",
+            "report_id": crime_report.id
+        }
     
-    await db.crime_reports.insert_one(crime_report.dict())
+    await insert_report(crime_report)
+    await publish_new_report(crime_report, duplicate_entry)
+    read_router.mark_write(response)
+    if image_ready:
+        await image_index.remember(image_key, crime_report.id)
     
     return {
         "message": "Crime report submitted successfully",
         "report": crime_report
     }
 
+def build_imported_report(row: dict, importer: User) -> dict:
+    """Validate one imported row and turn it into a crime report document"""
+    crime_report_data = CrimeReportCreate(**row)
+
+    image_base64 = row.get("image_base64")
+    if image_base64:
+        image_base64 = compress_image(image_base64)
+
+    if crime_report_data.is_anonymous:
+        user_name = "Anonymous"
+    else:
+        user_name = row.get("user_name") or importer.name
+
+    # Historical rows may carry their own id and original submission time
+    extra = {key: row[key] for key in ("id", "created_at") if row.get(key)}
+
+    crime_report = CrimeReport(
+        **crime_report_data.dict(),
+        **extra,
+        user_id=importer.id,
+        user_name=user_name,
+        city=normalize_city(row.get("city") or importer.city),
+        image_base64=image_base64 or None
+    )
+    crime_report.moderation_priority = compute_moderation_priority(0.0, 0, 0, crime_report.created_at)
+    crime_report.hot_score = compute_hot_score(0.0, 0, 0, crime_report.created_at)
+    return crime_report.dict()
+
+@api_router.post("/admin/import", response_model=BulkImportResult)
+async def import_crime_reports(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    batch_size: int = bulk_import.DEFAULT_BATCH_SIZE,
+    workers: int = bulk_import.DEFAULT_WORKERS,
+    admin_user: User = Depends(get_admin_user)
+):
+    fmt = format or bulk_import.detect_format(file.filename or "")
+    if fmt not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Format must be ndjson or csv")
+
+    # The upload is spooled to a temp file, so reading it line by line keeps memory flat
+    lines = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    result = await bulk_import.import_reports(
+        db.crime_reports,
+        lines,
+        fmt,
+        lambda row: build_imported_report(row, admin_user),
+        batch_size=max(1, min(batch_size, 5000)),
+        workers=max(1, min(workers, 16)),
+        before_insert=lambda documents: sync.stamp_new(db, documents)
+    )
+    await invalidation_bus.invalidate("feed")
+    if result.inserted:
+        for city in result.cities:
+            await job_queue.enqueue("rebuild_heatmap", {"city": city})
+            await job_queue.enqueue("backfill_trends", {"city": city})
+            await job_queue.enqueue("backfill_duplicates", {"city": city})
+    return result
+
 @api_router.get("/crime-reports", response_model=List[CrimeReport])
 async def get_crime_reports(
+    request: Request,
+    response: Response,
     city: str = "Bhopal",
     crime_type: Optional[str] = None,
     location: Optional[str] = None,
     search: Optional[str] = None,
+    near: Optional[str] = None,
+    radius_m: float = 1000,
+    bbox: Optional[str] = None,
+    include_archived: bool = False,
+    sort: str = "new",
+    after: Optional[str] = None,
     skip: int = 0,
     limit: int = 20
 ):
+    if sort not in ("new", "hot"):
+        raise HTTPException(status_code=400, detail="Sort must be new or hot")
+    if sort == "hot" and after:
+        # Hot scores shift as reports age, so hot pages are walked with skip
+        raise HTTPException(status_code=400, detail="The hot feed pages with skip, not after")
+    
+    city = normalize_city(city)
+    limit = max(1, min(limit, FEED_MAX_LIMIT))
+    cache_key = (city, crime_type, location, search, near, radius_m, bbox, include_archived, sort, after, skip, limit)
+    # A client that just wrote skips the cache so it sees its own post. Searches
+    # and skip pages are rarely asked for twice, so they aren't cached either
+    cacheable = not read_router.needs_primary(request) and not search and not skip
+    reports = feed_cache.get(cache_key) if cacheable else None
+    if reports is None:
+        reports = await find_feed_reports(
+            request, city, crime_type, location, search, near, radius_m, bbox, include_archived, sort, after, skip, limit
+        )
+        if cacheable:
+            feed_cache.set(cache_key, reports)
+    
+    # A full page may have more after it; clients pass this back as ?after=
+    if sort == "new" and reports and len(reports) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = geo.encode_cursor(reports[-1].created_at, reports[-1].id)
+    return reports
+
+async def find_feed_reports(
+    request: Request,
+    city: str,
+    crime_type: Optional[str],
+    location: Optional[str],
+    search: Optional[str],
+    near: Optional[str],
+    radius_m: float,
+    bbox: Optional[str],
+    include_archived: bool,
+    sort: str,
+    after: Optional[str],
+    skip: int,
+    limit: int
+) -> List[CrimeReport]:
     # Build query - exclude blocked posts for regular users
-    query = {"city": city, "is_blocked": False}
+    query = report_filter(city, is_blocked=False)
     
     if crime_type:
         query["crime_type"] = crime_type
@@ -352,18 +990,99 @@ async def get_crime_reports(
             {"landmark": {"$regex": search, "$options": "i"}}
         ]
     
+    try:
+        conditions = geo.geo_conditions(near, radius_m, bbox)
+        if after:
+            conditions.append(geo.keyset_filter(after))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if conditions:
+        query["$and"] = conditions
+    
     # Get reports with pagination
-    reports = await db.crime_reports.find(query)\
-        .sort("created_at", -1)\
-        .skip(skip)\
-        .limit(limit)\
-        .to_list(length=None)
+    read_db = read_router.database("feed", request)
+    if sort == "hot":
+        # Read in order off the (city, is_blocked, hot_score) index; archived reports are never hot
+        reports = await read_db.crime_reports.find(query)\
+            .sort([("hot_score", -1), ("id", -1)])\
+            .skip(skip)\
+            .limit(limit)\
+            .to_list(length=None)
+        return [CrimeReport(**report) for report in reports]
+    
+    sort = [("created_at", -1), ("id", -1)]
+    if include_archived:
+        # Take the first skip + limit of each tier and merge them by date
+        hot, cold = await asyncio.gather(
+            read_db.crime_reports.find(query).sort(sort).limit(skip + limit).to_list(length=None),
+            read_db.crime_reports_archive.find(query).sort(sort).limit(skip + limit).to_list(length=None)
+        )
+        reports = sorted(hot + cold, key=lambda report: (report["created_at"], report["id"]), reverse=True)
+        reports = reports[skip:skip + limit]
+    else:
+        reports = await read_db.crime_reports.find(query)\
+            .sort(sort)\
+            .skip(skip)\
+            .limit(limit)\
+            .to_list(length=None)
     
     return [CrimeReport(**report) for report in reports]
 
+# Per-City Statistics
+@api_router.get("/stats/cities")
+async def get_city_stats(request: Request):
+    return await read_hot("city_stats", city_stats_cache, (None,), lambda: partitions.city_stats(db), request)
+
+@api_router.get("/stats/cities/{city}")
+async def get_city_stats_by_name(request: Request, city: str):
+    city = normalize_city(city)
+    stats = await read_hot("city_stats", city_stats_cache, (city,), lambda: partitions.city_stats(db, city), request)
+    if not stats:
+        raise HTTPException(status_code=404, detail="No reports for this city")
+    
+    return stats[0]
+
+@api_router.get("/stats/heatmap")
+async def get_heatmap(
+    city: str = "Bhopal",
+    zoom: int = 13,
+    bbox: Optional[str] = None,
+    crime_type: Optional[str] = None
+):
+    try:
+        bounds = geo.parse_bbox(bbox) if bbox else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return await heatmap.get_tiles(db, city, zoom, bounds, crime_type)
+
+@api_router.get("/stats/trends")
+async def get_trends(
+    city: str = "Bhopal",
+    granularity: str = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    crime_type: Optional[str] = None,
+    location: Optional[str] = None,
+    group_by: Optional[str] = None
+):
+    try:
+        return await trends.get_trends(db, city, granularity, start, end, crime_type, location, group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @api_router.get("/crime-reports/{report_id}", response_model=CrimeReport)
-async def get_crime_report_by_id(report_id: str):
-    report = await db.crime_reports.find_one({"id": report_id})
+async def get_crime_report_by_id(request: Request, report_id: str, city: Optional[str] = None):
+    async def load():
+        # Passing the city routes the lookup to a single partition
+        read_db = read_router.database("report_detail", request)
+        report = await read_db.crime_reports.find_one(report_filter(city, id=report_id))
+        if not report:
+            # Old reports live in the archive tier
+            report = await read_db.crime_reports_archive.find_one(report_filter(city, id=report_id))
+        return report
+
+    report = await read_hot("report_detail", report_cache, (report_id, city), load, request)
     if not report:
         raise HTTPException(status_code=404, detail="Crime report not found")
     
@@ -372,11 +1091,55 @@ async def get_crime_report_by_id(report_id: str):
     
     return CrimeReport(**report)
 
+# Live Feed Routes
+@api_router.get("/stream/reports")
+async def stream_reports(request: Request, city: str = "Bhopal"):
+    subscription = event_broker.subscribe(normalize_city(city))
+
+    async def event_stream():
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    frame = await asyncio.wait_for(subscription.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                yield frame
+                # Evicted subscribers get the eviction notice and are expected to reconnect
+                if subscription.evicted:
+                    break
+        finally:
+            event_broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.get("/sync", response_model=SyncResponse)
+async def sync_reports(city: str = "Bhopal", since: Optional[str] = None, limit: int = sync.DEFAULT_LIMIT):
+    """Changes to a city's reports and comments since a sync token, for clients that were away"""
+    try:
+        since_sequence = sync.parse_token(since) if since else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    
+    # Always the primary: a lagging secondary could let the token skip changes it hasn't seen yet
+    changes = await sync.changes_since(
+        db, normalize_city(city), since_sequence, limit=max(1, min(limit, 1000)), settle_seconds=SYNC_SETTLE_SECONDS
+    )
+    return SyncResponse(**changes)
+
 # Admin Report Management
 @api_router.put("/admin/crime-reports/{report_id}/block")
 async def block_crime_report(
     report_id: str,
     block_data: ReportBlock,
+    response: Response,
     admin_user: User = Depends(get_admin_user)
 ):
     # Check if report exists
@@ -385,10 +1148,22 @@ async def block_crime_report(
         raise HTTPException(status_code=404, detail="Crime report not found")
     
     # Update block status
+    # Unblocked reports are sent to syncing clients in full again
     await db.crime_reports.update_one(
-        {"id": report_id},
-        {"$set": {"is_blocked": block_data.is_blocked}}
+        report_filter(existing["city"], id=report_id),
+        await sync.stamped(db, {"$set": {"is_blocked": block_data.is_blocked}}, content=not block_data.is_blocked)
+    )
+    if existing.get("is_blocked", False) != block_data.is_blocked:
+        delta = -1 if block_data.is_blocked else 1
+        await heatmap.record_report(db, existing, delta)
+        await trends.record_report(db, existing, delta)
+    await asyncio.gather(
+        invalidation_bus.invalidate("feed", existing["city"]),
+        invalidation_bus.invalidate("reports", report_id),
+        invalidation_bus.invalidate("comments", report_id)
     )
+    event_broker.emit(existing["city"], "blocked", {"id": report_id, "is_blocked": block_data.is_blocked})
+    read_router.mark_write(response)
     
     action = "blocked" if block_data.is_blocked else "unblocked"
     return {"message": f"Crime report {action} successfully"}
@@ -408,11 +1183,157 @@ async def get_all_crime_reports_admin(
     
     return [CrimeReport(**report) for report in reports]
 
+@api_router.get("/admin/moderation-queue", response_model=List[CrimeReport])
+async def get_moderation_queue(
+    admin_user: User = Depends(get_admin_user),
+    include_duplicates: bool = False,
+    limit: int = 20
+):
+    # Top-K read straight off the (is_blocked, moderation_priority) index
+    limit = max(1, min(limit, 100))
+    query = {"is_blocked": False}
+    if not include_duplicates:
+        # Retellings of an incident are reviewed through their original report
+        query["duplicate_of"] = None
+    reports = await db.crime_reports.find(query)\
+        .sort("moderation_priority", -1)\
+        .limit(limit)\
+        .to_list(length=None)
+
+    return [CrimeReport(**report) for report in reports]
+
+EXPORT_COLLECTIONS = {
+    "reports": ("crime_reports", CrimeReport),
+    "comments": ("comments", Comment),
+    "ratings": ("credibility_ratings", CredibilityRating),
+}
+
+@api_router.get("/admin/export")
+async def export_data(
+    collection: str = "reports",
+    format: str = "ndjson",
+    city: Optional[str] = None,
+    include_images: bool = False,
+    batch_size: int = export.DEFAULT_BATCH_SIZE,
+    admin_user: User = Depends(get_admin_user)
+):
+    if collection not in EXPORT_COLLECTIONS:
+        raise HTTPException(status_code=400, detail="Collection must be reports, comments or ratings")
+    if format not in export.MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Format must be ndjson or csv")
+
+    collection_name, model = EXPORT_COLLECTIONS[collection]
+    batch_size = max(1, min(batch_size, 10000))
+
+    projection = {"_id": 0}
+    fields = list(model.model_fields)
+    if collection == "reports" and not include_images:
+        projection["image_base64"] = 0
+        fields.remove("image_base64")
+
+    query = {}
+    if city and collection == "reports":
+        query = report_filter(city)
+
+    cursor = db[collection_name].find(query, projection).batch_size(batch_size)
+    return StreamingResponse(
+        export.stream_documents(cursor, format, fields, batch_size),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{collection}.{format}"'}
+    )
+
+# Admin Background Jobs
+@api_router.get("/admin/jobs")
+async def get_jobs(
+    status: str = "dead",
+    admin_user: User = Depends(get_admin_user),
+    skip: int = 0,
+    limit: int = 50
+):
+    jobs = await db.jobs.find({"status": status}, {"_id": 0, "payload": 0})\
+        .sort("created_at", -1)\
+        .skip(skip)\
+        .limit(limit)\
+        .to_list(length=None)
+    
+    return jobs
+
+@api_router.post("/admin/jobs/{job_id}/retry")
+async def retry_job(
+    job_id: str,
+    admin_user: User = Depends(get_admin_user)
+):
+    if not await job_queue.retry(job_id):
+        raise HTTPException(status_code=404, detail="Dead-lettered job not found")
+    
+    return {"message": "Job requeued successfully"}
+
+@api_router.post("/admin/archive")
+async def run_archive(
+    older_than_days: Optional[float] = None,
+    admin_user: User = Depends(get_admin_user)
+):
+    older_than_days = older_than_days if older_than_days is not None else ARCHIVE_AFTER_DAYS
+    if older_than_days <= 0:
+        raise HTTPException(status_code=400, detail="older_than_days must be positive")
+    
+    job_id = await job_queue.enqueue("archive_reports", {"older_than_days": older_than_days})
+    return {"message": "Archive job queued", "job_id": job_id}
+
+@api_router.post("/admin/moderation-queue/backfill")
+async def run_moderation_backfill(admin_user: User = Depends(get_admin_user)):
+    job_id = await job_queue.enqueue("backfill_moderation_priorities", {})
+    return {"message": "Moderation priority backfill queued", "job_id": job_id}
+
+@api_router.post("/admin/trends/backfill")
+async def run_trends_backfill(
+    city: Optional[str] = None,
+    admin_user: User = Depends(get_admin_user)
+):
+    job_id = await job_queue.enqueue("backfill_trends", {"city": city} if city else {})
+    return {"message": "Trends backfill queued", "job_id": job_id}
+
+@api_router.post("/admin/duplicates/backfill")
+async def run_duplicates_backfill(
+    city: Optional[str] = None,
+    admin_user: User = Depends(get_admin_user)
+):
+    job_id = await job_queue.enqueue("backfill_duplicates", {"city": city} if city else {})
+    return {"message": "Duplicate backfill queued", "job_id": job_id}
+
+# Admin Profiling
+async def store_profile(profile: dict):
+    await db.profiles.insert_one(profile)
+
+async def is_profiling_admin(user_id: str) -> bool:
+    # The stored user decides, so a demoted admin's token stops working
+    user = await load_user(user_id)
+    return user is not None and user.is_admin
+
+@api_router.get("/admin/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    admin_user: User = Depends(get_admin_user)
+):
+    profile = await db.profiles.find_one({"id": profile_id}, {"_id": 0})
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    return profile
+
+@api_router.get("/admin/slow-requests")
+async def get_slow_requests(
+    admin_user: User = Depends(get_admin_user),
+    limit: int = 50
+):
+    return list(profiling.slow_requests)[-limit:][::-1]
+
 # Comments Routes
 @api_router.post("/crime-reports/{report_id}/comments", response_model=Comment)
 async def add_comment(
     report_id: str,
     comment_data: CommentCreate,
+    response: Response,
     current_user: User = Depends(get_current_user)
 ):
     # Check if report exists and not blocked
@@ -427,31 +1348,52 @@ async def add_comment(
         comment_text=comment_data.comment_text
     )
     
-    await db.comments.insert_one(comment.dict())
-    await update_report_stats(report_id)
+    # Comments carry their report's city so delta sync can find them by city.
+    # One round trip reserves numbers for the comment and the report's new stats
+    sequence = await sync.next_sequence(db, 2)
+    await db.comments.insert_one({**comment.dict(), "city": report["city"], **sync.stamp(sequence - 1)})
+    await update_report_stats(report_id, report["city"], sequence=sequence)
+    read_router.mark_write(response)
     
     return comment
 
 @api_router.get("/crime-reports/{report_id}/comments", response_model=List[Comment])
-async def get_comments(report_id: str, skip: int = 0, limit: int = 50):
-    # Check if report exists and not blocked
-    report = await db.crime_reports.find_one({"id": report_id, "is_blocked": False})
-    if not report:
+async def get_comments(
+    request: Request,
+    report_id: str,
+    skip: int = 0,
+    limit: int = 50,
+    city: Optional[str] = None
+):
+    async def load():
+        read_db = read_router.database("comments", request)
+        # Check if report exists and not blocked
+        report = await read_db.crime_reports.find_one(report_filter(city, id=report_id, is_blocked=False))
+        comments_collection = read_db.comments
+        if not report:
+            report = await read_db.crime_reports_archive.find_one(report_filter(city, id=report_id, is_blocked=False))
+            comments_collection = read_db.comments_archive
+        if not report:
+            return None
+        
+        comments = await comments_collection.find({"report_id": report_id})\
+            .sort("created_at", 1)\
+            .skip(skip)\
+            .limit(limit)\
+            .to_list(length=None)
+        return [Comment(**comment) for comment in comments]
+
+    comments = await read_hot("comments", comments_cache, (report_id, city, skip, limit), load, request)
+    if comments is None:
         raise HTTPException(status_code=404, detail="Crime report not found")
-    
-    comments = await db.comments.find({"report_id": report_id})\
-        .sort("created_at", 1)\
-        .skip(skip)\
-        .limit(limit)\
-        .to_list(length=None)
-    
-    return [Comment(**comment) for comment in comments]
+    return comments
 
 # Credibility Rating Routes
 @api_router.post("/crime-reports/{report_id}/rating")
 async def rate_credibility(
     report_id: str,
     rating_data: CredibilityRatingCreate,
+    response: Response,
     current_user: User = Depends(get_current_user)
 ):
     # Check if report exists and not blocked
@@ -482,7 +1424,8 @@ async def rate_credibility(
         await db.credibility_ratings.insert_one(rating.dict())
         message = "Rating added successfully"
     
-    await update_report_stats(report_id)
+    await update_report_stats(report_id, report["city"])
+    read_router.mark_write(response)
     
     return {"message": message}
 
@@ -505,15 +1448,124 @@ async def get_user_rating(
 async def root():
     return {"message": "Crime Reporting API"}
 
+@api_router.get("/health/ready")
+async def readiness(response: Response):
+    # Pools are per server, so the busiest one decides
+    pool = {
+        "max_size": pool_listener.max_pool_size,
+        "min_size": mongo_client_options.get("minPoolSize", 0),
+        **pool_listener.busiest()
+    }
+    
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(db.command("ping"), timeout=READY_PING_TIMEOUT_SECONDS)
+    except Exception as e:
+        response.status_code = 503
+        return {"status": "unavailable", "reason": f"MongoDB ping failed: {e}", "pool": pool}
+    ping_ms = round((time.perf_counter() - started) * 1000, 2)
+    
+    if pool["utilization"] >= READY_MAX_POOL_UTILIZATION or pool["waiting"] > 0:
+        response.status_code = 503
+        return {"status": "saturated", "mongo": {"ping_ms": ping_ms}, "pool": pool}
+    
+    return {"status": "ready", "mongo": {"ping_ms": ping_ms}, "pool": pool}
+
+@api_router.post("/batch", response_model=List[BatchResponseItem])
+async def run_batch(
+    batch_request: BatchRequest,
+    request: Request,
+    response: Response,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    if not batch_request.requests:
+        raise HTTPException(status_code=400, detail="A batch needs at least one request")
+    if len(batch_request.requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"A batch can hold at most {BATCH_MAX_REQUESTS} requests")
+    for item in batch_request.requests:
+        try:
+            batch.check_path(item.path)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    # Authenticate once for the whole batch; sub-requests without a valid token fail on their own
+    state = {}
+    if credentials:
+        try:
+            state["batch_user"] = await get_current_user(request, credentials)
+        except HTTPException:
+            pass
+    
+    results = await asyncio.gather(*[
+        batch.dispatch(app, request.scope, item.method, item.path, item.body, state)
+        for item in batch_request.requests
+    ])
+    if any(read_routing.READ_PRIMARY_HEADER.lower() in result["headers"] for result in results):
+        read_router.mark_write(response)
+    return [BatchResponseItem(id=item.id, **result) for item, result in zip(batch_request.requests, results)]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db(create_mongo_client())
+    # Startup tasks are independent, so run them concurrently
+    await asyncio.gather(
+        init_indexes(),
+        init_crime_types(),
+        init_admin(),
+        job_queue.init_indexes(),
+        idempotency_store.init_indexes(),
+        event_broker.start_change_stream(db.crime_reports),
+        invalidation_bus.start(),
+        duplicate_index.start(),
+        image_index.start()
+    )
+    job_queue.start()
+    
+    yield
+    
+    await job_queue.stop()
+    await event_broker.stop()
+    await invalidation_bus.stop()
+    await duplicate_index.stop()
+    await image_index.stop()
+    client.close()
+
+# Create the main app without a prefix
+app = FastAPI(lifespan=lifespan)
+
 # Include the router in the main app
 app.include_router(api_router)
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+app.add_middleware(
+    IdempotencyMiddleware,
+    store=idempotency_store,
+    jwt_secret=JWT_SECRET,
+    jwt_algorithm=JWT_ALGORITHM
+)
+
+app.add_middleware(
+    profiling.ProfilingMiddleware,
+    jwt_secret=JWT_SECRET,
+    jwt_algorithm=JWT_ALGORITHM,
+    store_profile=store_profile,
+    is_admin=is_profiling_admin,
+    slow_request_seconds=float(os.environ.get('SLOW_REQUEST_MS', '1000')) / 1000
+)
+
+app.add_middleware(PrometheusMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[read_routing.READ_PRIMARY_HEADER, NEXT_CURSOR_HEADER, REPLAYED_HEADER],
 )
 
 # Configure logging
@@ -521,13 +1573,4 @@ logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
-logger = logging.getLogger(__name__)
-
-@app.on_event("startup")
-async def startup_event():
-    await init_crime_types()
-    await init_admin()
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+logger = logging.getLogger(__name__)
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""Delta sync for clients that reconnect or work offline.
+
+Every write to a report or a comment takes the next number from one global
+change sequence (a counter document in ``counters``) and stores it on the
+document as ``change_seq``, along with ``updated_at``. Reports also keep
+``content_seq``, which only moves when more than their stats changed
+(created, image processed, unblocked), so a client that already holds a
+report is sent just its new counters.
+
+The counter is one document, so every report and comment write also
+updates it, and those updates are serialized on it. At the write rates of
+one deployment that is a short queue, but it is the first thing to
+contend as writes grow. Writes that need several numbers (a comment plus
+its report's new stats, a bulk import) therefore reserve them in one
+round trip with ``next_sequence(db, count)``.
+
+A sync token is the last sequence number a client has applied. Numbers are
+taken before the write lands, so a slow write can show up after a later
+one. The token handed back therefore never moves past a change made in the
+last ``settle_seconds``. Such changes are sent again on the next sync, and
+clients apply them by id.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from pymongo import ReturnDocument
+
+DEFAULT_LIMIT = 200
+DEFAULT_SETTLE_SECONDS = 2.0
+SEQUENCE_ID = "changes"
+STATS_FIELDS = ("avg_credibility", "total_ratings", "comments_count", "duplicate_count")
+
+
+def parse_token(token: str) -> int:
+    sequence = int(token)
+    if sequence < 0:
+        raise ValueError("Sync tokens are not negative")
+    return sequence
+
+
+async def current_sequence(db) -> int:
+    counter = await db.counters.find_one({"_id": SEQUENCE_ID})
+    return counter["seq"] if counter else 0
+
+
+async def next_sequence(db, count: int = 1) -> int:
+    """Reserve ``count`` sequence numbers and return the last of them"""
+    counter = await db.counters.find_one_and_update(
+        {"_id": SEQUENCE_ID},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return counter["seq"]
+
+
+def stamp(sequence: int, content: bool = False) -> dict:
+    """Fields to ``$set`` on a report or comment written under ``sequence``"""
+    fields = {"change_seq": sequence, "updated_at": datetime.now(timezone.utc)}
+    if content:
+        fields["content_seq"] = sequence
+    return fields
+
+
+async def stamped(db, update: dict, content: bool = False, sequence: Optional[int] = None) -> dict:
+    """``update`` for one report or comment, with ``sequence`` (or the next number) added to its ``$set``"""
+    if sequence is None:
+        sequence = await next_sequence(db)
+    return {**update, "$set": {**update.get("$set", {}), **stamp(sequence, content)}}
+
+
+async def stamp_new(db, documents: List[dict]):
+    """Stamp reports about to be inserted, with one round trip for all of them"""
+    if not documents:
+        return
+    last = await next_sequence(db, len(documents))
+    for sequence, document in enumerate(documents, start=last - len(documents) + 1):
+        document.update(stamp(sequence, content=True))
+
+
+def _settled(document: dict, cutoff: datetime) -> bool:
+    updated_at = document["updated_at"]
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return updated_at <= cutoff
+
+
+async def changes_since(
+    db,
+    city: str,
+    since: Optional[int],
+    limit: int = DEFAULT_LIMIT,
+    settle_seconds: float = DEFAULT_SETTLE_SECONDS,
+) -> dict:
+    """Reports, stats, blocks and comments of ``city`` changed after ``since``, oldest first
+
+    Without ``since`` only the current token is returned; clients take it
+    before loading the feed and sync from there. Comments on blocked reports
+    are left out; the report's id comes in ``blocked``, whenever it was blocked.
+    """
+    result = {"reports": [], "stats": [], "blocked": [], "comments": [], "has_more": False}
+    if since is None:
+        result["token"] = str(await current_sequence(db))
+        return result
+
+    query = {"city": city, "change_seq": {"$gt": since}}
+    reports, comments = await asyncio.gather(
+        db.crime_reports.find(query, {"_id": 0}).sort("change_seq", 1).limit(limit + 1).to_list(None),
+        db.comments.find(query, {"_id": 0}).sort("change_seq", 1).limit(limit + 1).to_list(None),
+    )
+    changes = sorted(
+        [("report", document) for document in reports] + [("comment", document) for document in comments],
+        key=lambda change: change[1]["change_seq"]
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    token = since
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settle_seconds)
+    for _, document in changes:
+        if not _settled(document, cutoff):
+            # Later changes are still sent, but come again next time
+            has_more = False
+            break
+        token = document["change_seq"]
+
+    commented = list({document["report_id"] for kind, document in changes if kind == "comment"})
+    blocked = {
+        document["id"] async for document in
+        db.crime_reports.find({"id": {"$in": commented}, "is_blocked": True}, {"_id": 0, "id": 1})
+    } if commented else set()
+
+    for kind, document in changes:
+        if kind == "comment":
+            if document["report_id"] not in blocked:
+                result["comments"].append(document)
+        elif document.get("is_blocked"):
+            result["blocked"].append(document["id"])
+        elif document.get("content_seq", 0) > since:
+            result["reports"].append(document)
+        else:
+            result["stats"].append({"id": document["id"], **{field: document.get(field, 0) for field in STATS_FIELDS}})
+    result["token"] = str(token)
+    result["has_more"] = has_more
+    return result
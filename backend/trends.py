@@ -0,0 +1,274 @@
+"""Hourly and daily report rollups for trend charts.
+
+``trends_hourly`` and ``trends_daily`` hold one document per city, crime
+type, location bucket and period with:
+
+- ``reports``: reports created in the period (blocked ones excluded)
+- ``rated_reports`` / ``credibility_sum``: for the average credibility of
+  those reports
+- ``comments``: comments posted in the period
+
+They are updated with ``$inc`` upserts as reports are created, blocked and
+rated/commented, so a trend query reads at most a few hundred documents.
+Existing data (and bulk imports) are counted by a backfill:
+
+    python trends.py
+    python trends.py --city Bhopal
+"""
+import argparse
+import asyncio
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from partitions import normalize_city
+
+GRANULARITIES = {
+    "hour": ("trends_hourly", timedelta(days=14)),
+    "day": ("trends_daily", timedelta(days=731)),
+}
+GROUP_BY_FIELDS = {"crime_type", "location"}
+ROLLUP_FIELDS = ("reports", "rated_reports", "credibility_sum", "comments")
+BACKFILL_BATCH_SIZE = 1000
+
+ROLLUP_INDEXES = [
+    ([("city", 1), ("period", 1), ("crime_type", 1), ("location", 1)], {"unique": True}),
+]
+
+
+def location_bucket(location: Optional[str]) -> str:
+    """Coarse area for a free-text location: "mp nagar, zone 1" -> "Mp Nagar" """
+    area = (location or "").split(",")[0]
+    return normalize_city(area)[:64] or "Unknown"
+
+
+def period_start(moment: datetime, granularity: str) -> datetime:
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    moment = moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def _rollup_keys(report: dict, moment: datetime) -> dict:
+    """Rollup document key in each collection for a report at ``moment``"""
+    key = {
+        "city": report["city"],
+        "crime_type": report["crime_type"],
+        "location": location_bucket(report.get("location")),
+    }
+    return {
+        collection: {**key, "period": period_start(moment, granularity)}
+        for granularity, (collection, _) in GRANULARITIES.items()
+    }
+
+
+def _operations(report: dict, moment: datetime, increments: dict) -> dict:
+    increments = {field: value for field, value in increments.items() if value}
+    if not increments:
+        return {}
+    return {
+        collection: [UpdateOne(key, {"$inc": increments}, upsert=True)]
+        for collection, key in _rollup_keys(report, moment).items()
+    }
+
+
+async def _apply(db, operations: dict):
+    await asyncio.gather(*(
+        db[collection].bulk_write(ops, ordered=False) for collection, ops in operations.items()
+    ))
+
+
+async def ensure_indexes(db):
+    for collection, _ in GRANULARITIES.values():
+        for keys, options in ROLLUP_INDEXES:
+            await db[collection].create_index(keys, **options)
+
+
+def _report_increments(report: dict, delta: int) -> dict:
+    rated = 1 if report.get("total_ratings", 0) > 0 else 0
+    return {
+        "reports": delta,
+        "rated_reports": delta * rated,
+        "credibility_sum": delta * rated * report.get("avg_credibility", 0.0),
+    }
+
+
+async def record_report(db, report: dict, delta: int = 1):
+    """Count a new or unblocked report (``delta=-1`` takes a blocked one out)"""
+    await _apply(db, _operations(report, report["created_at"], _report_increments(report, delta)))
+
+
+async def record_stats_change(db, before: dict, after: dict):
+    """Apply a report's change in ratings and comments; ``before`` must hold the previous stats"""
+    if before.get("is_blocked"):
+        return
+    credibility = {
+        field: _report_increments(after, 1)[field] - _report_increments(before, 1)[field]
+        for field in ("rated_reports", "credibility_sum")
+    }
+    operations = _operations(before, before["created_at"], credibility)
+    # Comment volume counts when the comment was posted, not when the report was
+    comments = _operations(
+        before, datetime.now(timezone.utc),
+        {"comments": after.get("comments_count", 0) - before.get("comments_count", 0)}
+    )
+    for collection, ops in comments.items():
+        operations.setdefault(collection, []).extend(ops)
+    await _apply(db, operations)
+
+
+async def get_trends(
+    db,
+    city: str,
+    granularity: str = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    crime_type: Optional[str] = None,
+    location: Optional[str] = None,
+    group_by: Optional[str] = None,
+) -> dict:
+    if granularity not in GRANULARITIES:
+        raise ValueError("granularity must be hour or day")
+    if group_by and group_by not in GROUP_BY_FIELDS:
+        raise ValueError("group_by must be crime_type or location")
+
+    collection, max_range = GRANULARITIES[granularity]
+    end = end or datetime.now(timezone.utc)
+    start = start or end - (timedelta(days=2) if granularity == "hour" else timedelta(days=30))
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if start >= end:
+        raise ValueError("start must be before end")
+    if end - start > max_range:
+        raise ValueError(f"{granularity} trends can cover at most {max_range.days} days")
+
+    query = {"city": normalize_city(city), "period": {"$gte": period_start(start, granularity), "$lte": end}}
+    if crime_type:
+        query["crime_type"] = crime_type
+    if location:
+        query["location"] = location_bucket(location)
+
+    series = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+    async for document in db[collection].find(query, {"_id": 0}):
+        totals = series[(document["period"], document[group_by] if group_by else None)]
+        for field in ROLLUP_FIELDS:
+            totals[field] += document.get(field, 0)
+
+    points = []
+    for (period, group), totals in sorted(series.items(), key=lambda item: (item[0][0], item[0][1] or "")):
+        if not totals["reports"] and not totals["comments"]:
+            continue  # Everything in the period was blocked again
+        point = {
+            "period": period,
+            "reports": totals["reports"],
+            "comments": totals["comments"],
+            "avg_credibility": round(totals["credibility_sum"] / totals["rated_reports"], 2)
+            if totals["rated_reports"] else None,
+        }
+        if group_by:
+            point[group_by] = group
+        points.append(point)
+    return {"city": normalize_city(city), "granularity": granularity, "start": start, "end": end, "series": points}
+
+
+async def _cities(db, city: Optional[str]) -> List[str]:
+    if city:
+        return [normalize_city(city)]
+    cities = set()
+    for collection in (db.crime_reports, db.crime_reports_archive):
+        cities.update(await collection.distinct("city"))
+    return sorted(cities)
+
+
+async def _backfill_city(db, city: str, batch_size: int) -> Tuple[int, int]:
+    """Recompute one city's rollups; reports are read in batches and their comments looked up by report_id"""
+    rollups = {
+        collection: defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0)) for collection, _ in GRANULARITIES.values()
+    }
+    reports = comments = 0
+
+    def add(report: dict, moment: datetime, increments: dict):
+        for collection, key in _rollup_keys(report, moment).items():
+            totals = rollups[collection][tuple(key.items())]
+            for field, value in increments.items():
+                totals[field] += value
+
+    async def add_batch(batch: List[dict]):
+        nonlocal comments
+        by_id = {report["id"]: report for report in batch}
+        for report in batch:
+            if not report.get("is_blocked"):
+                add(report, report["created_at"], _report_increments(report, 1))
+        for collection in (db.comments, db.comments_archive):
+            cursor = collection.find({"report_id": {"$in": list(by_id)}}, {"_id": 0, "report_id": 1, "created_at": 1})
+            async for comment in cursor:
+                comments += 1
+                add(by_id[comment["report_id"]], comment["created_at"], {"comments": 1})
+
+    projection = {"_id": 0, "id": 1, "city": 1, "crime_type": 1, "location": 1, "created_at": 1,
+                  "is_blocked": 1, "avg_credibility": 1, "total_ratings": 1}
+    for collection in (db.crime_reports, db.crime_reports_archive):
+        batch = []
+        async for report in collection.find({"city": city}, projection):
+            reports += 1
+            batch.append(report)
+            if len(batch) >= batch_size:
+                await add_batch(batch)
+                batch = []
+        if batch:
+            await add_batch(batch)
+
+    for collection, documents in rollups.items():
+        await db[collection].delete_many({"city": city})
+        keys = list(documents.items())
+        for start in range(0, len(keys), batch_size):
+            await db[collection].bulk_write([
+                UpdateOne(dict(key), {"$set": totals}, upsert=True) for key, totals in keys[start:start + batch_size]
+            ], ordered=False)
+    return reports, comments
+
+
+async def backfill(db, city: Optional[str] = None, batch_size: int = BACKFILL_BATCH_SIZE) -> dict:
+    """Recompute the rollups from every stored report and comment (hot and archived), one city at a time"""
+    cities = await _cities(db, city)
+    if not city:
+        # Rollups of cities that no longer have any reports
+        for collection, _ in GRANULARITIES.values():
+            await db[collection].delete_many({"city": {"$nin": cities}})
+
+    reports = comments = 0
+    for name in cities:
+        city_reports, city_comments = await _backfill_city(db, name, batch_size)
+        reports += city_reports
+        comments += city_comments
+    return {"reports": reports, "comments": comments}
+
+
+async def _main(args):
+    import server
+
+    server.init_db(server.create_mongo_client())
+    try:
+        await ensure_indexes(server.db)
+        result = await backfill(server.db, args.city)
+    finally:
+        server.client.close()
+    print(json.dumps(result, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill hourly and daily trend rollups from stored reports")
+    parser.add_argument("--city", help="Only backfill this city's rollups")
+    args = parser.parse_args()
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
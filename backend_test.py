@@ -10,6 +10,8 @@ import base64
 import os
 from datetime import datetime, timezone
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 # Configuration
 BASE_URL = "http://127.0.0.1:8000/api"
@@ -56,6 +58,25 @@ class CrimeReportAPITester:
             self.log_result("API Health Check", False, f"Connection failed: {str(e)}")
             return False
     
+    def test_readiness(self):
+        """Test readiness endpoint reports MongoDB latency and pool usage"""
+        try:
+            response = self.session.get(f"{self.base_url}/health/ready")
+            if response.status_code == 200:
+                data = response.json()
+                if data.get("status") == "ready" and "ping_ms" in data.get("mongo", {}) and "utilization" in data.get("pool", {}):
+                    self.log_result("Readiness Check", True, f"Ready, MongoDB ping {data['mongo']['ping_ms']}ms", data["pool"])
+                    return True
+                else:
+                    self.log_result("Readiness Check", False, "Invalid response format", data)
+                    return False
+            else:
+                self.log_result("Readiness Check", False, f"Readiness returned status {response.status_code}", response.text)
+                return False
+        except Exception as e:
+            self.log_result("Readiness Check", False, f"Readiness check failed: {str(e)}")
+            return False
+    
     def test_admin_login(self):
         """Test admin login functionality"""
         try:
@@ -227,6 +248,251 @@ class CrimeReportAPITester:
             self.log_result("Crime Report Creation", False, f"Crime report creation failed: {str(e)}")
             return False
     
+    def test_background_report_submission(self):
+        """Test crime report submission with background image processing"""
+        if not self.test_user_token:
+            self.log_result("Background Report Submission", False, "No user token available for testing")
+            return False
+            
+        try:
+            headers = {"Authorization": f"Bearer {self.test_user_token}"}
+            
+            crime_data = {
+                "crime_type": "Illegal Drug",
+                "location": "New Market, Bhopal",
+                "crime_time": datetime.now(timezone.utc).isoformat(),
+                "crime_details": "Report submitted with an image processed in the background"
+            }
+            # 1x1 PNG
+            image_bytes = base64.b64decode(
+                "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=="
+            )
+            
+            response = self.session.post(f"{self.base_url}/crime-reports", 
+                                       data={"crime_data": json.dumps(crime_data)},
+                                       files={"image": ("pixel.png", image_bytes, "image/png")},
+                                       params={"background": "true"},
+                                       headers=headers)
+            
+            if response.status_code != 202:
+                self.log_result("Background Report Submission", False, f"Expected 202, got {response.status_code}", 
+                              response.text)
+                return False
+            
+            report_id = response.json()["report_id"]
+            
+            # Poll until the job queue has attached the compressed image
+            for _ in range(20):
+                report = self.session.get(f"{self.base_url}/crime-reports/{report_id}").json()
+                if report.get("image_status") == "ready" and report.get("image_base64"):
+                    self.log_result("Background Report Submission", True, "Image processed in the background", {
+                        "report_id": report_id
+                    })
+                    return True
+                time.sleep(0.5)
+            
+            self.log_result("Background Report Submission", False, "Image was not processed in time", report.get("image_status"))
+            return False
+        except Exception as e:
+            self.log_result("Background Report Submission", False, f"Background report submission failed: {str(e)}")
+            return False
+    
+    def test_image_deduplication(self):
+        """Test a photo attached to a second report reuses the processed copy"""
+        if not self.test_user_token:
+            self.log_result("Image Deduplication", False, "No user token available for testing")
+            return False
+            
+        try:
+            headers = {"Authorization": f"Bearer {self.test_user_token}"}
+            # 1x1 PNG
+            image_bytes = base64.b64decode(
+                "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=="
+            )
+            reports = []
+            for i in range(2):
+                crime_data = {
+                    "crime_type": "Illegal Drug",
+                    "location": "New Market, Bhopal",
+                    "crime_time": datetime.now(timezone.utc).isoformat(),
+                    "crime_details": f"Image deduplication test report {i} {uuid.uuid4()}"
+                }
+                response = self.session.post(f"{self.base_url}/crime-reports", 
+                                           data={"crime_data": json.dumps(crime_data)},
+                                           files={"image": ("pixel.png", image_bytes, "image/png")},
+                                           headers=headers)
+                reports.append(response.json()["report"])
+            
+            metrics_url = self.base_url.rsplit("/api", 1)[0] + "/metrics"
+            metrics = self.session.get(metrics_url).text
+            if reports[0]["image_base64"] == reports[1]["image_base64"] and 'result="exact"' in metrics:
+                self.log_result("Image Deduplication", True, "Second upload reused the processed image")
+                return True
+            
+            self.log_result("Image Deduplication", False, "Processed image was not reused")
+            return False
+        except Exception as e:
+            self.log_result("Image Deduplication", False, f"Image deduplication test failed: {str(e)}")
+            return False
+    
+    def test_live_report_feed(self):
+        """Test the live report feed pushes newly created reports"""
+        if not self.test_user_token:
+            self.log_result("Live Report Feed", False, "No user token available for testing")
+            return False
+            
+        try:
+            headers = {"Authorization": f"Bearer {self.test_user_token}"}
+            stream = requests.get(f"{self.base_url}/stream/reports", params={"city": "Bhopal"}, stream=True, timeout=10)
+            lines = stream.iter_lines(decode_unicode=True)
+            next(lines)  # ": connected"
+            
+            crime_data = {
+                "crime_type": "Illegal Drug",
+                "location": "Live Feed Test Area",
+                "crime_time": datetime.now(timezone.utc).isoformat(),
+                "crime_details": "Report that should appear on the live feed"
+            }
+            response = self.session.post(f"{self.base_url}/crime-reports", 
+                                       data={"crime_data": json.dumps(crime_data)}, headers=headers)
+            report_id = response.json()["report"]["id"]
+            
+            event = None
+            for line in lines:
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: ") and event == "new":
+                    if json.loads(line[len("data: "):])["id"] == report_id:
+                        stream.close()
+                        self.log_result("Live Report Feed", True, "New report received over the live feed", {
+                            "report_id": report_id
+                        })
+                        return True
+            
+            stream.close()
+            self.log_result("Live Report Feed", False, "New report was not pushed to the live feed")
+            return False
+        except Exception as e:
+            self.log_result("Live Report Feed", False, f"Live report feed test failed: {str(e)}")
+            return False
+    
+    def test_read_your_writes(self):
+        """Test a user's own report is visible right after posting it"""
+        if not self.test_user_token:
+            self.log_result("Read Your Writes", False, "No user token available for testing")
+            return False
+            
+        try:
+            headers = {"Authorization": f"Bearer {self.test_user_token}"}
+            crime_data = {
+                "crime_type": "Illegal Drug",
+                "location": "Read Your Writes Test Area",
+                "crime_time": datetime.now(timezone.utc).isoformat(),
+                "crime_details": "Report that must show up in its author's next feed read"
+            }
+            # Plain requests (no session cookies) so only the response header carries the marker
+            response = requests.post(f"{self.base_url}/crime-reports", 
+                                     data={"crime_data": json.dumps(crime_data)}, headers=headers)
+            marker = response.headers.get("X-Read-Primary-Until")
+            if response.status_code != 200 or not marker:
+                self.log_result("Read Your Writes", False, "Write did not return a read-your-writes marker", {
+                    "status_code": response.status_code
+                })
+                return False
+            
+            report_id = response.json()["report"]["id"]
+            response = requests.get(f"{self.base_url}/crime-reports", params={"city": "Bhopal"},
+                                    headers={"X-Read-Primary-Until": marker})
+            ids = [report["id"] for report in response.json()]
+            if report_id in ids:
+                self.log_result("Read Your Writes", True, "New report visible in the author's next feed read", {
+                    "report_id": report_id
+                })
+                return True
+            
+            self.log_result("Read Your Writes", False, "New report missing from the author's next feed read")
+            return False
+        except Exception as e:
+            self.log_result("Read Your Writes", False, f"Read your writes test failed: {str(e)}")
+            return False
+
+    def test_idempotent_report_creation(self):
+        """Test a retried report submission with the same Idempotency-Key creates one report"""
+        if not self.test_user_token:
+            self.log_result("Idempotent Report Creation", False, "No user token available for testing")
+            return False
+            
+        try:
+            headers = {"Authorization": f"Bearer {self.test_user_token}", "Idempotency-Key": str(uuid.uuid4())}
+            crime_data = {
+                "crime_type": "Illegal Drug",
+                "location": "Idempotency Test Area",
+                "crime_time": datetime.now(timezone.utc).isoformat(),
+                "crime_details": "Idempotency test report"
+            }
+            responses = [
+                self.session.post(f"{self.base_url}/crime-reports", 
+                                data={"crime_data": json.dumps(crime_data)}, headers=headers)
+                for _ in range(2)
+            ]
+            first, retry = responses
+            
+            if (first.status_code == 200 and retry.status_code == 200
+                    and first.json()["report"]["id"] == retry.json()["report"]["id"]
+                    and retry.headers.get("Idempotent-Replayed") == "true"):
+                self.log_result("Idempotent Report Creation", True, "Retry replayed the original report", {
+                    "report_id": first.json()["report"]["id"]
+                })
+                return True
+            
+            self.log_result("Idempotent Report Creation", False, "Retry was not replayed", {
+                "status_codes": [first.status_code, retry.status_code]
+            })
+            return False
+        except Exception as e:
+            self.log_result("Idempotent Report Creation", False, f"Idempotency test failed: {str(e)}")
+            return False
+
+    def test_duplicate_report_detection(self):
+        """Test a reworded report of the same incident is linked to the original"""
+        if not self.test_user_token:
+            self.log_result("Duplicate Report Detection", False, "No user token available for testing")
+            return False
+            
+        try:
+            headers = {"Authorization": f"Bearer {self.test_user_token}"}
+            area = f"Duplicate Test Area {uuid.uuid4().hex[:8]}"
+            details = [
+                "Two men were selling ganja near the bus stand around 9 pm, one of them wore a red jacket",
+                "two guys selling ganja close to the bus stand at 9pm, one wore a red jacket. Please act fast"
+            ]
+            reports = []
+            for text in details:
+                crime_data = {
+                    "crime_type": "Illegal Drug",
+                    "location": area,
+                    "crime_time": datetime.now(timezone.utc).isoformat(),
+                    "crime_details": text
+                }
+                response = self.session.post(f"{self.base_url}/crime-reports", 
+                                           data={"crime_data": json.dumps(crime_data)}, headers=headers)
+                reports.append(response.json()["report"])
+            original, retelling = reports
+            
+            if retelling.get("duplicate_of") == original["id"] and not original.get("duplicate_of"):
+                self.log_result("Duplicate Report Detection", True, "Retelling linked to the original report", {
+                    "duplicate_score": retelling.get("duplicate_score")
+                })
+                return True
+            
+            self.log_result("Duplicate Report Detection", False, "Retelling was not linked", {
+                "duplicate_of": retelling.get("duplicate_of")
+            })
+            return False
+        except Exception as e:
+            self.log_result("Duplicate Report Detection", False, f"Duplicate detection test failed: {str(e)}")
+            return False
+
     def test_anonymous_crime_report(self):
         """Test anonymous crime report creation"""
         if not self.test_user_token:
@@ -343,6 +609,123 @@ class CrimeReportAPITester:
             self.log_result("Crime Feed Filtering", False, f"Filtering tests failed: {str(e)}")
             return False
     
+    def test_nearby_reports(self):
+        """Test nearby and bounding box report queries with keyset paging"""
+        if not self.test_user_token:
+            self.log_result("Nearby Reports", False, "No user token available for testing")
+            return False
+            
+        try:
+            headers = {"Authorization": f"Bearer {self.test_user_token}"}
+            crime_data = {
+                "crime_type": "Illegal Drug",
+                "location": "Nearby Test Area",
+                "coordinates": {"type": "Point", "coordinates": [77.4126, 23.2599]},
+                "crime_time": datetime.now(timezone.utc).isoformat(),
+                "crime_details": "Report with coordinates for nearby queries"
+            }
+            response = self.session.post(f"{self.base_url}/crime-reports", 
+                                       data={"crime_data": json.dumps(crime_data)}, headers=headers)
+            report_id = response.json()["report"]["id"]
+            
+            near = self.session.get(f"{self.base_url}/crime-reports", params={"near": "77.4130,23.2600", "radius_m": 500})
+            bbox = self.session.get(f"{self.base_url}/crime-reports", params={"bbox": "77.40,23.25,77.42,23.27"})
+            far = self.session.get(f"{self.base_url}/crime-reports", params={"near": "77.50,23.30", "radius_m": 500})
+            too_wide = self.session.get(f"{self.base_url}/crime-reports", params={"near": "77.41,23.26", "radius_m": 100000})
+            
+            first_page = self.session.get(f"{self.base_url}/crime-reports", params={"limit": 1})
+            cursor = first_page.headers.get("X-Next-Cursor")
+            second_page = self.session.get(f"{self.base_url}/crime-reports", params={"limit": 1, "after": cursor}) if cursor else None
+            
+            checks = {
+                "near": report_id in [r["id"] for r in near.json()],
+                "bbox": report_id in [r["id"] for r in bbox.json()],
+                "far": report_id not in [r["id"] for r in far.json()],
+                "radius_limit": too_wide.status_code == 400,
+                "keyset_paging": bool(second_page) and second_page.json()[0]["id"] != first_page.json()[0]["id"]
+            }
+            if all(checks.values()):
+                self.log_result("Nearby Reports", True, "Near, bbox and keyset paging queries work", checks)
+                return True
+            
+            self.log_result("Nearby Reports", False, "Unexpected nearby query results", checks)
+            return False
+        except Exception as e:
+            self.log_result("Nearby Reports", False, f"Nearby reports test failed: {str(e)}")
+            return False
+    
+    def test_heatmap(self):
+        """Test heatmap tiles count a newly created report"""
+        if not self.test_user_token:
+            self.log_result("Heatmap Tiles", False, "No user token available for testing")
+            return False
+            
+        try:
+            headers = {"Authorization": f"Bearer {self.test_user_token}"}
+            params = {"city": "Bhopal", "zoom": 16, "bbox": "77.30,23.10,77.32,23.12"}
+            before = self.session.get(f"{self.base_url}/stats/heatmap", params=params).json()
+            
+            crime_data = {
+                "crime_type": "Illegal Drug",
+                "location": "Heatmap Test Area",
+                "coordinates": {"type": "Point", "coordinates": [77.3101, 23.1101]},
+                "crime_time": datetime.now(timezone.utc).isoformat(),
+                "crime_details": "Report that should be counted in the heatmap"
+            }
+            self.session.post(f"{self.base_url}/crime-reports", 
+                            data={"crime_data": json.dumps(crime_data)}, headers=headers)
+            
+            response = self.session.get(f"{self.base_url}/stats/heatmap", params=params)
+            after = response.json()
+            total_before = sum(tile["count"] for tile in before["tiles"])
+            total_after = sum(tile["count"] for tile in after["tiles"])
+            if response.status_code == 200 and total_after == total_before + 1:
+                self.log_result("Heatmap Tiles", True, f"Heatmap served {len(after['tiles'])} tiles", {
+                    "elapsed_ms": round(response.elapsed.total_seconds() * 1000, 1)
+                })
+                return True
+            
+            self.log_result("Heatmap Tiles", False, "New report not counted in the heatmap", after)
+            return False
+        except Exception as e:
+            self.log_result("Heatmap Tiles", False, f"Heatmap test failed: {str(e)}")
+            return False
+    
+    def test_trends(self):
+        """Test hourly trend rollups count a newly created report"""
+        if not self.test_user_token:
+            self.log_result("Trend Rollups", False, "No user token available for testing")
+            return False
+            
+        try:
+            headers = {"Authorization": f"Bearer {self.test_user_token}"}
+            params = {"city": "Bhopal", "granularity": "hour", "location": "Trend Test Area"}
+            before = self.session.get(f"{self.base_url}/stats/trends", params=params).json()
+            
+            crime_data = {
+                "crime_type": "Illegal Drug",
+                "location": "Trend Test Area, Bhopal",
+                "crime_time": datetime.now(timezone.utc).isoformat(),
+                "crime_details": "Report that should be counted in the hourly trend"
+            }
+            self.session.post(f"{self.base_url}/crime-reports", 
+                            data={"crime_data": json.dumps(crime_data)}, headers=headers)
+            
+            response = self.session.get(f"{self.base_url}/stats/trends", params=params)
+            after = response.json()
+            invalid = self.session.get(f"{self.base_url}/stats/trends", params={"granularity": "minute"})
+            reports_before = sum(point["reports"] for point in before["series"])
+            reports_after = sum(point["reports"] for point in after["series"])
+            if response.status_code == 200 and reports_after == reports_before + 1 and invalid.status_code == 400:
+                self.log_result("Trend Rollups", True, "New report counted in the hourly trend", after["series"][-1])
+                return True
+            
+            self.log_result("Trend Rollups", False, "New report not counted in the hourly trend", after)
+            return False
+        except Exception as e:
+            self.log_result("Trend Rollups", False, f"Trend rollups test failed: {str(e)}")
+            return False
+    
     def test_individual_report_retrieval(self):
         """Test retrieving individual crime report by ID"""
         if not self.test_report_id:
@@ -373,6 +756,105 @@ class CrimeReportAPITester:
             self.log_result("Individual Report Retrieval", False, f"Report retrieval failed: {str(e)}")
             return False
     
+    def test_concurrent_report_reads(self):
+        """Test concurrent reads of one report are collapsed into shared queries"""
+        if not self.test_report_id:
+            self.log_result("Concurrent Report Reads", False, "No report ID available for testing")
+            return False
+            
+        try:
+            url = f"{self.base_url}/crime-reports/{self.test_report_id}"
+            # Fresh sessions, so no read-your-writes marker sends the reads to the primary
+            with ThreadPoolExecutor(max_workers=20) as pool:
+                statuses = list(pool.map(lambda _: requests.get(url).status_code, range(100)))
+            
+            metrics_url = self.base_url.rsplit("/api", 1)[0] + "/metrics"
+            metrics = self.session.get(metrics_url).text
+            collapsed = 'route="report_detail",source="in_flight"' in metrics or \
+                'route="report_detail",source="cache"' in metrics
+            if set(statuses) == {200} and collapsed:
+                self.log_result("Concurrent Report Reads", True, "Concurrent reads were served from shared queries")
+                return True
+            
+            self.log_result("Concurrent Report Reads", False, "Reads were not collapsed", {
+                "statuses": sorted(set(statuses))
+            })
+            return False
+        except Exception as e:
+            self.log_result("Concurrent Report Reads", False, f"Concurrent read test failed: {str(e)}")
+            return False
+    
+    def test_batch_requests(self):
+        """Test several API calls sent together in one batch request"""
+        if not self.test_user_token or not self.test_report_id:
+            self.log_result("Batch Requests", False, "Missing user token or report ID for testing")
+            return False
+            
+        try:
+            headers = {"Authorization": f"Bearer {self.test_user_token}"}
+            batch = {"requests": [
+                {"id": "me", "path": "/api/me"},
+                {"id": "types", "path": "/api/crime-types"},
+                {"id": "report", "path": f"/api/crime-reports/{self.test_report_id}"},
+                {"id": "comments", "path": f"/api/crime-reports/{self.test_report_id}/comments"},
+                {"id": "admin", "path": "/api/admin/moderation-queue"}
+            ]}
+            
+            response = self.session.post(f"{self.base_url}/batch", json=batch, headers=headers)
+            if response.status_code != 200:
+                self.log_result("Batch Requests", False, f"Batch failed with status {response.status_code}", response.text)
+                return False
+            
+            statuses = {item["id"]: item["status"] for item in response.json()}
+            expected = {"me": 200, "types": 200, "report": 200, "comments": 200, "admin": 403}
+            if statuses == expected:
+                self.log_result("Batch Requests", True, "Batched calls returned their own results")
+                return True
+            
+            self.log_result("Batch Requests", False, "Unexpected sub-request statuses", statuses)
+            return False
+        except Exception as e:
+            self.log_result("Batch Requests", False, f"Batch test failed: {str(e)}")
+            return False
+    
+    def test_delta_sync(self):
+        """Test that delta sync returns only what changed since a token"""
+        if not self.test_user_token or not self.test_report_id:
+            self.log_result("Delta Sync", False, "Missing user token or report ID for testing")
+            return False
+            
+        try:
+            response = self.session.get(f"{self.base_url}/sync", params={"city": "Bhopal"})
+            if response.status_code != 200:
+                self.log_result("Delta Sync", False, f"Token request failed with status {response.status_code}", response.text)
+                return False
+            token = response.json()["token"]
+            
+            headers = {"Authorization": f"Bearer {self.test_user_token}"}
+            comment = {"comment_text": f"Delta sync check {uuid.uuid4()}"}
+            self.session.post(f"{self.base_url}/crime-reports/{self.test_report_id}/comments", json=comment, headers=headers)
+            
+            response = self.session.get(f"{self.base_url}/sync", params={"city": "Bhopal", "since": token})
+            if response.status_code != 200:
+                self.log_result("Delta Sync", False, f"Sync failed with status {response.status_code}", response.text)
+                return False
+            
+            changes = response.json()
+            synced_comment = any(c["comment_text"] == comment["comment_text"] for c in changes["comments"])
+            synced_stats = any(s["id"] == self.test_report_id for s in changes["stats"]) or \
+                any(r["id"] == self.test_report_id for r in changes["reports"])
+            if synced_comment and synced_stats:
+                self.log_result("Delta Sync", True, "New comment and updated stats returned since the token")
+                return True
+            
+            self.log_result("Delta Sync", False, "Changes missing from the sync response", {
+                "comments": len(changes["comments"]), "stats": len(changes["stats"]), "reports": len(changes["reports"])
+            })
+            return False
+        except Exception as e:
+            self.log_result("Delta Sync", False, f"Delta sync test failed: {str(e)}")
+            return False
+    
     def test_comments_system(self):
         """Test adding and retrieving comments on crime reports"""
         if not self.test_user_token or not self.test_report_id:
@@ -471,6 +953,46 @@ class CrimeReportAPITester:
             self.log_result("Credibility Rating System", False, f"Credibility rating test failed: {str(e)}")
             return False
     
+    def test_hot_feed(self):
+        """Test the hot feed ranks an engaged report above a quiet one"""
+        if not self.test_user_token:
+            self.log_result("Hot Feed", False, "No user token available for testing")
+            return False
+            
+        try:
+            headers = {"Authorization": f"Bearer {self.test_user_token}"}
+            report_ids = []
+            for label in ("quiet", "engaged"):
+                crime_data = {
+                    "crime_type": "Illegal Drug",
+                    "location": "Hot Feed Test Area",
+                    "crime_time": datetime.now(timezone.utc).isoformat(),
+                    "crime_details": f"Hot feed test report ({label})"
+                }
+                response = self.session.post(f"{self.base_url}/crime-reports", 
+                                           data={"crime_data": json.dumps(crime_data)}, headers=headers)
+                report_ids.append(response.json()["report"]["id"])
+            quiet_id, engaged_id = report_ids
+            
+            for i in range(3):
+                self.session.post(f"{self.base_url}/crime-reports/{engaged_id}/comments", 
+                                json={"comment_text": f"Hot feed comment {i}"}, headers=headers)
+            self.session.post(f"{self.base_url}/crime-reports/{engaged_id}/rating", json={"rating": 9}, headers=headers)
+            
+            response = self.session.get(f"{self.base_url}/crime-reports", params={"sort": "hot", "limit": 100})
+            ids = [r["id"] for r in response.json()]
+            if response.status_code == 200 and engaged_id in ids and (quiet_id not in ids or ids.index(engaged_id) < ids.index(quiet_id)):
+                self.log_result("Hot Feed", True, "Engaged report ranked above the quiet one", {
+                    "engaged_rank": ids.index(engaged_id)
+                })
+                return True
+            
+            self.log_result("Hot Feed", False, "Unexpected hot feed order", {"status_code": response.status_code})
+            return False
+        except Exception as e:
+            self.log_result("Hot Feed", False, f"Hot feed test failed: {str(e)}")
+            return False
+    
     def test_admin_crime_types_crud(self):
         """Test admin CRUD operations for crime types"""
         if not self.admin_token:
@@ -627,6 +1149,214 @@ class CrimeReportAPITester:
             self.log_result("Admin View All Reports", False, f"Admin view all reports test failed: {str(e)}")
             return False
     
+    def test_admin_moderation_queue(self):
+        """Test admin moderation queue is ordered by moderation priority"""
+        if not self.admin_token:
+            self.log_result("Admin Moderation Queue", False, "No admin token available for testing")
+            return False
+            
+        try:
+            headers = {"Authorization": f"Bearer {self.admin_token}"}
+            
+            response = self.session.get(f"{self.base_url}/admin/moderation-queue", headers=headers, params={"limit": 10})
+            
+            if response.status_code == 200:
+                reports = response.json()
+                priorities = [r.get("moderation_priority", 0) for r in reports]
+                if priorities == sorted(priorities, reverse=True) and all(not r["is_blocked"] for r in reports):
+                    self.log_result("Admin Moderation Queue", True, f"Moderation queue returned {len(reports)} reports in priority order", {
+                        "top_priority": priorities[0] if priorities else None
+                    })
+                    return True
+                else:
+                    self.log_result("Admin Moderation Queue", False, "Moderation queue not ordered by priority", priorities)
+                    return False
+            else:
+                self.log_result("Admin Moderation Queue", False, f"Moderation queue failed with status {response.status_code}", 
+                              response.text)
+                return False
+        except Exception as e:
+            self.log_result("Admin Moderation Queue", False, f"Moderation queue test failed: {str(e)}")
+            return False
+    
+    def test_admin_bulk_import(self):
+        """Test admin bulk import of reports from NDJSON"""
+        if not self.admin_token:
+            self.log_result("Admin Bulk Import", False, "No admin token available for testing")
+            return False
+            
+        try:
+            headers = {"Authorization": f"Bearer {self.admin_token}"}
+            rows = [
+                {
+                    "crime_type": "Illegal Drug",
+                    "location": "Historical Import Area",
+                    "crime_time": datetime.now(timezone.utc).isoformat(),
+                    "crime_details": f"Imported historical report {i}"
+                }
+                for i in range(3)
+            ]
+            rows.append({"location": "Missing required fields"})
+            ndjson = "\n".join(json.dumps(row) for row in rows)
+            
+            files = {"file": ("reports.ndjson", ndjson, "application/x-ndjson")}
+            response = self.session.post(f"{self.base_url}/admin/import", files=files, headers=headers, params={"batch_size": 2})
+            
+            if response.status_code == 200:
+                data = response.json()
+                if data.get("inserted") == 3 and data.get("failed") == 1 and data["errors"][0]["row"] == 4:
+                    self.log_result("Admin Bulk Import", True, f"Imported {data['inserted']} rows at {data['rows_per_second']} rows/s", data)
+                    return True
+                else:
+                    self.log_result("Admin Bulk Import", False, "Unexpected import result", data)
+                    return False
+            else:
+                self.log_result("Admin Bulk Import", False, f"Bulk import failed with status {response.status_code}", 
+                              response.text)
+                return False
+        except Exception as e:
+            self.log_result("Admin Bulk Import", False, f"Bulk import test failed: {str(e)}")
+            return False
+    
+    def test_admin_report_archive(self):
+        """Test old reports move to the archive and stay readable"""
+        if not self.admin_token:
+            self.log_result("Admin Report Archive", False, "No admin token available for testing")
+            return False
+            
+        try:
+            headers = {"Authorization": f"Bearer {self.admin_token}"}
+            report_id = f"archive-test-{int(time.time())}"
+            row = {
+                "id": report_id,
+                "crime_type": "Illegal Drug",
+                "location": "Archive Test Area",
+                "crime_time": "2001-01-01T00:00:00Z",
+                "created_at": "2001-01-01T00:00:00Z",
+                "crime_details": "Historical report old enough to be archived"
+            }
+            files = {"file": ("reports.ndjson", json.dumps(row), "application/x-ndjson")}
+            self.session.post(f"{self.base_url}/admin/import", files=files, headers=headers)
+            
+            response = self.session.post(f"{self.base_url}/admin/archive", params={"older_than_days": 3650}, headers=headers)
+            if response.status_code != 200:
+                self.log_result("Admin Report Archive", False, f"Archive request failed with status {response.status_code}")
+                return False
+            
+            for _ in range(20):
+                report = self.session.get(f"{self.base_url}/crime-reports/{report_id}").json()
+                if report.get("archived_at"):
+                    break
+                time.sleep(1)
+            else:
+                self.log_result("Admin Report Archive", False, "Report was not archived")
+                return False
+            
+            params = {"location": "Archive Test Area", "limit": 100}
+            feed = self.session.get(f"{self.base_url}/crime-reports", params={**params, "include_archived": "true"}).json()
+            hot_feed = self.session.get(f"{self.base_url}/crime-reports", params=params).json()
+            if report_id in [r["id"] for r in feed] and report_id not in [r["id"] for r in hot_feed]:
+                self.log_result("Admin Report Archive", True, "Archived report readable by id and with include_archived", {
+                    "report_id": report_id
+                })
+                return True
+            
+            self.log_result("Admin Report Archive", False, "Archived report not served from the right tier")
+            return False
+        except Exception as e:
+            self.log_result("Admin Report Archive", False, f"Report archive test failed: {str(e)}")
+            return False
+    
+    def test_admin_export(self):
+        """Test admin streaming export of reports as NDJSON and CSV"""
+        if not self.admin_token:
+            self.log_result("Admin Export", False, "No admin token available for testing")
+            return False
+            
+        try:
+            headers = {"Authorization": f"Bearer {self.admin_token}"}
+            
+            response = self.session.get(f"{self.base_url}/admin/export", headers=headers, params={"format": "ndjson"}, stream=True)
+            if response.status_code != 200:
+                self.log_result("Admin Export", False, f"NDJSON export failed with status {response.status_code}", response.text)
+                return False
+            
+            reports = [json.loads(line) for line in response.iter_lines() if line]
+            if any("image_base64" in report for report in reports):
+                self.log_result("Admin Export", False, "Images should be excluded from export by default")
+                return False
+            
+            response = self.session.get(f"{self.base_url}/admin/export", headers=headers, params={"format": "csv"})
+            if response.status_code != 200 or not response.text.startswith("id,"):
+                self.log_result("Admin Export", False, f"CSV export failed with status {response.status_code}", response.text[:200])
+                return False
+            
+            self.log_result("Admin Export", True, f"Exported {len(reports)} reports as NDJSON and CSV")
+            return True
+        except Exception as e:
+            self.log_result("Admin Export", False, f"Export test failed: {str(e)}")
+            return False
+    
+    def test_metrics_endpoint(self):
+        """Test Prometheus metrics exposition"""
+        try:
+            metrics_url = self.base_url.rsplit("/api", 1)[0] + "/metrics"
+            response = self.session.get(metrics_url)
+            
+            if response.status_code == 200:
+                expected = ["http_requests_total", "http_request_duration_seconds_bucket",
+                            "mongodb_command_duration_seconds_bucket", "bcrypt_duration_seconds_count"]
+                missing = [name for name in expected if name not in response.text]
+                if not missing:
+                    self.log_result("Metrics Endpoint", True, "Metrics exposed for routes, MongoDB and bcrypt")
+                    return True
+                else:
+                    self.log_result("Metrics Endpoint", False, f"Missing metrics: {missing}")
+                    return False
+            else:
+                self.log_result("Metrics Endpoint", False, f"Metrics endpoint returned status {response.status_code}")
+                return False
+        except Exception as e:
+            self.log_result("Metrics Endpoint", False, f"Metrics test failed: {str(e)}")
+            return False
+    
+    def test_admin_request_profiling(self):
+        """Test admin opt-in request profiling"""
+        if not self.admin_token or not self.test_user_token:
+            self.log_result("Admin Request Profiling", False, "Tokens not available for testing")
+            return False
+            
+        try:
+            admin_headers = {"Authorization": f"Bearer {self.admin_token}", "X-Profile": "1"}
+            user_headers = {"Authorization": f"Bearer {self.test_user_token}", "X-Profile": "1"}
+            
+            response = self.session.get(f"{self.base_url}/crime-reports", params={"search": "drug"}, headers=user_headers)
+            if "X-Profile-Id" in response.headers:
+                self.log_result("Admin Request Profiling", False, "Non-admin request should not be profiled")
+                return False
+            
+            response = self.session.get(f"{self.base_url}/crime-reports", params={"search": "drug"}, headers=admin_headers)
+            profile_id = response.headers.get("X-Profile-Id")
+            if not profile_id:
+                self.log_result("Admin Request Profiling", False, "Admin request was not profiled")
+                return False
+            
+            response = self.session.get(f"{self.base_url}/admin/profiles/{profile_id}",
+                                      headers={"Authorization": f"Bearer {self.admin_token}"})
+            if response.status_code == 200 and "cumulative" in response.json().get("profile", ""):
+                self.log_result("Admin Request Profiling", True, "Profile stored and retrieved", {
+                    "duration_ms": response.json()["duration_ms"],
+                    "db_ops": response.json()["db_ops"]["count"]
+                })
+                return True
+            else:
+                self.log_result("Admin Request Profiling", False, f"Profile retrieval failed with status {response.status_code}",
+                              response.text)
+                return False
+        except Exception as e:
+            self.log_result("Admin Request Profiling", False, f"Request profiling test failed: {str(e)}")
+            return False
+    
     def test_enhanced_report_statistics(self):
         """Test that reports show enhanced statistics (avg_credibility, total_ratings, comments_count)"""
         if not self.test_report_id:
@@ -671,21 +1401,41 @@ class CrimeReportAPITester:
         # Test sequence
         tests = [
             ("API Health Check", self.test_health_check),
+            ("Readiness Check", self.test_readiness),
             ("Admin Login", self.test_admin_login),
             ("User Registration", self.test_user_registration),
             ("User Token Verification", self.test_user_login),
             ("Crime Types API", self.test_crime_types),
             ("Crime Report Creation", self.test_crime_report_creation),
+            ("Idempotent Report Creation", self.test_idempotent_report_creation),
+            ("Duplicate Report Detection", self.test_duplicate_report_detection),
             ("Anonymous Crime Report", self.test_anonymous_crime_report),
+            ("Background Report Submission", self.test_background_report_submission),
+            ("Image Deduplication", self.test_image_deduplication),
+            ("Live Report Feed", self.test_live_report_feed),
+            ("Read Your Writes", self.test_read_your_writes),
             ("Crime Feed Basic", self.test_crime_feed_basic),
             ("Crime Feed Filtering", self.test_crime_feed_filtering),
+            ("Nearby Reports", self.test_nearby_reports),
+            ("Heatmap Tiles", self.test_heatmap),
+            ("Trend Rollups", self.test_trends),
             ("Individual Report Retrieval", self.test_individual_report_retrieval),
+            ("Concurrent Report Reads", self.test_concurrent_report_reads),
+            ("Batch Requests", self.test_batch_requests),
+            ("Delta Sync", self.test_delta_sync),
             ("Enhanced Report Statistics", self.test_enhanced_report_statistics),
             ("Comments System", self.test_comments_system),
             ("Credibility Rating System", self.test_credibility_rating_system),
+            ("Hot Feed", self.test_hot_feed),
             ("Admin Crime Types CRUD", self.test_admin_crime_types_crud),
             ("Admin Report Blocking", self.test_admin_report_blocking),
-            ("Admin View All Reports", self.test_admin_view_all_reports)
+            ("Admin View All Reports", self.test_admin_view_all_reports),
+            ("Admin Moderation Queue", self.test_admin_moderation_queue),
+            ("Admin Bulk Import", self.test_admin_bulk_import),
+            ("Admin Report Archive", self.test_admin_report_archive),
+            ("Admin Export", self.test_admin_export),
+            ("Metrics Endpoint", self.test_metrics_endpoint),
+            ("Admin Request Profiling", self.test_admin_request_profiling)
         ]
         
         passed = 0
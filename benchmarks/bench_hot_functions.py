@@ -0,0 +1,151 @@
+"""
+Micro-benchmarks for hot backend functions.
+
+Runs offline (no MongoDB needed). Baselines are stored with
+pytest-benchmark and later runs fail if they regress past a threshold:
+
+    pytest benchmarks/bench_hot_functions.py --benchmark-storage=benchmarks/.baselines --benchmark-save=baseline
+    pytest benchmarks/bench_hot_functions.py --benchmark-storage=benchmarks/.baselines \\
+        --benchmark-compare --benchmark-compare-fail=median:20%
+
+Baselines are machine specific, so none are committed; timings saved on
+one machine say nothing about another. To check a change, save a baseline
+from the commit before it, then compare the change against it on the same
+machine:
+
+    git stash && pytest benchmarks/bench_hot_functions.py --benchmark-storage=benchmarks/.baselines \
+        --benchmark-save=baseline && git stash pop
+    pytest benchmarks/bench_hot_functions.py --benchmark-storage=benchmarks/.baselines \
+        --benchmark-compare --benchmark-compare-fail=median:20%
+"""
+
+import asyncio
+import base64
+import io
+import uuid
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from fastapi import Request
+from fastapi.security import HTTPAuthorizationCredentials
+from mongomock_motor import AsyncMongoMockClient
+from PIL import Image
+
+import server
+from models import CrimeReport, User
+
+IMAGE_SIZES = [(640, 480), (1280, 960), (3000, 2000)]
+IMAGE_FORMATS = ["JPEG", "PNG", "PNG-RGBA"]
+
+
+def make_image_base64(size, fmt):
+    """Photo-like test image: smooth gradients with some sensor-style noise"""
+    width, height = size
+    gradient = Image.linear_gradient("L").resize(size)
+    noise = Image.effect_noise(size, 40)
+    img = Image.merge("RGB", (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    if fmt == "PNG-RGBA":
+        img.putalpha(gradient)
+        fmt = "PNG"
+
+    output = io.BytesIO()
+    img.save(output, format=fmt, **({"quality": 92} if fmt == "JPEG" else {}))
+    return base64.b64encode(output.getvalue()).decode("utf-8")
+
+
+def make_report_docs(count):
+    """Report documents as Motor returns them: with _id and naive UTC datetimes"""
+    now = datetime.utcnow()
+    return [
+        {
+            "_id": uuid.uuid4().hex[:24],
+            "id": str(uuid.uuid4()),
+            "user_id": str(uuid.uuid4()),
+            "user_name": "Benchmark User",
+            "crime_type": "Illegal Drug",
+            "location": "MP Nagar, Bhopal",
+            "landmark": "Zone 1 Market",
+            "crime_time": now - timedelta(hours=i),
+            "criminal_name": None,
+            "crime_details": "Suspicious drug dealing activity observed near the market area " * 3,
+            "is_anonymous": False,
+            "city": "Bhopal",
+            "image_base64": None,
+            "is_blocked": False,
+            "avg_credibility": 6.5,
+            "total_ratings": 12,
+            "comments_count": 4,
+            "moderation_priority": 1.25,
+            "created_at": now - timedelta(hours=i),
+        }
+        for i in range(count)
+    ]
+
+
+# Image compression
+
+@pytest.mark.parametrize("fmt", IMAGE_FORMATS)
+@pytest.mark.parametrize("size", IMAGE_SIZES, ids=lambda s: f"{s[0]}x{s[1]}")
+def test_compress_image(benchmark, size, fmt):
+    image_base64 = make_image_base64(size, fmt)
+    result = benchmark.pedantic(server.compress_image, args=(image_base64,), rounds=5, iterations=1)
+    assert len(base64.b64decode(result)) <= 80 * 1024 or result == image_base64
+
+
+# Passwords
+
+def test_hash_password(benchmark):
+    hashed = benchmark.pedantic(server.hash_password, args=("Asdf123$",), rounds=5, iterations=1)
+    assert hashed.startswith("$2")
+
+
+def test_verify_password(benchmark):
+    hashed = server.hash_password("Asdf123$")
+    assert benchmark.pedantic(server.verify_password, args=("Asdf123$", hashed), rounds=5, iterations=1)
+
+
+# JWT
+
+def test_create_jwt_token(benchmark):
+    token = benchmark(server.create_jwt_token, str(uuid.uuid4()), False)
+    assert token.count(".") == 2
+
+
+def test_jwt_decode(benchmark):
+    token = server.create_jwt_token(str(uuid.uuid4()))
+    payload = benchmark(jwt.decode, token, server.JWT_SECRET, algorithms=[server.JWT_ALGORITHM])
+    assert "user_id" in payload
+
+
+@pytest.mark.parametrize("cache", ["miss", "hit"])
+def test_get_current_user(benchmark, monkeypatch, cache):
+    loop = asyncio.new_event_loop()
+    db = AsyncMongoMockClient()["benchmark"]
+    user = User(name="Benchmark User", email="bench@example.com")
+    loop.run_until_complete(db.users.insert_one({**user.dict(), "password": "x"}))
+    monkeypatch.setattr(server, "db", db)
+    server.user_cache.invalidate()
+
+    request = Request({"type": "http", "headers": []})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=server.create_jwt_token(user.id))
+
+    def lookup():
+        # A miss decodes the token, queries the users collection and builds the model
+        if cache == "miss":
+            server.user_cache.invalidate()
+        return loop.run_until_complete(server.get_current_user(request, credentials))
+
+    result = benchmark(lookup)
+    loop.close()
+    server.user_cache.invalidate()
+    assert result.id == user.id
+
+
+# Model conversion
+
+@pytest.mark.parametrize("rows", [50, 500])
+def test_crime_report_list_conversion(benchmark, rows):
+    reports = make_report_docs(rows)
+    result = benchmark(lambda: [CrimeReport(**report) for report in reports])
+    assert len(result) == rows
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Detection Benchmark for Crime Reporting App
+Generates incidents that are each reported one or more times in reworded
+form (dropped and swapped words, synonyms, filler), mixed with distinct
+incidents built from the same stock phrases in the same neighbourhoods, and
+runs them through the in-memory duplicate index in submission order.
+
+Reports precision and recall of the duplicate links and the per-report
+latency of signing and matching. Runs offline (no MongoDB needed).
+
+    python benchmarks/duplicate_detection.py --incidents 5000
+    python benchmarks/duplicate_detection.py --threshold 0.3 --window-hours 12
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import duplicates  # noqa: E402
+
+AREAS = [
+    "MP Nagar", "New Market", "Arera Colony", "Kolar Road", "Habibganj", "Bairagarh", "Shahpura", "TT Nagar",
+    "Govindpura", "Ayodhya Nagar", "Karond", "Jahangirabad", "Berasia Road", "Misrod", "Bawadiya Kalan",
+]
+# An incident is described by one opening, with its slots filled, and a few details
+OPENINGS = [
+    "{count} men were selling {drug} near the {place} around {hour} pm",
+    "A {colour} {vehicle} was seen carrying {animal} towards the {place} at about {hour} pm",
+    "Someone is running a {drug} racket from a shop behind the {place}",
+    "{count} people forced a girl into a {colour} {vehicle} near the {place} at {hour} pm",
+    "Cattle are being loaded into a {colour} {vehicle} every night behind the {place}",
+    "A group of boys is supplying {drug} to students outside the {place}",
+]
+DETAILS = [
+    "one of them wore a {colour} jacket", "they had a bike with no number plate", "the driver had a beard",
+    "there were no papers for the animals", "buyers come every evening", "a local shopkeeper is involved",
+    "they left towards the highway", "the girl was crying for help", "the same people were here last week",
+    "they threatened people who watched", "the vehicle had an out of state number", "one man was limping",
+    "they were talking on a walkie talkie", "the shutter of the shop was half open", "a police jeep passed by",
+    "they counted money under the street light", "the animals looked injured", "a tall man was giving orders",
+]
+VALUES = {
+    "count": ["Two", "Three", "Four", "Five"],
+    "drug": ["ganja", "brown sugar", "smack", "charas"],
+    "place": ["bus stand", "railway crossing", "college gate", "vegetable market", "petrol pump", "temple"],
+    "hour": ["7", "8", "9", "10", "11"],
+    "colour": ["red", "black", "white", "blue", "green"],
+    "vehicle": ["truck", "van", "pickup", "car"],
+    "animal": ["cows", "buffaloes", "goats", "calves"],
+}
+SYNONYMS = {
+    "men": "guys", "selling": "dealing", "near": "close to", "around": "at about", "seen": "spotted",
+    "towards": "in the direction of", "shop": "store", "evening": "night", "forced": "pushed", "left": "went",
+}
+FILLERS = ["Please act fast.", "I saw this myself.", "This happens often.", "Police should check.", ""]
+
+
+def reword(text, rng):
+    words = []
+    for word in text.split():
+        if rng.random() < 0.1:
+            continue  # dropped word
+        words.append(SYNONYMS[word] if word in SYNONYMS and rng.random() < 0.4 else word)
+    for _ in range(rng.randint(0, 2)):
+        i = rng.randrange(len(words) - 1)
+        words[i], words[i + 1] = words[i + 1], words[i]
+    text = " ".join(words)
+    return f"{text} {rng.choice(FILLERS)}".strip() if rng.random() < 0.5 else text
+
+
+def make_reports(incidents, max_reports, rng):
+    now = datetime.now(timezone.utc)
+    reports = []
+    for incident in range(incidents):
+        values = {key: rng.choice(choices) for key, choices in VALUES.items()}
+        parts = [rng.choice(OPENINGS)] + rng.sample(DETAILS, rng.randint(1, 3))
+        text = ", ".join(parts).format(**values)
+        area = rng.choice(AREAS)
+        crime_time = now - timedelta(hours=rng.uniform(0, 24 * 30))
+        for _ in range(rng.choices(range(1, max_reports + 1), weights=[8] + [1] * (max_reports - 1))[0]):
+            reports.append({
+                "id": str(uuid.uuid4()),
+                "incident": incident,
+                "city": "Bhopal",
+                "location": f"{area}, Bhopal",
+                "crime_time": crime_time,
+                "created_at": crime_time + timedelta(minutes=rng.uniform(5, 600)),
+                "crime_details": reword(text, rng),
+            })
+    reports.sort(key=lambda report: report["created_at"])
+    return reports
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    reports = make_reports(args.incidents, args.max_reports, rng)
+    index = duplicates.DuplicateIndex(
+        None, threshold=args.threshold, window_hours=args.window_hours, radius_m=args.radius_m
+    )
+
+    incident_of, seen = {}, set()
+    timings, linked, correct, expected = [], 0, 0, 0
+    for report in reports:
+        started = time.perf_counter()
+        entry = duplicates.Entry.from_report(report)
+        index.prune(entry.created_at)
+        match = index.match(entry)
+        if match:
+            entry.duplicate_of = match[0]
+        index.add(entry)
+        timings.append((time.perf_counter() - started) * 1e6)
+
+        incident_of[report["id"]] = report["incident"]
+        expected += report["incident"] in seen
+        seen.add(report["incident"])
+        if match:
+            linked += 1
+            correct += incident_of[match[0]] == report["incident"]
+
+    timings.sort()
+    return {
+        "reports": len(reports),
+        "incidents": args.incidents,
+        "threshold": args.threshold,
+        "expected_duplicates": expected,
+        "linked": linked,
+        "precision": round(correct / linked, 4) if linked else None,
+        "recall": round(correct / expected, 4) if expected else None,
+        "median_us": round(statistics.median(timings), 1),
+        "p99_us": round(timings[int(0.99 * (len(timings) - 1))], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure precision, recall and latency of near-duplicate detection")
+    parser.add_argument("--incidents", type=int, default=3000)
+    parser.add_argument("--max-reports", type=int, default=4, help="Most reports of a single incident")
+    parser.add_argument("--threshold", type=float, default=duplicates.DEFAULT_THRESHOLD)
+    parser.add_argument("--window-hours", type=float, default=duplicates.DEFAULT_WINDOW_HOURS)
+    parser.add_argument("--radius-m", type=float, default=duplicates.DEFAULT_RADIUS_METERS)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args), indent=2))
+
+
+if __name__ == "__main__":
+    main()
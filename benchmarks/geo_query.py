@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Nearby Reports Benchmark for Crime Reporting App
+Seeds a city of reports with coordinates into a local mongod and compares
+the old free-text location filter (case-insensitive $regex) against the
+2dsphere-backed near and bbox filters, reporting median latency and the
+documents each query plan examines.
+
+Needs a real mongod (the in-memory stand-in has no geo queries).
+
+    python benchmarks/geo_query.py --reports 50000 --runs 50
+    python benchmarks/geo_query.py --mongo-url mongodb://localhost:27017 --radius-m 500
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import geo  # noqa: E402
+import partitions  # noqa: E402
+
+# Neighbourhoods of Bhopal as (name, lng, lat)
+LOCATIONS = [
+    ("MP Nagar", 77.4340, 23.2330),
+    ("New Market", 77.4010, 23.2336),
+    ("Arera Colony", 77.4300, 23.2150),
+    ("Kolar Road", 77.4150, 23.1750),
+    ("Habibganj", 77.4380, 23.2250),
+    ("Bairagarh", 77.3480, 23.2750),
+    ("Shahpura", 77.4220, 23.2000),
+]
+OTHER_CITIES = ["Indore", "Jabalpur", "Gwalior"]
+METERS_PER_DEGREE = 111320
+
+
+def make_report(rng, now):
+    name, lng, lat = rng.choice(LOCATIONS)
+    # Scatter reports up to ~1.5km around the neighbourhood centre
+    lng += rng.uniform(-1500, 1500) / (METERS_PER_DEGREE * math.cos(math.radians(lat)))
+    lat += rng.uniform(-1500, 1500) / METERS_PER_DEGREE
+    return {
+        "id": str(uuid.uuid4()),
+        "city": "Bhopal" if rng.random() < 0.7 else rng.choice(OTHER_CITIES),
+        "crime_type": "Illegal Drug",
+        "location": f"{name}, Bhopal",
+        "coordinates": {"type": "Point", "coordinates": [round(lng, 6), round(lat, 6)]},
+        "crime_details": "Benchmark report",
+        "is_blocked": False,
+        "created_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 365)),
+    }
+
+
+async def seed(collection, count, rng):
+    now = datetime.now(timezone.utc)
+    batch = []
+    for _ in range(count):
+        batch.append(make_report(rng, now))
+        if len(batch) == 1000:
+            await collection.insert_many(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch)
+    for keys, options in partitions.REPORT_INDEXES:
+        await collection.create_index(keys, **options)
+
+
+async def measure(collection, query, limit, runs):
+    sort = [("created_at", -1), ("id", -1)]
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await collection.find(query).sort(sort).limit(limit).to_list(length=None)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    explain = await collection.find(query).sort(sort).limit(limit).explain()
+    stats = explain.get("executionStats", {})
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(sorted(timings)[int(0.95 * (len(timings) - 1))], 3),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "returned": stats.get("nReturned"),
+    }
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    client = AsyncIOMotorClient(args.mongo_url, serverSelectionTimeoutMS=2000)
+    collection = client[args.db_name].crime_reports
+    name, lng, lat = LOCATIONS[0]
+    delta_lng = args.radius_m / (METERS_PER_DEGREE * math.cos(math.radians(lat)))
+    delta_lat = args.radius_m / METERS_PER_DEGREE
+    base = partitions.report_filter("Bhopal", is_blocked=False)
+
+    queries = {
+        "regex_location": {**base, "location": {"$regex": name, "$options": "i"}},
+        "near": {**base, "$and": geo.geo_conditions(near=f"{lng},{lat}", radius_m=args.radius_m)},
+        "bbox": {**base, "$and": geo.geo_conditions(
+            bbox=f"{lng - delta_lng},{lat - delta_lat},{lng + delta_lng},{lat + delta_lat}"
+        )},
+    }
+
+    try:
+        await client.drop_database(args.db_name)
+        await seed(collection, args.reports, rng)
+        results = {label: await measure(collection, query, args.limit, args.runs) for label, query in queries.items()}
+    finally:
+        await client.drop_database(args.db_name)
+        client.close()
+
+    return {"reports": args.reports, "radius_m": args.radius_m, "limit": args.limit, "queries": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare regex location filtering against geospatial queries")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="geo_benchmark")
+    parser.add_argument("--reports", type=int, default=20000)
+    parser.add_argument("--radius-m", type=float, default=1000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Load Testing for Crime Reporting App
+Drives the backend_test.py scenarios as a concurrent mixed workload and
+reports latency percentiles and throughput per endpoint as JSON.
+
+Targets either a live server (--target, like backend_test.py) or the app
+in-process, backed by a local mongod (--mongo-url) or an in-memory Motor
+stand-in (mongomock-motor, the default).
+
+    python benchmarks/load_test.py --reports 5000 --concurrency 50 --duration 30 --output run.json
+    python benchmarks/load_test.py --compare baseline.json --output run.json
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+LOCATIONS = ["MP Nagar", "New Market", "Arera Colony", "Kolar Road", "Habibganj", "Bairagarh", "Shahpura"]
+SEARCH_TERMS = ["drug", "market", "suspicious", "night", "vehicle", "road"]
+
+# Scenario name -> relative weight in the mix
+WORKLOAD = {
+    "feed": 45,
+    "feed_filtered": 10,
+    "search": 12,
+    "report_detail": 10,
+    "comments_list": 10,
+    "rating": 6,
+    "comment_add": 5,
+    "upload": 2,
+}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def make_image(width=800, height=600):
+    from PIL import Image
+
+    # Noise does not compress well, so the upload path does real work
+    img = Image.frombytes("RGB", (width, height), os.urandom(width * height * 3))
+    output = io.BytesIO()
+    img.save(output, format="JPEG", quality=90)
+    return output.getvalue()
+
+
+def crime_payload(rng, crime_types):
+    location = rng.choice(LOCATIONS)
+    return {
+        "crime_type": rng.choice(crime_types),
+        "location": f"{location}, Bhopal",
+        "landmark": f"Near {rng.choice(LOCATIONS)} square",
+        "crime_time": (datetime.now(timezone.utc) - timedelta(hours=rng.randint(0, 24 * 90))).isoformat(),
+        "crime_details": f"Suspicious {rng.choice(SEARCH_TERMS)} activity reported near {location} at night",
+        "is_anonymous": rng.random() < 0.2,
+    }
+
+
+class LoadTester:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.tokens = []
+        self.report_ids = []
+        self.crime_types = []
+        self.image = None
+        self.server = None
+
+    # Setup
+
+    async def setup_in_process(self):
+        sys.path.insert(0, str(BACKEND_DIR))
+        os.chdir(BACKEND_DIR)
+        import server
+
+        if self.args.mongo_url:
+            from motor.motor_asyncio import AsyncIOMotorClient
+            client = AsyncIOMotorClient(self.args.mongo_url)
+            await client.drop_database(self.args.db_name)
+        else:
+            from mongomock_motor import AsyncMongoMockClient
+            client = AsyncMongoMockClient()
+
+        os.environ["DB_NAME"] = self.args.db_name
+        server.init_db(client)
+        await server.init_indexes()
+        await server.init_crime_types()
+        await server.init_admin()
+        self.server = server
+
+        transport = httpx.ASGITransport(app=server.app)
+        return httpx.AsyncClient(transport=transport, base_url="http://load-test/api")
+
+    async def seed_in_process(self):
+        server = self.server
+        password = server.hash_password("LoadTest123!")
+        users = [
+            server.User(name=f"Load User {i}", email=f"load{i}@example.com", city="Bhopal")
+            for i in range(self.args.users)
+        ]
+        await server.db.users.insert_many([{**u.dict(), "password": password} for u in users])
+        self.tokens = [server.create_jwt_token(u.id) for u in users]
+
+        for start in range(0, self.args.reports, 1000):
+            batch = []
+            for _ in range(min(1000, self.args.reports - start)):
+                user = self.rng.choice(users)
+                data = server.CrimeReportCreate(**crime_payload(self.rng, self.crime_types))
+                report = server.CrimeReport(**data.dict(), user_id=user.id, user_name=user.name, city="Bhopal")
+                batch.append(report.dict())
+            await server.db.crime_reports.insert_many(batch)
+            self.report_ids.extend(doc["id"] for doc in batch)
+
+        comments = []
+        for report_id in self.rng.sample(self.report_ids, min(len(self.report_ids), self.args.reports // 2)):
+            for _ in range(self.rng.randint(1, self.args.comments_per_report)):
+                user = self.rng.choice(users)
+                comments.append(server.Comment(
+                    report_id=report_id, user_id=user.id, user_name=user.name, comment_text="Seen this too"
+                ).dict())
+        if comments:
+            await server.db.comments.insert_many(comments)
+
+    async def seed_over_http(self, client):
+        run_id = int(time.time())
+        for i in range(self.args.users):
+            response = await client.post("/register", json={
+                "name": f"Load User {i}",
+                "email": f"load{run_id}_{i}@example.com",
+                "password": "LoadTest123!",
+                "city": "Bhopal",
+            })
+            response.raise_for_status()
+            self.tokens.append(response.json()["token"])
+
+        for _ in range(self.args.reports):
+            response = await client.post(
+                "/crime-reports",
+                data={"crime_data": json.dumps(crime_payload(self.rng, self.crime_types))},
+                headers=self.auth(),
+            )
+            response.raise_for_status()
+            self.report_ids.append(response.json()["report"]["id"])
+
+    def auth(self):
+        return {"Authorization": f"Bearer {self.rng.choice(self.tokens)}"}
+
+    # Scenarios
+
+    async def feed(self, client):
+        return await client.get("/crime-reports", params={"city": "Bhopal", "limit": 50})
+
+    async def feed_filtered(self, client):
+        return await client.get("/crime-reports", params={
+            "city": "Bhopal", "crime_type": self.rng.choice(self.crime_types), "limit": 20
+        })
+
+    async def search(self, client):
+        return await client.get("/crime-reports", params={
+            "city": "Bhopal", "search": self.rng.choice(SEARCH_TERMS), "limit": 20
+        })
+
+    async def report_detail(self, client):
+        return await client.get(f"/crime-reports/{self.rng.choice(self.report_ids)}")
+
+    async def comments_list(self, client):
+        return await client.get(f"/crime-reports/{self.rng.choice(self.report_ids)}/comments")
+
+    async def rating(self, client):
+        return await client.post(
+            f"/crime-reports/{self.rng.choice(self.report_ids)}/rating",
+            json={"rating": self.rng.randint(0, 10)}, headers=self.auth()
+        )
+
+    async def comment_add(self, client):
+        return await client.post(
+            f"/crime-reports/{self.rng.choice(self.report_ids)}/comments",
+            json={"comment_text": "Load test comment"}, headers=self.auth()
+        )
+
+    async def upload(self, client):
+        return await client.post(
+            "/crime-reports",
+            data={"crime_data": json.dumps(crime_payload(self.rng, self.crime_types))},
+            files={"image": ("evidence.jpg", self.image, "image/jpeg")},
+            headers=self.auth(),
+        )
+
+    # Runner
+
+    async def worker(self, client, deadline, remaining):
+        names = list(WORKLOAD)
+        weights = [WORKLOAD[name] for name in names]
+        while time.perf_counter() < deadline:
+            if remaining is not None:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+
+            name = self.rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await getattr(self, name)(client)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            self.latencies[name].append(time.perf_counter() - started)
+            if not ok:
+                self.errors[name] += 1
+
+    async def run(self):
+        if self.args.target:
+            client = httpx.AsyncClient(base_url=self.args.target.rstrip("/") + "/api", timeout=30)
+        else:
+            client = await self.setup_in_process()
+
+        async with client:
+            response = await client.get("/crime-types")
+            response.raise_for_status()
+            self.crime_types = [ct["name"] for ct in response.json()]
+            self.image = make_image()
+
+            seed_started = time.perf_counter()
+            if self.args.target:
+                await self.seed_over_http(client)
+            else:
+                await self.seed_in_process()
+            seed_seconds = time.perf_counter() - seed_started
+
+            remaining = [self.args.requests] if self.args.requests else None
+            started = time.perf_counter()
+            deadline = started + self.args.duration
+            await asyncio.gather(*(
+                self.worker(client, deadline, remaining) for _ in range(self.args.concurrency)
+            ))
+            elapsed = time.perf_counter() - started
+
+        return self.summary(elapsed, seed_seconds)
+
+    def summary(self, elapsed, seed_seconds):
+        def stats(values, errors):
+            values = sorted(values)
+            return {
+                "count": len(values),
+                "errors": errors,
+                "rps": round(len(values) / elapsed, 2),
+                "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+            }
+
+        all_latencies = [value for values in self.latencies.values() for value in values]
+        return {
+            "config": {
+                "target": self.args.target or ("mongod" if self.args.mongo_url else "in-memory"),
+                "users": self.args.users,
+                "reports": self.args.reports,
+                "concurrency": self.args.concurrency,
+                "seed": self.args.seed,
+            },
+            "seed_seconds": round(seed_seconds, 2),
+            "elapsed_seconds": round(elapsed, 2),
+            "total": stats(all_latencies, sum(self.errors.values())),
+            "endpoints": {name: stats(values, self.errors[name]) for name, values in sorted(self.latencies.items())},
+        }
+
+
+def compare(result, baseline, tolerance):
+    """Return endpoints whose p95 latency regressed beyond tolerance"""
+    regressions = []
+    for name, current in result["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous or not previous["p95_ms"]:
+            continue
+        change = (current["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"]
+        print(f"{name:16} p95 {previous['p95_ms']:>9.2f}ms -> {current['p95_ms']:>9.2f}ms ({change:+.1%})", file=sys.stderr)
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent mixed-workload load test for the crime report API")
+    parser.add_argument("--target", help="Base URL of a running server, e.g. http://127.0.0.1:8000")
+    parser.add_argument("--mongo-url", help="Run in-process against this mongod instead of the in-memory stand-in")
+    parser.add_argument("--db-name", default="load_test")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--reports", type=int, default=2000)
+    parser.add_argument("--comments-per-report", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run the workload")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests instead")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON result here instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON result to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    # In-process runs chdir into backend/, so pin paths to the caller's directory first
+    output_path = Path(args.output).resolve() if args.output else None
+    compare_path = Path(args.compare).resolve() if args.compare else None
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    result = asyncio.run(LoadTester(args).run())
+
+    output = json.dumps(result, indent=2)
+    if output_path:
+        output_path.write_text(output + "\n")
+    else:
+        print(output)
+
+    if compare_path:
+        regressions = compare(result, json.loads(compare_path.read_text()), args.tolerance)
+        if regressions:
+            print(f"p95 regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Cold Start Budget Check for Crime Reporting App
+Measures `import server` with `python -X importtime` and the lifespan
+startup (indexes, crime types, admin, background workers), and fails when
+either exceeds its budget or a lazily loaded module is imported eagerly.
+
+    python benchmarks/startup_time.py --import-budget-ms 1000 --startup-budget-ms 1500
+    python benchmarks/startup_time.py --mongo-url mongodb://localhost:27017
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+# Modules only specific routes need; importing server must not pull them in
+LAZY_MODULES = ["PIL.Image", "cProfile", "pstats"]
+
+STARTUP_SNIPPET = """
+import asyncio, json, os, sys, time
+import server
+
+mongo_url = sys.argv[1]
+if mongo_url:
+    os.environ["DB_NAME"] = sys.argv[2]
+else:
+    from mongomock_motor import AsyncMongoMockClient
+    server.create_mongo_client = AsyncMongoMockClient
+
+async def main():
+    started = time.perf_counter()
+    async with server.lifespan(server.app):
+        elapsed = time.perf_counter() - started
+        if mongo_url:
+            await server.client.drop_database(sys.argv[2])
+    print(json.dumps({"startup_ms": round(elapsed * 1000, 2)}))
+
+asyncio.run(main())
+"""
+
+
+def parse_importtime(stderr):
+    """Return {module: (self_us, cumulative_us)} from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure_import(runs):
+    totals = []
+    modules = {}
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import server"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        )
+        modules = parse_importtime(result.stderr)
+        totals.append(modules["server"][1] / 1000)
+
+    slowest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:10]
+    return {
+        "import_ms": round(statistics.median(totals), 2),
+        "runs_ms": [round(total, 2) for total in totals],
+        "slowest_self_ms": {name: round(self_us / 1000, 2) for name, (self_us, _) in slowest},
+    }
+
+
+def eager_lazy_modules():
+    result = subprocess.run(
+        [sys.executable, "-c",
+         f"import json, sys, server; print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure_startup(runs, mongo_url, db_name):
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", STARTUP_SNIPPET, mongo_url or "", db_name],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+            env={**os.environ, **({"MONGO_URL": mongo_url} if mongo_url else {})},
+        )
+        timings.append(json.loads(result.stdout.strip().splitlines()[-1])["startup_ms"])
+    return {"startup_ms": round(statistics.median(timings), 2), "startup_runs_ms": timings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check backend import and startup time against a budget")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=1000.0)
+    parser.add_argument("--startup-budget-ms", type=float, default=1500.0)
+    parser.add_argument("--mongo-url", help="Measure startup against this mongod instead of the in-memory stand-in")
+    parser.add_argument("--db-name", default="startup_time")
+    args = parser.parse_args()
+
+    result = {
+        **measure_import(args.runs),
+        **measure_startup(args.runs, args.mongo_url, args.db_name),
+        "eager_lazy_modules": eager_lazy_modules(),
+        "budgets": {"import_ms": args.import_budget_ms, "startup_ms": args.startup_budget_ms},
+    }
+    print(json.dumps(result, indent=2))
+
+    failures = []
+    if result["import_ms"] > args.import_budget_ms:
+        failures.append(f"import took {result['import_ms']}ms (budget {args.import_budget_ms}ms)")
+    if result["startup_ms"] > args.startup_budget_ms:
+        failures.append(f"startup took {result['startup_ms']}ms (budget {args.startup_budget_ms}ms)")
+    if result["eager_lazy_modules"]:
+        failures.append(f"imported eagerly: {', '.join(result['eager_lazy_modules'])}")
+
+    if failures:
+        print("Cold start budget exceeded: " + "; ".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ import React from "react";
 import ReactDOM from "react-dom/client";
 import { BrowserRouter } from "react-router-dom";
 import "./index.css";
+import "./lib/readPrimary";
 import App from "./App";
 
 const root = ReactDOM.createRoot(document.getElementById("root"));
@@ -0,0 +1,28 @@
+import axios from "axios";
+
+// The API marks a client that just wrote so its next reads go to the primary
+// (see backend/read_routing.py). The marker cookie isn't sent cross-site, so
+// keep the header from the last write and echo it until it expires.
+const READ_PRIMARY_HEADER = "x-read-primary-until";
+
+let marker = null;
+
+const expired = (value) => parseFloat(value.split(".").slice(0, 2).join(".")) * 1000 <= Date.now();
+
+axios.interceptors.response.use((response) => {
+  const value = response.headers[READ_PRIMARY_HEADER];
+  if (value) {
+    marker = value;
+  }
+  return response;
+});
+
+axios.interceptors.request.use((config) => {
+  if (marker && expired(marker)) {
+    marker = null;
+  }
+  if (marker) {
+    config.headers[READ_PRIMARY_HEADER] = marker;
+  }
+  return config;
+});
@@ -0,0 +1,27 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Backend modules import each other as top-level modules (e.g. "from models import *")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+
+@pytest.fixture
+def server_db():
+    """Bind the server to a fresh mongomock database for one test, restoring its previous bindings after"""
+    from mongomock_motor import AsyncMongoMockClient
+
+    import server
+
+    bound = [
+        (server, "client"), (server, "db"),
+        (server.read_router, "_primary"), (server.read_router, "_databases"),
+        (server.job_queue, "collection"), (server.idempotency_store, "collection"),
+        (server.duplicate_index, "db"), (server.image_index, "db"), (server.invalidation_bus, "db"),
+    ]
+    saved = [(owner, name, getattr(owner, name, None)) for owner, name in bound]
+    server.init_db(AsyncMongoMockClient())
+    yield server.db
+    for owner, name, value in saved:
+        setattr(owner, name, value)
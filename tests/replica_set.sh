@@ -0,0 +1,34 @@
+#!/usr/bin/env bash
+# Start a throwaway three-member replica set on localhost for the read routing tests.
+#
+#   tests/replica_set.sh            # start rs0 on ports 27018-27020
+#   tests/replica_set.sh stop
+#
+# Then: MONGO_REPLSET_URL="mongodb://localhost:27018,localhost:27019,localhost:27020/?replicaSet=rs0" pytest tests
+set -euo pipefail
+
+DATA_DIR="${REPLSET_DATA_DIR:-/tmp/crime-report-rs0}"
+PORTS=(27018 27019 27020)
+
+if [[ "${1:-start}" == "stop" ]]; then
+    for port in "${PORTS[@]}"; do
+        mongosh --quiet --port "$port" --eval 'db.getSiblingDB("admin").shutdownServer({force: true})' >/dev/null 2>&1 || true
+    done
+    rm -rf "$DATA_DIR"
+    exit 0
+fi
+
+members=""
+for i in "${!PORTS[@]}"; do
+    port="${PORTS[$i]}"
+    mkdir -p "$DATA_DIR/$port"
+    mongod --replSet rs0 --port "$port" --bind_ip localhost --dbpath "$DATA_DIR/$port" \
+        --logpath "$DATA_DIR/$port.log" --fork >/dev/null
+    members+="{_id: $i, host: 'localhost:$port'},"
+done
+
+mongosh --quiet --port "${PORTS[0]}" --eval "rs.initiate({_id: 'rs0', members: [${members%,}]})"
+until mongosh --quiet --port "${PORTS[0]}" --eval 'db.hello().isWritablePrimary' | grep -q true; do
+    sleep 1
+done
+echo "mongodb://localhost:27018,localhost:27019,localhost:27020/?replicaSet=rs0"
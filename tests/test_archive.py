@@ -0,0 +1,125 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from mongomock_motor import AsyncMongoMockClient
+
+import archive
+from jobs import JobQueue
+
+
+def seed(db, now):
+    async def run():
+        await archive.ensure_indexes(db)
+        await db.crime_reports.insert_many([
+            {"id": "old", "city": "Bhopal", "created_at": now - timedelta(days=400)},
+            {"id": "older", "city": "Indore", "created_at": now - timedelta(days=500)},
+            {"id": "new", "city": "Bhopal", "created_at": now - timedelta(days=1)},
+        ])
+        await db.comments.insert_many([
+            {"id": "c1", "report_id": "old"},
+            {"id": "c2", "report_id": "new"},
+        ])
+        await db.credibility_ratings.insert_one({"id": "r1", "report_id": "older", "user_id": "u"})
+    return run()
+
+
+def test_old_reports_move_to_archive_with_their_comments_and_ratings():
+    now = datetime.now(timezone.utc)
+    db = AsyncMongoMockClient()["archive_test"]
+
+    async def run():
+        await seed(db, now)
+        result = await archive.archive_reports(db, older_than_days=365, batch_size=1)
+        hot = [r["id"] for r in await db.crime_reports.find().to_list(None)]
+        cold = [r["id"] for r in await db.crime_reports_archive.find().to_list(None)]
+        comments = [c["id"] for c in await db.comments.find().to_list(None)]
+        archived_comments = await db.comments_archive.find().to_list(None)
+        archived_ratings = await db.credibility_ratings_archive.count_documents({})
+        return result, hot, cold, comments, archived_comments, archived_ratings
+
+    result, hot, cold, comments, archived_comments, archived_ratings = asyncio.run(run())
+    assert result["reports"] == 2 and result["batches"] == 2
+    assert result["cities"] == ["Bhopal", "Indore"]
+    assert hot == ["new"]
+    assert sorted(cold) == ["old", "older"]
+    assert comments == ["c2"]
+    assert [c["id"] for c in archived_comments] == ["c1"] and archived_comments[0]["archived_at"]
+    assert archived_ratings == 1
+
+
+def test_comments_written_during_a_batch_are_swept_after_it(monkeypatch):
+    now = datetime.now(timezone.utc)
+    db = AsyncMongoMockClient()["archive_race_test"]
+    move = archive._move
+    late = []
+
+    async def move_then_comment(source, target, query, archived_at):
+        moved = await move(source, target, query, archived_at)
+        # A request that saw the report before it moved writes its comment now
+        if source.name == "comments" and not late:
+            late.append(await db.comments.insert_one({"id": "late", "report_id": "old"}))
+        return moved
+
+    monkeypatch.setattr(archive, "_move", move_then_comment)
+
+    async def run():
+        await seed(db, now)
+        result = await archive.archive_reports(db, older_than_days=365)
+        hot = [c["id"] for c in await db.comments.find().to_list(None)]
+        cold = sorted(c["id"] for c in await db.comments_archive.find().to_list(None))
+        return result, hot, cold
+
+    result, hot, cold = asyncio.run(run())
+    assert hot == ["c2"]
+    assert cold == ["c1", "late"]
+    assert result["comments"] == 2
+
+
+def test_interrupted_archive_run_is_finished_by_the_next():
+    now = datetime.now(timezone.utc)
+    db = AsyncMongoMockClient()["archive_resume"]
+
+    async def run():
+        await seed(db, now)
+        # Simulate a crash after the copy but before the delete
+        old = await db.crime_reports.find_one({"id": "old"}, {"_id": 0})
+        await db.crime_reports_archive.insert_one(old)
+
+        await archive.archive_reports(db, older_than_days=365)
+        return (
+            await db.crime_reports.count_documents({}),
+            await db.crime_reports_archive.count_documents({"id": "old"}),
+        )
+
+    assert asyncio.run(run()) == (1, 1)
+
+
+def test_scheduled_job_runs_once_per_slot_across_workers():
+    collection = AsyncMongoMockClient()["jobs_test"].jobs
+    runs = []
+
+    async def handler(payload):
+        runs.append(payload)
+
+    workers = [JobQueue(collection), JobQueue(collection)]
+    for queue in workers:
+        queue.register("archive_reports", handler)
+        queue.schedule("archive_reports", 3600, {"older_than_days": 365})
+
+    async def run():
+        await workers[0].init_indexes()
+        slot_start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for queue in workers:
+            await queue.enqueue_scheduled(slot_start)
+        while await workers[1].run_once():
+            pass
+        # A worker that starts later in the same slot must not rerun it
+        late = JobQueue(collection)
+        late.schedule("archive_reports", 3600)
+        await late.enqueue_scheduled(slot_start + timedelta(minutes=30))
+        await late.enqueue_scheduled(slot_start + timedelta(hours=1))
+        return await collection.find({}, {"_id": 0, "id": 1, "status": 1}).sort("id", 1).to_list(None)
+
+    jobs = asyncio.run(run())
+    assert runs == [{"older_than_days": 365}]
+    assert [job["status"] for job in jobs] == ["done", "pending"]
@@ -0,0 +1,68 @@
+import asyncio
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+
+import server
+
+
+@pytest.fixture
+def seeded(server_db):
+    async def seed():
+        await server_db.users.insert_one({"id": "u1", "name": "Asha", "email": "asha@example.com"})
+        await server_db.crime_reports.insert_one({
+            "id": "r1", "user_id": "u1", "user_name": "Asha", "crime_type": "Theft", "location": "MP Nagar", "city": "Bhopal",
+            "crime_details": "Phone snatched", "crime_time": datetime(2024, 5, 1, 10, tzinfo=timezone.utc),
+            "created_at": datetime(2024, 5, 1, 10, 5, tzinfo=timezone.utc), "is_blocked": False,
+        })
+
+    asyncio.run(seed())
+    server.user_cache.invalidate()
+    return server_db
+
+
+def call(requests, headers=None):
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/batch", json={"requests": requests}, headers=headers or {})
+
+    return asyncio.run(run())
+
+
+def test_sub_requests_share_one_user_lookup(seeded, monkeypatch):
+    lookups = []
+    cache_user = server.user_cache.set
+    monkeypatch.setattr(server.user_cache, "set", lambda key, user: lookups.append(key) or cache_user(key, user))
+    headers = {"Authorization": f"Bearer {server.create_jwt_token('u1')}"}
+    response = call([
+        {"id": "me", "path": "/api/me"},
+        {"id": "report", "path": "/api/crime-reports/r1"},
+        {"id": "comment", "method": "POST", "path": "/api/crime-reports/r1/comments", "body": {"comment_text": "Saw it"}},
+        {"id": "admin", "path": "/api/admin/moderation-queue"},
+        {"id": "missing", "path": "/api/crime-reports/nope"},
+    ], headers)
+
+    assert response.status_code == 200 and lookups == ["u1"]
+    results = {item["id"]: item for item in response.json()}
+    assert results["me"]["body"]["name"] == "Asha"
+    assert results["report"]["body"]["crime_details"] == "Phone snatched"
+    assert results["comment"]["body"]["user_id"] == "u1"
+    assert [results[key]["status"] for key in ("admin", "missing")] == [403, 404]
+    # The comment was a write, so the batch response sends this client's reads to the primary
+    assert "x-read-primary-until" in response.headers
+
+
+def test_anonymous_batches_and_rejected_paths(seeded):
+    response = call([{"path": "/api/crime-reports/r1"}, {"path": "/api/me"}])
+    assert [item["status"] for item in response.json()] == [200, 403]
+
+    rejected = (
+        [{"path": "/api/batch"}],
+        [{"path": "/metrics"}],
+        [{"path": "/api/admin/export?format=ndjson"}],
+        [{"path": "/api/me"}] * (server.BATCH_MAX_REQUESTS + 1),
+    )
+    for requests in rejected:
+        assert call(requests).status_code == 400
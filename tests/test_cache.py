@@ -0,0 +1,206 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+import cache
+from cache import InvalidationBus, SingleFlight, TTLCache
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+
+    ttl_cache = TTLCache(maxsize=10, ttl=5)
+    ttl_cache.set("a", 1)
+    assert ttl_cache.get("a") == 1
+
+    now[0] += 6
+    assert ttl_cache.get("a") is None
+    assert len(ttl_cache) == 0
+
+
+def test_set_drops_expired_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+
+    ttl_cache = TTLCache(maxsize=10, ttl=5)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    now[0] += 3
+    ttl_cache.set("c", 3)
+    now[0] += 3
+    ttl_cache.set("d", 4)
+
+    # "a" and "b" expired and were never read again
+    assert len(ttl_cache) == 2
+    assert ttl_cache.get("c") == 3
+
+
+def test_weighed_cache_is_bounded_by_size():
+    ttl_cache = TTLCache(maxsize=10, ttl=60, max_weight=100, weigh=len)
+    ttl_cache.set("a", "x" * 40)
+    ttl_cache.set("b", "x" * 40)
+    ttl_cache.set("c", "x" * 40)
+    # Too big to cache at all
+    ttl_cache.set("d", "x" * 101)
+
+    assert ttl_cache.get("a") is None
+    assert ttl_cache.get("d") is None
+    assert ttl_cache.get("c") is not None
+    assert ttl_cache.weight == 80
+
+    ttl_cache.invalidate("b")
+    assert ttl_cache.weight == 40
+
+
+def test_least_recently_used_entry_is_evicted():
+    ttl_cache = TTLCache(maxsize=2, ttl=60)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    ttl_cache.get("a")
+    ttl_cache.set("c", 3)
+
+    assert ttl_cache.get("a") == 1
+    assert ttl_cache.get("b") is None
+    assert ttl_cache.get("c") == 3
+
+
+def test_tuple_keys_invalidate_by_first_element():
+    ttl_cache = TTLCache(maxsize=10, ttl=60)
+    ttl_cache.set(("Bhopal", None, 0, 20), ["page 1"])
+    ttl_cache.set(("Bhopal", "Illegal Drug", 0, 20), ["filtered"])
+    ttl_cache.set(("Indore", None, 0, 20), ["other city"])
+
+    ttl_cache.invalidate("Bhopal")
+    assert ttl_cache.get(("Bhopal", None, 0, 20)) is None
+    assert ttl_cache.get(("Bhopal", "Illegal Drug", 0, 20)) is None
+    assert ttl_cache.get(("Indore", None, 0, 20)) == ["other city"]
+
+    ttl_cache.invalidate()
+    assert len(ttl_cache) == 0
+
+
+def test_bus_invalidates_locally_and_broadcasts():
+    async def run():
+        db = AsyncMongoMockClient()["cache_test"]
+        feed_cache = TTLCache(maxsize=10, ttl=60)
+        feed_cache.set(("Bhopal", 0), ["report"])
+        bus = InvalidationBus(db, {"feed": feed_cache})
+
+        await bus.invalidate("feed", "Bhopal")
+
+        assert feed_cache.get(("Bhopal", 0)) is None
+        message = await db.cache_invalidations.find_one({"cache": "feed"})
+        assert message["key"] == "Bhopal"
+        assert message["origin"] == bus.worker_id
+
+    asyncio.run(run())
+
+
+class CappedCollection:
+    """Just enough of a capped collection for the bus: natural order, tailable cursors that end each pass"""
+
+    def __init__(self, documents):
+        self.documents = list(documents)
+
+    async def find_one(self, sort=None):
+        return self.documents[-1] if self.documents else None
+
+    def find(self, query, cursor_type=None):
+        after = query.get("_id", {}).get("$gt")
+        return TailCursor([document for document in self.documents if after is None or document["_id"] > after])
+
+
+class TailCursor:
+    def __init__(self, documents):
+        self.documents = documents
+        self.alive = True
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.documents:
+            self.alive = False
+            raise StopAsyncIteration
+        return self.documents.pop(0)
+
+
+def test_bus_tails_in_insertion_order_not_by_id():
+    feed_cache = TTLCache(maxsize=10, ttl=60)
+    # ObjectIds from different processes in the same second can sort below earlier messages
+    collection = CappedCollection([{"_id": 5, "cache": None, "origin": "other"}])
+    bus = InvalidationBus({"cache_invalidations": collection}, {"feed": feed_cache})
+
+    async def run():
+        task = asyncio.create_task(bus._tail())
+        await asyncio.sleep(0.05)
+        feed_cache.set(("Bhopal", 0), ["report"])
+        collection.documents.append({"_id": 3, "cache": "feed", "key": "Bhopal", "origin": "other"})
+        await asyncio.sleep(0.3)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    assert feed_cache.get(("Bhopal", 0)) is None
+
+
+def test_bus_drops_caches_when_its_resume_point_was_overwritten():
+    feed_cache = TTLCache(maxsize=10, ttl=60)
+    collection = CappedCollection([{"_id": 1, "cache": None, "origin": "other"}])
+    bus = InvalidationBus({"cache_invalidations": collection}, {"feed": feed_cache})
+
+    async def run():
+        task = asyncio.create_task(bus._tail())
+        await asyncio.sleep(0.05)
+        feed_cache.set(("Indore", 0), ["report"])
+        # The capped collection wrapped around past the last message this worker saw
+        collection.documents = [{"_id": 2, "cache": "feed", "key": "Bhopal", "origin": "other"}]
+        await asyncio.sleep(0.3)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    assert len(feed_cache) == 0
+
+
+def test_single_flight_shares_one_load_between_concurrent_callers():
+    flight = SingleFlight()
+    loads = []
+
+    async def load():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return {"id": "r1"}
+
+    async def run():
+        results = await asyncio.gather(*(flight.do("r1", load) for _ in range(20)))
+        later = await flight.do("r1", load)
+        return results, later
+
+    results, later = asyncio.run(run())
+    assert len(loads) == 2
+    assert [shared for _, shared in results].count(False) == 1
+    assert all(value == {"id": "r1"} for value, _ in results)
+    assert later == ({"id": "r1"}, False)
+    assert len(flight) == 0
+
+
+def test_single_flight_survives_the_first_caller_going_away():
+    flight = SingleFlight()
+
+    async def load():
+        await asyncio.sleep(0.02)
+        raise LookupError("gone")
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("r1", load))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flight.do("r1", load))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await asyncio.gather(first, second, return_exceptions=True)
+
+    first, second = asyncio.run(run())
+    assert isinstance(first, asyncio.CancelledError)
+    assert isinstance(second, LookupError)
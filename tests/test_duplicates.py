@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from mongomock_motor import AsyncMongoMockClient
+
+import duplicates
+
+NOW = datetime(2024, 5, 1, 21, 0, tzinfo=timezone.utc)
+ORIGINAL = "Two men were selling ganja near the bus stand around 9 pm, one of them wore a red jacket"
+RETELLING = "two guys selling ganja close to the bus stand at 9pm, one wore a red jacket. Please act fast"
+UNRELATED = "A white truck was carrying cows towards the highway without any papers"
+
+
+def report(report_id, details, minutes=0, location="MP Nagar, Bhopal", coordinates=None, city="Bhopal"):
+    return {
+        "id": report_id,
+        "city": city,
+        "location": location,
+        "coordinates": {"type": "Point", "coordinates": coordinates} if coordinates else None,
+        "crime_time": NOW + timedelta(minutes=minutes),
+        "created_at": NOW + timedelta(minutes=minutes + 5),
+        "crime_details": details,
+    }
+
+
+def test_retellings_are_more_similar_than_unrelated_reports():
+    original = duplicates.signature(ORIGINAL)
+    assert duplicates.similarity(original, duplicates.signature(ORIGINAL)) == 1.0
+    assert duplicates.similarity(original, duplicates.signature(RETELLING)) >= duplicates.DEFAULT_THRESHOLD
+    assert duplicates.similarity(original, duplicates.signature(UNRELATED)) < 0.2
+
+
+def test_matches_need_similar_text_close_by():
+    index = duplicates.DuplicateIndex(None)
+    index.add(duplicates.Entry.from_report(report("first", ORIGINAL)))
+
+    match = index.match(duplicates.Entry.from_report(report("second", RETELLING, minutes=30)))
+    assert match and match[0] == "first"
+
+    assert index.match(duplicates.Entry.from_report(report("x", UNRELATED))) is None
+    assert index.match(duplicates.Entry.from_report(report("x", RETELLING, location="Kolar Road"))) is None
+    assert index.match(duplicates.Entry.from_report(report("x", RETELLING, minutes=60 * 30))) is None
+    assert index.match(duplicates.Entry.from_report(report("x", RETELLING, city="Indore"))) is None
+
+
+def test_coordinates_are_compared_by_distance():
+    index = duplicates.DuplicateIndex(None, radius_m=500)
+    index.add(duplicates.Entry.from_report(report("first", ORIGINAL, coordinates=[77.4340, 23.2330])))
+
+    nearby = report("near", RETELLING, location="Zone 1", coordinates=[77.4360, 23.2340])
+    far = report("far", RETELLING, coordinates=[77.4700, 23.2330])
+    assert index.match(duplicates.Entry.from_report(nearby))[0] == "first"
+    assert index.match(duplicates.Entry.from_report(far)) is None
+
+
+def test_backfill_links_to_the_earliest_report():
+    db = AsyncMongoMockClient().db
+    reports = [report("first", ORIGINAL), report("second", RETELLING, minutes=20),
+               report("third", ORIGINAL, minutes=40), report("other", UNRELATED, minutes=50)]
+
+    async def run():
+        await db.crime_reports.insert_many(reports)
+        result = await duplicates.backfill(db)
+        cursor = db.crime_reports.find({}, {"_id": 0, "id": 1, "duplicate_of": 1, "duplicate_count": 1})
+        linked = {doc["id"]: (doc.get("duplicate_of"), doc.get("duplicate_count", 0)) for doc in await cursor.to_list(None)}
+        return result, linked, await db.report_signatures.count_documents({})
+
+    result, linked, signatures = asyncio.run(run())
+    assert result == {"reports": 4, "duplicates": 2, "clusters": 1}
+    assert linked == {"first": (None, 2), "second": ("first", 0), "third": ("first", 0), "other": (None, 0)}
+    # Reports this old can't be matched by new ones, so their signatures aren't kept
+    assert signatures == 0
+
+
+def test_backfill_batches_writes_and_keeps_live_signatures():
+    db = AsyncMongoMockClient().db
+    now = datetime.now(timezone.utc)
+    reports = [{**report(f"r{n}", ORIGINAL if n % 2 else RETELLING), "created_at": now - timedelta(minutes=10 - n),
+                "crime_time": now - timedelta(minutes=20)} for n in range(5)]
+
+    async def run():
+        await duplicates.ensure_indexes(db)
+        await db.crime_reports.insert_many(reports)
+        # Recorded by a live worker while the backfill runs
+        await db.report_signatures.insert_one({"report_id": "live", "created_at": now})
+        result = await duplicates.backfill(db, batch_size=2)
+        stored = sorted(document["report_id"] for document in await db.report_signatures.find().to_list(None))
+        return result, stored, await db.report_signatures.index_information()
+
+    result, stored, indexes = asyncio.run(run())
+    assert result == {"reports": 5, "duplicates": 4, "clusters": 1}
+    assert stored == ["live", "r0", "r1", "r2", "r3", "r4"]
+    assert indexes["created_at_1"]["expireAfterSeconds"] == 2 * duplicates.DEFAULT_WINDOW_HOURS * 3600
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import tracemalloc
+
+from events import EVICTED_FRAME, EventBroker
+
+
+def test_thousands_of_idle_subscribers():
+    async def run():
+        broker = EventBroker(max_queue_size=100)
+
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        subscriptions = [broker.subscribe("Bhopal") for _ in range(5000)]
+        others = [broker.subscribe("Indore") for _ in range(5000)]
+        after, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        assert broker.subscriber_count == 10000
+        # Idle subscribers only cost their queue and set entry
+        assert (after - before) / 10000 < 8192
+
+        broker.publish("Bhopal", "new", {"id": "report-1"})
+        assert all(s.queue.qsize() == 1 for s in subscriptions)
+        assert all(s.queue.empty() for s in others)
+
+        frame = await subscriptions[0].get()
+        assert frame.startswith("event: new\n")
+        assert json.loads(frame.split("data: ", 1)[1]) == {"id": "report-1"}
+
+    asyncio.run(run())
+
+
+def test_slow_consumer_is_evicted():
+    async def run():
+        broker = EventBroker(max_queue_size=3)
+        slow = broker.subscribe("Bhopal")
+        fast = broker.subscribe("Bhopal")
+
+        for i in range(4):
+            broker.publish("Bhopal", "stats", {"id": str(i)})
+            await fast.get()
+
+        assert slow.evicted
+        assert not fast.evicted
+        assert broker.subscriber_count == 1
+        assert await slow.get() == EVICTED_FRAME
+        assert slow.queue.empty()
+
+    asyncio.run(run())
+
+
+def test_unsubscribe_and_emit_without_change_stream():
+    async def run():
+        broker = EventBroker()
+        subscription = broker.subscribe("Bhopal")
+
+        broker.emit("Bhopal", "blocked", {"id": "report-1", "is_blocked": True})
+        assert subscription.queue.qsize() == 1
+
+        broker.change_stream_active = True
+        broker.emit("Bhopal", "blocked", {"id": "report-1", "is_blocked": False})
+        assert subscription.queue.qsize() == 1
+
+        broker.unsubscribe(subscription)
+        assert broker.subscriber_count == 0
+
+    asyncio.run(run())
+
+
+def test_change_stream_dispatch():
+    async def run():
+        broker = EventBroker()
+        subscription = broker.subscribe("Bhopal")
+
+        broker._dispatch_change({
+            "operationType": "update",
+            "fullDocument": {"id": "report-1", "city": "Bhopal", "avg_credibility": 4.0,
+                             "total_ratings": 2, "comments_count": 1},
+            "updateDescription": {"updatedFields": {"avg_credibility": 4.0}},
+        })
+        frame = await subscription.get()
+        assert frame.startswith("event: stats\n")
+
+    asyncio.run(run())
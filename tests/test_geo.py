@@ -0,0 +1,60 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import geo
+
+
+def test_near_builds_a_bounded_circle():
+    [condition] = geo.geo_conditions(near="77.43,23.23", radius_m=500)
+    center, radians = condition["coordinates"]["$geoWithin"]["$centerSphere"]
+    assert center == [77.43, 23.23]
+    assert radians == pytest.approx(500 / geo.EARTH_RADIUS_METERS)
+
+    with pytest.raises(ValueError):
+        geo.geo_conditions(near="77.43,23.23", radius_m=geo.MAX_RADIUS_METERS + 1)
+    with pytest.raises(ValueError):
+        geo.geo_conditions(near="23.23")
+
+
+def test_bbox_is_a_closed_polygon_with_a_size_limit():
+    [condition] = geo.geo_conditions(bbox="77.4,23.2,77.5,23.3")
+    [ring] = condition["coordinates"]["$geoWithin"]["$geometry"]["coordinates"]
+    assert ring[0] == ring[-1] == [77.4, 23.2]
+    assert len(ring) == 5
+
+    with pytest.raises(ValueError):
+        geo.parse_bbox("77.5,23.2,77.4,23.3")
+    with pytest.raises(ValueError):
+        geo.parse_bbox("70,20,75,25")
+    with pytest.raises(ValueError):
+        geo.parse_bbox("77.4,95,77.5,96")
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 1, 1, 12, 30)
+    cursor = geo.encode_cursor(created_at, "report-1")
+    assert geo.decode_cursor(cursor) == (created_at, "report-1")
+
+    with pytest.raises(ValueError):
+        geo.decode_cursor("not a cursor")
+
+
+def test_keyset_pages_break_created_at_ties_by_id():
+    collection = AsyncMongoMockClient()["geo_test"].crime_reports
+    same_time = datetime(2024, 1, 1)
+    documents = [{"id": f"r{i}", "created_at": same_time if i < 3 else datetime(2024, 1, i + 1)} for i in range(5)]
+
+    async def walk(page_size):
+        await collection.insert_many(documents)
+        pages, query = [], {}
+        while True:
+            page = await collection.find(query).sort([("created_at", -1), ("id", -1)]).limit(page_size).to_list(None)
+            if not page:
+                return pages
+            pages.append([doc["id"] for doc in page])
+            query = geo.keyset_filter(geo.encode_cursor(page[-1]["created_at"], page[-1]["id"]))
+
+    assert asyncio.run(walk(2)) == [["r4", "r3"], ["r2", "r1"], ["r0"]]
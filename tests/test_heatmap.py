@@ -0,0 +1,68 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+import heatmap
+
+
+def report(lng, lat, crime_type="Theft", city="Bhopal", **extra):
+    return {"city": city, "crime_type": crime_type,
+            "coordinates": {"type": "Point", "coordinates": [lng, lat]}, **extra}
+
+
+def test_tile_math_round_trips():
+    for zoom in (heatmap.MIN_ZOOM, 12, heatmap.MAX_ZOOM):
+        x, y = heatmap.tile_for(77.4126, 23.2599, zoom)
+        lng, lat = heatmap.tile_center(x, y, zoom)
+        assert heatmap.tile_for(lng, lat, zoom) == (x, y)
+    assert heatmap.tile_for(-180, 85.0511, 0) == (0, 0)
+    assert heatmap.tile_for(180, -90, 1) == (1, 1)
+
+
+def test_incremental_counts_match_a_rebuild():
+    db = AsyncMongoMockClient()["heatmap_test"]
+    reports = [
+        report(77.4126, 23.2599),
+        report(77.4127, 23.2598, "Illegal Drug"),
+        report(77.4300, 23.2300),
+        report(75.8577, 22.7196, city="Indore"),
+    ]
+
+    async def run():
+        await heatmap.ensure_indexes(db)
+        for doc in reports:
+            await heatmap.record_report(db, doc)
+        # Blocking takes a report back out; reports without coordinates are ignored
+        await heatmap.record_report(db, reports[2], -1)
+        await heatmap.record_report(db, {"city": "Bhopal", "crime_type": "Theft", "coordinates": None})
+        incremental = await heatmap.get_tiles(db, "bhopal", 14)
+
+        await db.crime_reports.insert_many([
+            {**reports[0]}, {**reports[1]}, {**reports[2], "is_blocked": True}
+        ])
+        await db.crime_reports_archive.insert_one({**reports[3]})
+        # A miscounted tile without reports is dropped by the rebuild
+        await db.heatmap_tiles.insert_one({"city": "Bhopal", "zoom": 14, "x": 1, "y": 1, "crime_type": "Theft", "count": 3})
+        rebuilt = await heatmap.rebuild(db)
+        return incremental, rebuilt, await heatmap.get_tiles(db, "Bhopal", 14)
+
+    incremental, rebuilt, after_rebuild = asyncio.run(run())
+    assert incremental["tiles"] == after_rebuild["tiles"]
+    assert rebuilt["reports"] == 3
+    [tile] = incremental["tiles"]
+    assert tile["count"] == 2 and tile["by_type"] == {"Theft": 1, "Illegal Drug": 1}
+
+
+def test_bbox_and_zoom_limit_the_tiles():
+    db = AsyncMongoMockClient()["heatmap_bbox"]
+
+    async def run():
+        await heatmap.record_report(db, report(77.41, 23.26))
+        await heatmap.record_report(db, report(77.49, 23.19))
+        inside = await heatmap.get_tiles(db, "Bhopal", 15, bbox=(77.40, 23.25, 77.42, 23.27))
+        clamped = await heatmap.get_tiles(db, "Bhopal", 30)
+        return inside, clamped
+
+    inside, clamped = asyncio.run(run())
+    assert [(t["lng"] > 77.40, t["lat"] > 23.25) for t in inside["tiles"]] == [(True, True)]
+    assert clamped["zoom"] == heatmap.MAX_ZOOM and len(clamped["tiles"]) == 2
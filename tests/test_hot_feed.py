@@ -0,0 +1,62 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+import server
+
+
+def hours_ago(hours):
+    return datetime.now(timezone.utc) - timedelta(hours=hours)
+
+
+def test_engagement_ranks_higher_and_age_decays_the_score():
+    quiet = server.compute_hot_score(0.0, 0, 0, hours_ago(1))
+    discussed = server.compute_hot_score(0.0, 0, 5, hours_ago(1))
+    credible = server.compute_hot_score(9.0, 4, 0, hours_ago(1))
+    doubted = server.compute_hot_score(1.0, 4, 0, hours_ago(1))
+    assert discussed > quiet and credible > doubted > quiet
+
+    assert server.compute_hot_score(0.0, 0, 5, hours_ago(12)) < discussed
+    assert server.compute_hot_score(0.0, 0, 5, hours_ago(server.HOT_WINDOW_DAYS * 24 + 1)) == 0.0
+
+
+def test_decay_job_rescores_reports_in_the_window(server_db):
+    reports = [
+        {"id": "fresh", "created_at": hours_ago(1), "comments_count": 3, "hot_score": 9.0},
+        {"id": "aging", "created_at": hours_ago(48), "comments_count": 3, "hot_score": 9.0},
+        {"id": "expired", "created_at": hours_ago(24 * 30), "comments_count": 3, "hot_score": 9.0},
+    ]
+
+    async def run():
+        await server.db.crime_reports.insert_many(reports)
+        await server.decay_hot_scores({})
+        cursor = server.db.crime_reports.find({}, {"_id": 0, "id": 1, "hot_score": 1}).sort("hot_score", -1)
+        return [(doc["id"], doc["hot_score"]) for doc in await cursor.to_list(None)]
+
+    scores = asyncio.run(run())
+    assert [report_id for report_id, _ in scores] == ["fresh", "aging", "expired"]
+    assert scores[0][1] < 9.0 and scores[2][1] == 0.0
+
+
+def test_feed_clamps_limit_and_only_caches_plain_pages(server_db):
+    server.feed_cache.invalidate()
+    reports = [
+        {"id": f"r{n}", "user_id": "u1", "user_name": "Asha", "crime_type": "Theft", "location": "MP Nagar",
+         "city": "Bhopal", "crime_details": f"Phone snatched {n}", "crime_time": hours_ago(n),
+         "created_at": hours_ago(n), "is_blocked": False}
+        for n in range(server.FEED_MAX_LIMIT + 5)
+    ]
+
+    async def run():
+        await server_db.crime_reports.insert_many(reports)
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            page = await client.get("/api/crime-reports", params={"limit": 5000})
+            await client.get("/api/crime-reports", params={"search": "phone"})
+            await client.get("/api/crime-reports", params={"skip": 20})
+        return page
+
+    page = asyncio.run(run())
+    assert len(page.json()) == server.FEED_MAX_LIMIT
+    assert len(server.feed_cache) == 1
@@ -0,0 +1,109 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import jwt
+from fastapi import FastAPI, HTTPException
+from mongomock_motor import AsyncMongoMockClient
+
+from idempotency import IdempotencyMiddleware, IdempotencyStore
+
+SECRET = "idempotency-test-secret-0123456789abcdef"
+
+
+def signed_in(user_id="u1", **headers):
+    return {"Authorization": f"Bearer {jwt.encode({'user_id': user_id}, SECRET, algorithm='HS256')}", **headers}
+
+
+def make_app(store):
+    app = FastAPI()
+    calls = []
+
+    @app.post("/reports")
+    async def create_report(report: dict):
+        calls.append(report)
+        if report.get("fail"):
+            raise HTTPException(status_code=503, detail="Unavailable")
+        return {"id": len(calls), **report}
+
+    app.add_middleware(IdempotencyMiddleware, store=store, jwt_secret=SECRET, jwt_algorithm="HS256")
+    return app, calls
+
+
+def client_for(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def test_retries_replay_the_first_response():
+    store = IdempotencyStore(AsyncMongoMockClient().db.idempotency_keys)
+    app, calls = make_app(store)
+
+    async def run():
+        async with client_for(app) as client:
+            headers = signed_in(**{"Idempotency-Key": "abc"})
+            first = await client.post("/reports", json={"city": "Bhopal"}, headers=headers)
+            retry = await client.post("/reports", json={"city": "Bhopal"}, headers=headers)
+            other = await client.post("/reports", json={"city": "Indore"}, headers=headers)
+            other_user = await client.post("/reports", json={"city": "Bhopal"}, headers=signed_in("u2", **{"Idempotency-Key": "abc"}))
+            unkeyed = await client.post("/reports", json={"city": "Bhopal"}, headers=signed_in())
+        return first, retry, other, other_user, unkeyed
+
+    first, retry, other, other_user, unkeyed = asyncio.run(run())
+    assert first.json() == retry.json() == {"id": 1, "city": "Bhopal"}
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert other.status_code == 422
+    assert other_user.json()["id"] == 2
+    assert unkeyed.json()["id"] == 3
+    assert len(calls) == 3
+
+
+def test_requests_without_a_user_are_never_stored():
+    store = IdempotencyStore(AsyncMongoMockClient().db.idempotency_keys)
+    app, calls = make_app(store)
+
+    async def run():
+        async with client_for(app) as client:
+            # e.g. two people logging in with the same key must not see each other's token
+            for headers in ({"Idempotency-Key": "abc"}, {"Idempotency-Key": "abc", "Authorization": "Bearer forged"}):
+                await client.post("/reports", json={"city": "Bhopal"}, headers=headers)
+                await client.post("/reports", json={"city": "Bhopal"}, headers=headers)
+        return await store.collection.count_documents({})
+
+    assert asyncio.run(run()) == 0
+    assert len(calls) == 4
+
+
+def test_server_errors_are_not_stored():
+    store = IdempotencyStore(AsyncMongoMockClient().db.idempotency_keys)
+    app, calls = make_app(store)
+
+    async def run():
+        async with client_for(app) as client:
+            statuses = [
+                (await client.post("/reports", json={"fail": True}, headers=signed_in(**{"Idempotency-Key": "k"}))).status_code
+                for _ in range(2)
+            ]
+        return statuses, await store.collection.count_documents({})
+
+    statuses, stored = asyncio.run(run())
+    assert statuses == [503, 503]
+    assert len(calls) == 2 and stored == 0
+
+
+def test_in_flight_claims_conflict_until_their_lease_expires():
+    store = IdempotencyStore(AsyncMongoMockClient().db.idempotency_keys, lease_seconds=60)
+
+    async def run():
+        first = await store.claim("key", "fingerprint")
+        in_flight = await store.claim("key", "fingerprint")
+        await store.collection.update_one(
+            {"_id": "key"}, {"$set": {"locked_until": datetime.now(timezone.utc) - timedelta(seconds=1)}}
+        )
+        taken_over = await store.claim("key", "fingerprint")
+        return first, in_flight, taken_over
+
+    first, in_flight, taken_over = asyncio.run(run())
+    assert first is None
+    assert in_flight["status"] == "processing"
+    assert taken_over is None
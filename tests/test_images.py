@@ -0,0 +1,83 @@
+import asyncio
+import io
+import random
+
+from mongomock_motor import AsyncMongoMockClient
+from PIL import Image
+
+import images
+
+
+def photo(size, quality=90, extent=(-2.0, -1.2, 0.8, 1.2)):
+    img = Image.effect_mandelbrot(size, extent, 100).convert("RGB")
+    output = io.BytesIO()
+    img.save(output, format="JPEG", quality=quality)
+    return output.getvalue()
+
+
+def test_bk_tree_finds_the_same_hashes_as_a_scan():
+    rng = random.Random(7)
+    hashes = [rng.getrandbits(64) for _ in range(2000)]
+    tree = images.BKTree()
+    for position, value in enumerate(hashes):
+        tree.add(value, position)
+
+    for _ in range(20):
+        query = rng.choice(hashes) ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64))
+        expected = sorted(
+            (images.hamming(query, value), position) for position, value in enumerate(hashes)
+            if images.hamming(query, value) <= 10
+        )
+        assert sorted(tree.search(query, 10)) == expected
+    assert len(tree) == len(set(hashes))
+
+
+def test_perceptual_hash_survives_resizing_and_recompression():
+    original = images.perceptual_hash(photo((1600, 1200)))
+    resized = images.perceptual_hash(photo((800, 600), quality=60))
+    different = images.perceptual_hash(photo((1600, 1200), extent=(-0.8, 0.0, 0.2, 1.0)))
+
+    assert images.hamming(original, resized) <= images.DEFAULT_MAX_DISTANCE
+    assert images.hamming(original, different) > images.DEFAULT_MAX_DISTANCE
+    # Images without detail only ever match exactly
+    assert images.perceptual_hash(photo((10, 10), extent=(5.0, 5.0, 5.1, 5.1))) is None
+    assert images.perceptual_hash(b"not an image") is None
+
+
+def test_index_reuses_processed_images():
+    db = AsyncMongoMockClient().db
+    index = images.ImageIndex(db)
+    upload = photo((1600, 1200))
+
+    async def run():
+        await db.crime_reports.insert_one({"id": "first", "image_base64": "compressed"})
+        key = images.image_key(upload)
+        before = await index.find(key)
+        await index.remember(key, "first")
+
+        exact = await index.find(images.image_key(upload))
+        near = await index.find(images.image_key(photo((800, 600), quality=60)))
+        other = await index.find(images.image_key(photo((800, 600), extent=(-0.8, 0.0, 0.2, 1.0))))
+
+        # Blocked and anonymous reports don't lend their images out
+        hidden = []
+        for report_id, fields in (("blocked", {"is_blocked": True}), ("anonymous", {"is_anonymous": True})):
+            hidden_upload = photo((400, 300), extent=(-0.8, 0.0, 0.2, 1.0 + len(hidden)))
+            await db.crime_reports.insert_one({"id": report_id, "image_base64": "private", **fields})
+            await index.remember(images.image_key(hidden_upload), report_id)
+            hidden.append((await index.find(images.image_key(hidden_upload)))[1])
+
+        # A new worker loads the hashes from the collection
+        restarted = images.ImageIndex(db)
+        await restarted.start()
+        await restarted.stop()
+        return before, exact, near, other, hidden, len(restarted)
+
+    before, exact, near, other, hidden, loaded = asyncio.run(run())
+    assert before == (None, None)
+    assert exact == ("exact", "compressed")
+    # A similar photo is only counted; the upload itself is kept
+    assert near == ("near", None)
+    assert other == (None, None)
+    assert hidden == [None, None]
+    assert loaded == 3
@@ -0,0 +1,30 @@
+from types import SimpleNamespace
+
+from metrics import MongoPoolListener
+
+PRIMARY = SimpleNamespace(address=("db-1", 27017))
+SECONDARY = SimpleNamespace(address=("db-2", 27017))
+
+
+def test_pool_listener_only_counts_checkouts_past_the_pool_size_as_waiting():
+    listener = MongoPoolListener(max_pool_size=2)
+    for event in (PRIMARY, PRIMARY, SECONDARY):
+        listener.connection_check_out_started(event)
+    # Checkouts in progress on a pool with free slots aren't queued
+    assert listener.busiest()["waiting"] == 0
+
+    listener.connection_checked_out(PRIMARY)
+    listener.connection_checked_out(PRIMARY)
+    listener.connection_check_out_started(PRIMARY)
+    busiest = listener.busiest()
+    assert busiest["address"] == "db-1:27017"
+    assert busiest["waiting"] == 1 and busiest["utilization"] == 1.0
+
+    listener.connection_checked_in(PRIMARY)
+    listener.connection_checked_out(PRIMARY)
+    listener.connection_checked_in(PRIMARY)
+    listener.connection_checked_in(PRIMARY)
+    assert listener.busiest()["waiting"] == 0
+    # Checkouts are per pool, not summed across the replica set
+    listener.connection_checked_out(SECONDARY)
+    assert listener.busiest()["utilization"] == 0.5
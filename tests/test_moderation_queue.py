@@ -0,0 +1,48 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import server
+
+
+def hours_ago(hours):
+    return datetime.now(timezone.utc) - timedelta(hours=hours)
+
+
+def test_freshness_fades_for_untouched_reports(server_db):
+    reports = [
+        # Scored when it was posted three days ago and never touched since
+        {"id": "stale", "created_at": hours_ago(72), "is_blocked": False, "moderation_priority": 1.0},
+        {"id": "old", "created_at": hours_ago(24 * 60), "is_blocked": False, "moderation_priority": 1.0},
+    ]
+
+    async def run():
+        await server_db.crime_reports.insert_many(reports)
+        await server.refresh_moderation_priorities({})
+        cursor = server_db.crime_reports.find({}, {"_id": 0, "id": 1, "moderation_priority": 1})
+        return {doc["id"]: doc["moderation_priority"] for doc in await cursor.to_list(None)}
+
+    priorities = asyncio.run(run())
+    assert priorities["stale"] == pytest.approx(server.compute_moderation_priority(0.0, 0, 0, hours_ago(72)), abs=1e-3)
+    assert priorities["stale"] < 0.5
+    # Outside the refresh window only the backfill rescores
+    assert priorities["old"] == 1.0
+
+
+def test_backfill_scores_every_report(server_db):
+    reports = [
+        {"id": "unscored", "created_at": hours_ago(1), "is_blocked": False},
+        {"id": "old", "created_at": hours_ago(24 * 60), "is_blocked": False, "moderation_priority": 1.0},
+        {"id": "broken", "is_blocked": False},
+    ]
+
+    async def run():
+        await server_db.crime_reports.insert_many(reports)
+        await server.backfill_moderation_priorities({})
+        cursor = server_db.crime_reports.find({}, {"_id": 0, "id": 1, "moderation_priority": 1})
+        return {doc["id"]: doc.get("moderation_priority") for doc in await cursor.to_list(None)}
+
+    priorities = asyncio.run(run())
+    assert priorities["unscored"] > priorities["old"] > 0
+    assert priorities["old"] < 1.0 and priorities["broken"] is None
@@ -0,0 +1,114 @@
+"""Runs the app under gunicorn with several workers against a local mongod.
+
+Skipped when no mongod is reachable (MONGO_URL, default localhost) or
+gunicorn is not installed.
+"""
+import os
+import shutil
+import socket
+import subprocess
+import time
+import uuid
+from pathlib import Path
+
+import pytest
+import requests
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+WORKERS = 3
+
+
+def mongod_available():
+    try:
+        MongoClient(MONGO_URL, serverSelectionTimeoutMS=500).admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("gunicorn") is None or not mongod_available(),
+    reason="needs gunicorn and a local mongod",
+)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def workers():
+    port = free_port()
+    db_name = f"test_multiworker_{uuid.uuid4().hex[:8]}"
+    env = {**os.environ, "MONGO_URL": MONGO_URL, "DB_NAME": db_name,
+           "WEB_CONCURRENCY": str(WORKERS), "BIND": f"127.0.0.1:{port}"}
+    process = subprocess.Popen(
+        ["gunicorn", "-c", "gunicorn.conf.py", "server:app"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}/api"
+    try:
+        for _ in range(100):
+            try:
+                if requests.get(f"{base_url}/", timeout=1).status_code == 200:
+                    break
+            except requests.ConnectionError:
+                time.sleep(0.2)
+        else:
+            pytest.fail("gunicorn workers did not start")
+        # Let every worker finish its startup hooks
+        time.sleep(2)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        MongoClient(MONGO_URL).drop_database(db_name)
+
+
+def test_crime_type_cache_is_coherent_across_workers(workers):
+    login = requests.post(f"{workers}/login", json={"email": "admin@crimereport.com", "password": "Asdf123$"})
+    headers = {"Authorization": f"Bearer {login.json()['token']}"}
+
+    # Warm every worker's crime-type cache (new connections spread across workers)
+    for _ in range(WORKERS * 5):
+        requests.get(f"{workers}/crime-types").raise_for_status()
+
+    name = f"Multiworker Test {uuid.uuid4().hex[:6]}"
+    requests.post(f"{workers}/admin/crime-types", json={"name": name}, headers=headers).raise_for_status()
+    time.sleep(1.5)
+
+    for _ in range(WORKERS * 5):
+        names = [ct["name"] for ct in requests.get(f"{workers}/crime-types").json()]
+        assert name in names
+
+
+def test_feed_cache_is_coherent_across_workers(workers):
+    register = requests.post(f"{workers}/register", json={
+        "name": "Multiworker", "email": f"mw{uuid.uuid4().hex[:8]}@example.com", "password": "x", "city": "Bhopal"
+    })
+    headers = {"Authorization": f"Bearer {register.json()['token']}"}
+
+    for _ in range(WORKERS * 5):
+        requests.get(f"{workers}/crime-reports", params={"city": "Bhopal"}).raise_for_status()
+
+    created = requests.post(f"{workers}/crime-reports", headers=headers, data={"crime_data": (
+        '{"crime_type": "Illegal Drug", "location": "MP Nagar", '
+        '"crime_time": "2024-01-01T00:00:00Z", "crime_details": "Multiworker feed test"}'
+    )})
+    report_id = created.json()["report"]["id"]
+    time.sleep(1.5)
+
+    for _ in range(WORKERS * 5):
+        ids = [r["id"] for r in requests.get(f"{workers}/crime-reports", params={"city": "Bhopal"}).json()]
+        assert report_id in ids
+
+
+def test_workers_seed_each_crime_type_once(workers):
+    # Every worker runs the startup seeding at the same time
+    names = [ct["name"] for ct in requests.get(f"{workers}/crime-types").json()]
+    assert len(names) == len(set(names)) == 4
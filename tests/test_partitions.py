@@ -0,0 +1,43 @@
+import asyncio
+
+import httpx
+
+import server
+from partitions import normalize_city, report_filter
+
+
+def test_normalize_city():
+    assert normalize_city("Bhopal") == "Bhopal"
+    assert normalize_city("  bhopal ") == "Bhopal"
+    assert normalize_city("new   delhi") == "New Delhi"
+
+
+def test_report_filter_leads_with_partition_key():
+    query = report_filter("bhopal", id="report-1", is_blocked=False)
+    assert list(query) == ["city", "id", "is_blocked"]
+    assert query["city"] == "Bhopal"
+
+
+def test_report_filter_without_city_is_unrouted():
+    assert report_filter(None, id="report-1") == {"id": "report-1"}
+
+
+def test_city_stats_are_cached_per_city(server_db):
+    server.city_stats_cache.invalidate()
+
+    async def run():
+        await server_db.crime_reports.insert_one({"id": "r1", "city": "Bhopal", "is_blocked": False})
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = (await client.get("/api/stats/cities/bhopal")).json()
+            await server_db.crime_reports.insert_one({"id": "r2", "city": "Bhopal", "is_blocked": False})
+            cached = (await client.get("/api/stats/cities/Bhopal")).json()
+            server.city_stats_cache.invalidate()
+            fresh = (await client.get("/api/stats/cities")).json()
+        return first, cached, fresh
+
+    first, cached, fresh = asyncio.run(run())
+    assert first["reports"] == 1
+    # Served from the cache until it expires
+    assert cached["reports"] == 1
+    assert fresh[0]["reports"] == 2
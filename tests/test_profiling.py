@@ -0,0 +1,28 @@
+import asyncio
+
+import httpx
+
+import server
+
+
+def test_only_stored_admins_can_profile_requests(server_db):
+    server.user_cache.invalidate()
+
+    async def run():
+        await server_db.users.insert_many([
+            {"id": "admin", "name": "Admin", "email": "admin@example.com", "is_admin": True},
+            {"id": "demoted", "name": "Former Admin", "email": "former@example.com", "is_admin": False},
+        ])
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = {}
+            for user_id in ("admin", "demoted"):
+                # Both tokens were issued while the user was an admin
+                headers = {"Authorization": f"Bearer {server.create_jwt_token(user_id, is_admin=True)}", "X-Profile": "1"}
+                responses[user_id] = await client.get("/api/me", headers=headers)
+        return responses, await server_db.profiles.count_documents({})
+
+    responses, profiles = asyncio.run(run())
+    assert "x-profile-id" in responses["admin"].headers
+    assert "x-profile-id" not in responses["demoted"].headers
+    assert profiles == 1
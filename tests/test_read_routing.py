@@ -0,0 +1,147 @@
+"""Read preference routing.
+
+The routing tests run against the in-memory stand-in. The replica set test
+needs a local replica set (start one with ``tests/replica_set.sh``) and
+MONGO_REPLSET_URL pointing at it. It is skipped otherwise.
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from pymongo import MongoClient, monitoring
+from pymongo.errors import PyMongoError
+from starlette.requests import Request
+from starlette.responses import Response
+
+from read_routing import READ_PRIMARY_COOKIE, READ_PRIMARY_HEADER, ReadRouter, build_read_preference, parse_route_modes
+
+MONGO_REPLSET_URL = os.environ.get("MONGO_REPLSET_URL")
+
+
+def make_request(headers=None):
+    raw = [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+    return Request({"type": "http", "headers": raw})
+
+
+def test_route_modes_override_defaults():
+    modes = parse_route_modes("feed=nearest, comments=primary")
+    assert modes["feed"] == "nearest"
+    assert modes["comments"] == "primary"
+    assert modes["crime_types"] == "secondaryPreferred"
+
+    with pytest.raises(ValueError):
+        parse_route_modes("feed")
+    with pytest.raises(ValueError):
+        build_read_preference("secondaryMaybe")
+
+
+def test_max_staleness_is_clamped_to_mongodb_minimum():
+    assert build_read_preference("secondaryPreferred", 30).max_staleness == 90
+    assert build_read_preference("nearest", 300).max_staleness == 300
+    assert build_read_preference("primary", 300).mode == 0
+
+
+def test_write_marker_sends_reads_to_primary():
+    router = ReadRouter(read_your_writes_seconds=60, secret="test-secret")
+    db = AsyncMongoMockClient()["read_routing"]
+    router.bind(db)
+    assert router.database("feed", make_request()) is not db
+    assert router.database("unknown_route") is db
+
+    response = Response()
+    router.mark_write(response)
+    marker = response.headers[READ_PRIMARY_HEADER]
+    until, _, _ = marker.rpartition(".")
+    assert float(until) > time.time() + 50
+    assert f"{READ_PRIMARY_COOKIE}={marker}" in response.headers["set-cookie"]
+
+    assert router.database("feed", make_request({READ_PRIMARY_HEADER: marker})) is db
+    assert router.database("feed", make_request({"Cookie": f"{READ_PRIMARY_COOKIE}={marker}"})) is db
+    # Expired, garbled or forged markers fall back to the route's preference
+    assert not router.needs_primary(make_request({READ_PRIMARY_HEADER: str(time.time() + 60)}))
+    assert not router.needs_primary(make_request({READ_PRIMARY_HEADER: "soon"}))
+    assert not router.needs_primary(make_request({READ_PRIMARY_HEADER: f"{float(until) + 3600:.3f}.{marker.rpartition('.')[2]}"}))
+    assert not ReadRouter(secret="other-secret").needs_primary(make_request({READ_PRIMARY_HEADER: marker}))
+
+    expired = ReadRouter(read_your_writes_seconds=-1, secret="test-secret")
+    response = Response()
+    expired.mark_write(response)
+    assert not router.needs_primary(make_request({READ_PRIMARY_HEADER: response.headers[READ_PRIMARY_HEADER]}))
+
+
+def replica_set_available():
+    if not MONGO_REPLSET_URL:
+        return False
+    try:
+        hello = MongoClient(MONGO_REPLSET_URL, serverSelectionTimeoutMS=1000).admin.command("hello")
+        return bool(hello.get("setName")) and len(hello.get("hosts", [])) > 1
+    except PyMongoError:
+        return False
+
+
+class FindRecorder(monitoring.CommandListener):
+    def __init__(self):
+        self.finds = []
+
+    def started(self, event):
+        if event.command_name == "find":
+            self.finds.append((event.command.get("find"), event.connection_id))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+@pytest.mark.skipif(not replica_set_available(), reason="needs MONGO_REPLSET_URL pointing at a replica set")
+def test_public_reads_use_secondaries_until_the_user_writes():
+    import httpx
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    import server
+
+    db_name = f"test_read_routing_{uuid.uuid4().hex[:8]}"
+    recorder = FindRecorder()
+
+    async def run():
+        os.environ["DB_NAME"] = db_name
+        mongo_client = AsyncIOMotorClient(MONGO_REPLSET_URL, event_listeners=[recorder])
+        server.init_db(mongo_client)
+        primary = (await mongo_client.admin.command("hello"))["primary"]
+        try:
+            await server.init_crime_types()
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                register = await http.post("/api/register", json={
+                    "name": "Routing", "email": f"rr{uuid.uuid4().hex[:8]}@example.com", "password": "x"
+                })
+                headers = {"Authorization": f"Bearer {register.json()['token']}"}
+
+                recorder.finds.clear()
+                await http.get("/api/crime-reports", params={"city": "Bhopal"})
+                anonymous_reads = [address for collection, address in recorder.finds if collection == "crime_reports"]
+
+                created = await http.post("/api/crime-reports", headers=headers, data={"crime_data": json.dumps({
+                    "crime_type": "Theft", "location": "MP Nagar",
+                    "crime_time": "2024-01-01T00:00:00Z", "crime_details": "Read routing test"
+                })})
+                report_id = created.json()["report"]["id"]
+
+                # The client now carries the write marker cookie
+                recorder.finds.clear()
+                feed = await http.get("/api/crime-reports", params={"city": "Bhopal"})
+                writer_reads = [address for collection, address in recorder.finds if collection == "crime_reports"]
+                return anonymous_reads, writer_reads, report_id, [r["id"] for r in feed.json()], primary
+        finally:
+            await mongo_client.drop_database(db_name)
+            mongo_client.close()
+
+    anonymous_reads, writer_reads, report_id, feed_ids, primary = asyncio.run(run())
+    assert anonymous_reads and all(f"{host}:{port}" != primary for host, port in anonymous_reads)
+    assert writer_reads and all(f"{host}:{port}" == primary for host, port in writer_reads)
+    assert report_id in feed_ids
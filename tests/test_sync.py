@@ -0,0 +1,65 @@
+import asyncio
+from datetime import timedelta
+
+from mongomock_motor import AsyncMongoMockClient
+
+import sync
+
+
+def report(report_id, **fields):
+    return {"id": report_id, "city": "Bhopal", "is_blocked": False, "comments_count": 0, **fields}
+
+
+def test_changes_are_split_by_kind():
+    db = AsyncMongoMockClient().db
+
+    async def run():
+        documents = [report("old"), report("hidden"), report("other-city", city="Indore")]
+        await sync.stamp_new(db, documents)
+        await db.crime_reports.insert_many(documents)
+        token = await sync.current_sequence(db)
+
+        new = [report("new")]
+        await sync.stamp_new(db, new)
+        await db.crime_reports.insert_many(new)
+        await db.crime_reports.update_one({"id": "old"}, await sync.stamped(db, {"$set": {"comments_count": 1}}))
+        await db.crime_reports.update_one({"id": "hidden"}, await sync.stamped(db, {"$set": {"is_blocked": True}}))
+        await db.comments.insert_one({"id": "c1", "report_id": "old", "city": "Bhopal", **sync.stamp(await sync.next_sequence(db))})
+        await db.comments.insert_one({"id": "c2", "report_id": "hidden", "city": "Bhopal", **sync.stamp(await sync.next_sequence(db))})
+        return token, await sync.changes_since(db, "Bhopal", token, settle_seconds=0)
+
+    token, changes = asyncio.run(run())
+    assert token == 3
+    assert [document["id"] for document in changes["reports"]] == ["new"]
+    assert changes["stats"] == [
+        {"id": "old", "avg_credibility": 0, "total_ratings": 0, "comments_count": 1, "duplicate_count": 0}
+    ]
+    assert changes["blocked"] == ["hidden"]
+    # c2 belongs to a blocked report and is left out
+    assert [document["id"] for document in changes["comments"]] == ["c1"]
+    assert changes["token"] == "8" and not changes["has_more"]
+
+
+def test_token_pages_and_holds_back_at_recent_changes():
+    db = AsyncMongoMockClient().db
+
+    async def run():
+        documents = [report(f"r{n}") for n in range(5)]
+        await sync.stamp_new(db, documents)
+        # The last two are still within the settle window
+        for document in documents[:3]:
+            document["updated_at"] -= timedelta(seconds=10)
+        await db.crime_reports.insert_many(documents)
+
+        first = await sync.changes_since(db, "Bhopal", 0, limit=2, settle_seconds=5)
+        second = await sync.changes_since(db, "Bhopal", int(first["token"]), limit=2, settle_seconds=5)
+        third = await sync.changes_since(db, "Bhopal", int(second["token"]), limit=2, settle_seconds=5)
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert first["token"] == "2" and first["has_more"]
+    # r3 is recent, so the token stops at r2 while r3 is sent anyway
+    assert [document["id"] for document in second["reports"]] == ["r2", "r3"]
+    assert second["token"] == "3" and not second["has_more"]
+    assert [document["id"] for document in third["reports"]] == ["r3", "r4"]
+    assert third["token"] == "3"
@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import trends
+
+
+def test_location_bucket_and_periods():
+    assert trends.location_bucket("mp nagar,  zone 1") == "Mp Nagar"
+    assert trends.location_bucket(None) == "Unknown"
+
+    moment = datetime(2024, 3, 5, 14, 42, 7)
+    assert trends.period_start(moment, "hour") == datetime(2024, 3, 5, 14, tzinfo=timezone.utc)
+    assert trends.period_start(moment, "day") == datetime(2024, 3, 5, tzinfo=timezone.utc)
+
+
+def test_incremental_rollups_match_a_backfill():
+    db = AsyncMongoMockClient()["trends_test"]
+    now = datetime.now(timezone.utc)
+    reports = [
+        {"id": "a", "city": "Bhopal", "crime_type": "Theft", "location": "MP Nagar", "created_at": now,
+         "is_blocked": False, "avg_credibility": 0.0, "total_ratings": 0, "comments_count": 0},
+        {"id": "b", "city": "Bhopal", "crime_type": "Theft", "location": "New Market", "created_at": now,
+         "is_blocked": False, "avg_credibility": 0.0, "total_ratings": 0, "comments_count": 0},
+    ]
+
+    async def run():
+        for report in reports:
+            await trends.record_report(db, report)
+        # Report "a" gets two comments and a rating of 8, then "b" is blocked
+        await trends.record_stats_change(db, reports[0], {"avg_credibility": 0.0, "total_ratings": 0, "comments_count": 2})
+        rated = {**reports[0], "comments_count": 2}
+        await trends.record_stats_change(db, rated, {"avg_credibility": 8.0, "total_ratings": 1, "comments_count": 2})
+        await trends.record_report(db, reports[1], -1)
+        incremental = await trends.get_trends(db, "Bhopal", "hour")
+
+        await db.crime_reports.insert_many([
+            {**reports[0], "avg_credibility": 8.0, "total_ratings": 1, "comments_count": 2},
+            {**reports[1], "is_blocked": True},
+        ])
+        await db.comments.insert_many([{"report_id": "a", "created_at": now}, {"report_id": "a", "created_at": now}])
+        await trends.backfill(db)
+        return incremental, await trends.get_trends(db, "Bhopal", "hour")
+
+    incremental, backfilled = asyncio.run(run())
+    assert incremental["series"] == backfilled["series"]
+    [point] = incremental["series"]
+    assert (point["reports"], point["comments"], point["avg_credibility"]) == (1, 2, 8.0)
+
+
+def test_trend_ranges_are_bounded():
+    db = AsyncMongoMockClient()["trends_ranges"]
+    now = datetime.now(timezone.utc)
+
+    with pytest.raises(ValueError):
+        asyncio.run(trends.get_trends(db, "Bhopal", "hour", start=now - timedelta(days=30), end=now))
+    with pytest.raises(ValueError):
+        asyncio.run(trends.get_trends(db, "Bhopal", "day", start=now, end=now - timedelta(days=1)))
+    with pytest.raises(ValueError):
+        asyncio.run(trends.get_trends(db, "Bhopal", "minute"))
+
+
+def test_city_backfill_reads_in_batches_and_leaves_other_cities_alone():
+    db = AsyncMongoMockClient()["trends_cities"]
+    now = datetime.now(timezone.utc)
+
+    def report(report_id, city):
+        return {"id": report_id, "city": city, "crime_type": "Theft", "location": "Zone 1", "created_at": now,
+                "is_blocked": False, "avg_credibility": 0.0, "total_ratings": 0}
+
+    async def run():
+        await db.crime_reports.insert_many([report(f"b{n}", "Bhopal") for n in range(5)] + [report("i0", "Indore")])
+        await db.comments.insert_many([{"report_id": f"b{n}", "created_at": now} for n in range(5)])
+        await db.comments.insert_one({"report_id": "i0", "created_at": now})
+        result = await trends.backfill(db, "Bhopal", batch_size=2)
+        return result, await trends.get_trends(db, "Bhopal", "day"), await trends.get_trends(db, "Indore", "day")
+
+    result, bhopal, indore = asyncio.run(run())
+    assert result == {"reports": 5, "comments": 5}
+    assert [(point["reports"], point["comments"]) for point in bhopal["series"]] == [(5, 5)]
+    assert indore["series"] == []